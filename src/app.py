@@ -8,7 +8,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import csv
+import os
 import time
 from typing import Dict, List, Tuple, Optional
 import matplotlib.pyplot as plt
@@ -17,12 +17,29 @@ import networkx as nx
 from io import BytesIO
 
 # Imports do projeto
-from node import Node
 from graph import Graph
-from dijkstra import all_pairs_shortest_paths
+import loader
+from snapshot import SNAPSHOT_NAME, dataset_sources, load_snapshot
+from dijkstra import hospital_shortest_paths
+from path_cache import cached_shortest_paths
+from decompose import DECOMP_MIN_PATIENTS, maximize_priority_decomposed
 from dp import (
-    read_time_budget,
+    DP_MAX_PATIENTS,
+    PARALLEL_DP_MAX_PATIENTS,
+    PARALLEL_DP_MIN_PATIENTS,
+    SPARSE_DP_MAX_STATES,
+    MITM_MAX_STATES,
+    BEAM_WIDTH,
+    ANYTIME_TIME_LIMIT_MS,
+    SolverTimeout,
+    best_within,
+    beam_search_maximize_priority,
+    improve_route_lns,
+    priority_upper_bound,
+    branch_and_bound_maximize_priority,
     maximize_priority_dp,
+    maximize_priority_sparse_dp,
+    maximize_priority_mitm,
     greedy_maximize_priority,
 )
 
@@ -63,187 +80,24 @@ DATASETS = {
 # ============================================================================
 
 @st.cache_data
-def load_dataset(dataset_path: str) -> Tuple[Graph, Dict, float, int]:
+def load_dataset(dataset_path: str) -> Tuple[Graph, Optional[int], Optional[float]]:
     """
     Carrega um dataset completo e retorna:
     - Graph configurado
     - Dados iniciais (hospital_id, tempo_total)
-    - Estatísticas do dataset
     """
-    g = Graph()
-    
-    path_nodes = DATASETS_DIR / dataset_path / "pontos.csv"
-    path_edges = DATASETS_DIR / dataset_path / "ruas.csv"
-    path_initial = DATASETS_DIR / dataset_path / "dados_iniciais.csv"
-    
-    # Carrega nós
-    with open(path_nodes, newline='', encoding='utf-8') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            nid = int(row.get('id') or row.get('Id') or row.get('ID'))
-            tipo = row.get('tipo', '')
-            nome = row.get('nome', '')
-            prioridade = int(row['prioridade']) if row.get('prioridade') else None
-            tempo = float(row['tempo_cuidados_minimos']) if row.get('tempo_cuidados_minimos') else None
-            
-            # Determina se é hospital
-            is_h_col = row.get('is_hospital', '')
-            is_h = False
-            try:
-                if isinstance(is_h_col, str) and is_h_col.strip() != '':
-                    is_h = is_h_col.lower().strip() in ('1', 'true', 'sim', 'yes')
-            except Exception:
-                is_h = False
-            
-            if not is_h and isinstance(tipo, str) and tipo.strip().lower() == 'hospital':
-                is_h = True
-            
-            n = Node(
-                id=nid,
-                tipo=tipo,
-                nome=nome,
-                prioridade=prioridade,
-                tempo_cuidados_minimos=tempo,
-                is_hospital=is_h
-            )
-            g.add_node(n)
-    
-    # Carrega arestas
-    with open(path_edges, newline='', encoding='utf-8') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            a_raw = row.get('ponto_origem') or row.get('from') or row.get('a')
-            b_raw = row.get('ponto_destino') or row.get('to') or row.get('b')
-            w_raw = row.get('tempo_transporte') or row.get('weight') or row.get('peso')
-            
-            if a_raw is None or b_raw is None:
-                continue
-            
-            try:
-                a = int(a_raw)
-                b = int(b_raw)
-                w = float(w_raw) if w_raw not in (None, '') else 1.0
-            except ValueError:
-                continue
-            
-            g.add_edge(a, b, w, bidirectional=True)
-    
-    # Lê dados iniciais
-    tempo_total = read_time_budget(path_initial)
-    hospital_id = None
-    
-    with open(path_initial, newline='', encoding='utf-8') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            try:
-                hospital_id = int(row.get('ponto_inicial') or list(row.values())[0])
-                break
-            except:
-                pass
-    
-    return g, hospital_id, tempo_total
+    base = DATASETS_DIR / dataset_path
+    snap = load_snapshot(base / SNAPSHOT_NAME, sources=dataset_sources(base))
+    if snap is not None:
+        return snap.graph, snap.hospital_id, snap.tempo_total
+    return loader.load_dataset(base / "pontos.csv", base / "ruas.csv", base / "dados_iniciais.csv")
 
-def load_dataset_from_upload(pontos_file, ruas_file, dados_iniciais_file) -> Tuple[Graph, int, float]:
+def load_dataset_from_upload(pontos_file, ruas_file, dados_iniciais_file) -> Tuple[Graph, Optional[int], Optional[float]]:
     """
-    Carrega um dataset a partir de arquivos uploaded.
+    Carrega um dataset a partir de arquivos uploaded (lidos em streaming,
+    sem descodificar o ficheiro inteiro).
     """
-    g = Graph()
-    
-    # Carrega nós do arquivo pontos
-    pontos_content = pontos_file.getvalue().decode('utf-8')
-    pontos_lines = pontos_content.strip().split('\n')
-    rdr = csv.DictReader(pontos_lines)
-    
-    for row in rdr:
-        nid = int(row.get('id') or row.get('Id') or row.get('ID'))
-        tipo = row.get('tipo', '')
-        nome = row.get('nome', '')
-        prioridade = int(row['prioridade']) if row.get('prioridade') else None
-        tempo = float(row['tempo_cuidados_minimos']) if row.get('tempo_cuidados_minimos') else None
-        
-        # Determina se é hospital
-        is_h_col = row.get('is_hospital', '')
-        is_h = False
-        try:
-            if isinstance(is_h_col, str) and is_h_col.strip() != '':
-                is_h = is_h_col.lower().strip() in ('1', 'true', 'sim', 'yes')
-        except Exception:
-            is_h = False
-        
-        if not is_h and isinstance(tipo, str) and tipo.strip().lower() == 'hospital':
-            is_h = True
-        
-        n = Node(
-            id=nid,
-            tipo=tipo,
-            nome=nome,
-            prioridade=prioridade,
-            tempo_cuidados_minimos=tempo,
-            is_hospital=is_h
-        )
-        g.add_node(n)
-    
-    # Carrega arestas do arquivo ruas
-    ruas_content = ruas_file.getvalue().decode('utf-8')
-    ruas_lines = ruas_content.strip().split('\n')
-    rdr = csv.DictReader(ruas_lines)
-    
-    for row in rdr:
-        a_raw = row.get('ponto_origem') or row.get('from') or row.get('a')
-        b_raw = row.get('ponto_destino') or row.get('to') or row.get('b')
-        w_raw = row.get('tempo_transporte') or row.get('weight') or row.get('peso')
-        
-        if a_raw is None or b_raw is None:
-            continue
-        
-        try:
-            a = int(a_raw)
-            b = int(b_raw)
-            w = float(w_raw) if w_raw not in (None, '') else 1.0
-        except ValueError:
-            continue
-        
-        g.add_edge(a, b, w, bidirectional=True)
-    
-    # Lê dados iniciais
-    dados_content = dados_iniciais_file.getvalue().decode('utf-8')
-    dados_lines = dados_content.strip().split('\n')
-    rdr = csv.DictReader(dados_lines)
-    
-    tempo_total = None
-    hospital_id = None
-    
-    for row in rdr:
-        # Lê tempo_total
-        if 'tempo_total' in row and row['tempo_total'] not in (None, ''):
-            try:
-                tempo_total = float(row['tempo_total'])
-            except:
-                pass
-        
-        # Lê ponto_inicial
-        try:
-            hospital_id = int(row.get('ponto_inicial') or list(row.values())[0])
-        except:
-            pass
-        
-        if tempo_total and hospital_id is not None:
-            break
-    
-    # Se não encontrou tempo_total, tenta segunda coluna
-    if tempo_total is None:
-        dados_lines = dados_content.strip().split('\n')
-        rdr = csv.DictReader(dados_lines)
-        for row in rdr:
-            vals = list(row.values())
-            if len(vals) >= 2 and vals[1] not in (None, ''):
-                try:
-                    tempo_total = float(vals[1])
-                    break
-                except:
-                    pass
-    
-    return g, hospital_id, tempo_total
+    return loader.load_dataset(pontos_file, ruas_file, dados_iniciais_file)
 
 def get_dataset_stats(g: Graph) -> Dict:
     """Retorna estatísticas do dataset carregado."""
@@ -263,53 +117,155 @@ def get_dataset_stats(g: Graph) -> Dict:
 # FUNÇÕES DE OTIMIZAÇÃO
 # ============================================================================
 
-def calculate_optimal_route(g: Graph, hospital_id: int, time_budget: float, force_algorithm: str = 'auto'):
+def calculate_optimal_route(g: Graph, hospital_id: int, time_budget: float, force_algorithm: str = 'auto', data_files: Optional[List] = None, beam_width: int = BEAM_WIDTH, time_limit_ms: float = ANYTIME_TIME_LIMIT_MS):
     """
-    Calcula a rota ótima usando DP ou heurística conforme necessário.
-    Retorna dict com resultados completos.
+    Calcula a melhor rota encontrada dentro de time_limit_ms milissegundos.
+    Retorna dict com resultados completos (is_optimal indica se o ótimo foi provado).
     
     Args:
         g: Grafo com nós e arestas
         hospital_id: ID do hospital inicial
         time_budget: Tempo total disponível
-        force_algorithm: 'auto', 'dp', ou 'greedy'
+        force_algorithm: 'auto', 'sparse', 'mitm', 'dp', 'bnb', 'beam', 'greedy', 'lns'
+            (gananciosa melhorada por LNS) ou 'decomp' (clusters por hospital);
+            'auto' usa 'decomp' a partir de DECOMP_MIN_PATIENTS pacientes
+        data_files: Ficheiros de origem do grafo (pontos.csv e ruas.csv, como
+            caminhos ou bytes); quando dados, os caminhos mais curtos são
+            guardados/lidos da cache em disco
+        beam_width: Estados mantidos por camada quando force_algorithm='beam'
+        time_limit_ms: Prazo da otimização; 'auto' devolve o melhor incumbente
+            de solve_anytime, os DPs forçados que não terminam a tempo também,
+            e 'bnb', 'beam' e 'lns' param no prazo com a melhor rota até aí
     """
-    # Calcula caminhos mais curtos
+    # Identifica todos os hospitais
+    all_hospitals = g.nodes.hospitals().tolist()
+    
+    # Calcula caminhos mais curtos (apenas árvores enraizadas nos hospitais)
     start_dijkstra = time.time()
-    all_paths = all_pairs_shortest_paths(g)
+    if data_files:
+        all_paths, paths_cached = cached_shortest_paths(g, data_files, hospitals=all_hospitals)
+    else:
+        all_paths, paths_cached = hospital_shortest_paths(g, all_hospitals), False
     time_dijkstra = time.time() - start_dijkstra
     
     # Zera estado de resgate
-    for n in g.nodes.values():
-        if n.tipo == 'paciente':
-            n.resgatado = False
+    g.nodes.reset_rescued()
     
     # Identifica pacientes candidatos
-    pacientes = [
-        (nid, n) for nid, n in g.nodes.items()
-        if n.tipo == 'paciente' and (n.prioridade or 0) > 0
-    ]
-    num_pacientes = len(pacientes)
-    
-    # Identifica todos os hospitais
-    all_hospitals = [nid for nid, n in g.nodes.items() if n.is_hospital]
+    num_pacientes = len(g.nodes.candidates(include_rescued=True)[0])
     
-    # Escolhe método
-    if force_algorithm == 'auto':
-        use_dp = num_pacientes <= 20
-    elif force_algorithm == 'dp':
-        use_dp = True
-    else:  # greedy
-        use_dp = False
-    
-    metodo = 'DP Ótimo' if use_dp else 'Heurística Gananciosa'
+    # Executa otimização: melhor resposta dentro de time_limit_ms. No modo
+    # automático (ou se o DP forçado não terminar a tempo) usa solve_anytime,
+    # e `algorithm` passa a ser o solver que produziu a resposta
+    start_optimization = time.time()
+    deadline = time.monotonic() + time_limit_ms / 1000.0
+    algorithm = force_algorithm
+    if algorithm == 'auto' and num_pacientes >= DECOMP_MIN_PATIENTS:
+        algorithm = 'decomp'
+    interrupted = None
+    if algorithm in ('sparse', 'mitm', 'dp'):
+        try:
+            if algorithm == 'sparse':
+                route, priority, time_used, optimal = maximize_priority_sparse_dp(
+                    g, all_paths, hospital_id, time_budget, all_hospitals, deadline=deadline
+                )
+            elif algorithm == 'mitm':
+                route, priority, time_used, optimal = maximize_priority_mitm(
+                    g, all_paths, hospital_id, time_budget, all_hospitals, deadline=deadline
+                )
+            else:
+                # o DP denso aloca 2^P × H estados logo à partida; com vários
+                # núcleos e perto do limite as camadas são divididas por processos
+                workers = os.cpu_count() or 1
+                if num_pacientes < PARALLEL_DP_MIN_PATIENTS:
+                    workers = 1
+                max_patients = PARALLEL_DP_MAX_PATIENTS if workers > 1 else DP_MAX_PATIENTS
+                route, priority, time_used, optimal = maximize_priority_dp(
+                    g, all_paths, hospital_id, time_budget, all_hospitals, deadline=deadline,
+                    max_states=(1 << max_patients) * (len(all_hospitals) + 1), workers=workers
+                )
+            upper_bound = priority
+        except SolverTimeout:
+            interrupted, algorithm = algorithm, 'auto'
+    
+    if algorithm == 'auto':
+        remaining_ms = max(0.0, deadline - time.monotonic()) * 1000.0
+        incumbent = best_within(g, all_paths, hospital_id, time_budget, all_hospitals, remaining_ms)
+        route, priority, time_used = incumbent.route, incumbent.priority, incumbent.time
+        upper_bound, optimal = incumbent.upper_bound, incumbent.optimal
+        algorithm = incumbent.method
+    elif algorithm == 'bnb':
+        route, priority, time_used, _, upper_bound = branch_and_bound_maximize_priority(
+            g, all_paths, hospital_id, time_budget, all_hospitals, time_limit=time_limit_ms / 1000.0
+        )
+        optimal = upper_bound == priority
+    elif algorithm == 'beam':
+        route, priority, time_used, optimal = beam_search_maximize_priority(
+            g, all_paths, hospital_id, time_budget, all_hospitals, width=beam_width, deadline=deadline
+        )
+        upper_bound = max(priority, priority_upper_bound(g, all_paths, time_budget, all_hospitals, starts=(hospital_id,)))
+        optimal = upper_bound == priority
+    elif algorithm == 'decomp':
+        route, priority, time_used, optimal = maximize_priority_decomposed(
+            g, all_paths, hospital_id, time_budget, all_hospitals,
+            time_limit_ms=max(0.0, deadline - time.monotonic()) * 1000.0
+        )
+        upper_bound = max(priority, priority_upper_bound(g, all_paths, time_budget, all_hospitals, starts=(hospital_id,)))
+        optimal = upper_bound == priority
+    elif algorithm in ('greedy', 'lns'):
+        route, priority, time_used, optimal = greedy_maximize_priority(
+            g, all_paths, hospital_id, time_budget, all_hospitals
+        )
+        if algorithm == 'lns':
+            route, priority, time_used, optimal = improve_route_lns(
+                g, all_paths, route, time_budget, all_hospitals,
+                time_limit=max(0.0, deadline - time.monotonic())
+            )
+        upper_bound = max(priority, priority_upper_bound(g, all_paths, time_budget, all_hospitals, starts=(hospital_id,)))
+        optimal = upper_bound == priority
+
+    metodo_de = {
+        'sparse': 'DP Esparso Ótimo',
+        'mitm': 'Meet-in-the-Middle Ótimo',
+        'dp': 'DP Ótimo',
+        'bnb': 'Branch-and-Bound',
+        'beam': f'Beam Search (largura {beam_width})',
+        'greedy': 'Heurística Gananciosa',
+        'lns': 'Heurística Gananciosa + LNS',
+        'decomp': 'Decomposição por Hospital',
+    }
+    metodo = metodo_de[algorithm]
+    if interrupted:
+        metodo = f"{metodo_de[interrupted]} interrompido em {time_limit_ms:.0f} ms → {metodo}"
+    elif force_algorithm == 'auto':
+        metodo = f"Automático ({time_limit_ms:.0f} ms): {metodo}"
     
     # Complexidade do algoritmo com explicações
     num_nodes = len(g.nodes)
     num_hospitals = len(all_hospitals)
     num_edges = sum(len(adj) for adj in g.adjacency.values()) // 2
     
-    if use_dp:
+    if algorithm == 'sparse':
+        complexity = "O(S × P)"
+        complexity_values = f"O(S × {num_pacientes}), S ≤ {num_hospitals} × Σ C({num_pacientes}, i) viáveis"
+        complexity_explanation = (
+            "**S** = Número de estados (pacientes atendidos, hospital atual) que cabem no tempo disponível\n"
+            "**P** = Número de pacientes candidatos\n"
+            "Só são expandidos estados alcançáveis dentro do budget, camada a camada; "
+            "em cada estado fica apenas o rótulo de menor tempo (a prioridade depende só dos pacientes atendidos)"
+        )
+    elif algorithm == 'mitm':
+        complexity = "O(H × S½ × P + junção)"
+        complexity_values = f"O({num_hospitals} × S½ × {num_pacientes}), S½ ≤ Σ C({num_pacientes}, i), i ≤ k/2"
+        complexity_explanation = (
+            "**S½** = Número de meias-rotas (até metade dos pacientes que cabem no tempo disponível)\n"
+            "**P** = Número de pacientes candidatos\n"
+            "**k** = Maior número de pacientes que cabe no tempo disponível\n"
+            "Cada rota é partida a meio: enumeram-se os prefixos a partir do hospital inicial e os sufixos "
+            "a partir de cada hospital, e a junção combina pares com pacientes disjuntos que terminam/começam "
+            "no mesmo hospital, por prioridade decrescente, podando pares que não superam a melhor rota"
+        )
+    elif algorithm == 'dp':
         complexity = f"O(H × 2^P × P × V)"
         complexity_values = f"O({num_hospitals} × 2^{num_pacientes} × {num_pacientes} × {num_nodes})"
         complexity_explanation = (
@@ -318,35 +274,69 @@ def calculate_optimal_route(g: Graph, hospital_id: int, time_budget: float, forc
             "**V** = Número total de vértices (nós) no grafo\n"
             "**2^P** = Número de subconjuntos possíveis de pacientes (programação dinâmica com bitmask)"
         )
+    elif algorithm == 'bnb':
+        complexity = "O(2^P × P) no pior caso"
+        complexity_values = f"O(2^{num_pacientes} × {num_pacientes}), limitado a {time_limit_ms:.0f} ms"
+        complexity_explanation = (
+            "**P** = Número de pacientes candidatos\n"
+            "Busca em profundidade sobre sequências de atendimentos, começando com a rota gulosa como incumbente; "
+            "ramos cujo limite superior (mochila fracionária sobre o custo mínimo de cada paciente restante) "
+            "não supera o incumbente são podados. Se o limite de tempo for atingido, "
+            "reporta a melhor rota e o gap até ao limite superior provado"
+        )
+    elif algorithm == 'beam':
+        complexity = "O(P × B × P log(B × P))"
+        complexity_values = f"O({num_pacientes} × {beam_width} × {num_pacientes} log({beam_width} × {num_pacientes}))"
+        complexity_explanation = (
+            "**P** = Número de pacientes candidatos\n"
+            "**B** = Largura do beam (rotas parciais mantidas por camada)\n"
+            "Em cada camada todas as rotas parciais são estendidas com um paciente; estados iguais "
+            "(mesmos pacientes e hospital) ficam com o menor tempo e mantêm-se as B com maior "
+            "prioridade alcançável. Larguras maiores aproximam-se do ótimo"
+        )
+    elif algorithm == 'decomp':
+        complexity = "O(P) partição + H clusters em paralelo + costura O(H × R × N)"
+        complexity_values = f"O({num_pacientes}) + {num_hospitals} clusters de ~{num_pacientes // max(1, num_hospitals)} pacientes"
+        complexity_explanation = (
+            "**P** = Número de pacientes candidatos\n"
+            "**H** = Número de hospitais (um cluster por hospital)\n"
+            "**R** = Rótulos mantidos por hospital na costura; **N** = sub-rotas por cluster\n"
+            "Cada paciente vai para o cluster do hospital de entrega mais próximo (caminho mais curto); "
+            "os clusters são resolvidos em paralelo para vários níveis de budget e a costura escolhe, "
+            "pela ordem de visita dos hospitais, uma sub-rota de cada cluster dentro do tempo disponível"
+        )
+    elif algorithm == 'lns':
+        complexity = "O(P log P) por passo guloso + LNS com tempo fixo"
+        complexity_values = f"O({num_pacientes} log {num_pacientes}) por passo + LNS até {time_limit_ms:.0f} ms"
+        complexity_explanation = (
+            "**P** = Número de pacientes candidatos\n"
+            "A rota gulosa é melhorada durante um tempo fixo por busca de vizinhança larga: "
+            "remove alguns pacientes e volta a inserir pelo melhor rácio prioridade/custo, "
+            "troca atendidos por não atendidos de maior prioridade e reordena a rota. "
+            "Sementes independentes correm em paralelo e fica a melhor"
+        )
     else:
-        complexity = f"O(H × P² × V)"
-        complexity_values = f"O({num_hospitals} × {num_pacientes}² × {num_nodes})"
+        complexity = "O(P × (P log P + H × P))"
+        complexity_values = f"O({num_pacientes} × ({num_pacientes} log {num_pacientes} + {num_hospitals} × {num_pacientes}))"
         complexity_explanation = (
             "**H** = Número de hospitais (pontos de partida/retorno)\n"
             "**P** = Número de pacientes candidatos\n"
-            "**V** = Número total de vértices (nós) no grafo\n"
-            "**P²** = Iterações para selecionar próximo paciente de forma gulosa"
+            "Cada passo pontua todos os candidatos de uma vez (vetorizado); o lookahead "
+            "consulta custos ordenados por hospital (P log P) e as contagens acumuladas "
+            "são atualizadas em O(H × P) quando um paciente é atendido"
         )
     
-    dijkstra_complexity = "O(V × E log V) (usando heap/priority queue)"
-    dijkstra_values = f"O({num_nodes} × {num_edges} log {num_nodes})"
+    dijkstra_complexity = "O(H × E log V) (usando heap/priority queue)"
+    dijkstra_values = f"O({num_hospitals} × {num_edges} log {num_nodes})"
     dijkstra_explanation = (
+        "**H** = Número de hospitais (raízes das árvores de caminhos)\n"
         "**V** = Número de vértices (nós)\n"
         "**E** = Número de arestas\n"
         "Dijkstra com heap (priority queue) tem custo O(E log V) por fonte; "
-        "rodando para cada vértice isso dá O(V × E log V).\n"
+        "como os algoritmos só consultam trajetos que começam ou terminam num hospital, "
+        "basta rodar a partir de cada hospital, o que dá O(H × E log V).\n"
     )
     
-    # Executa otimização
-    start_optimization = time.time()
-    if use_dp:
-        route, priority, time_used, optimal = maximize_priority_dp(
-            g, all_paths, hospital_id, time_budget, all_hospitals
-        )
-    else:
-        route, priority, time_used, optimal = greedy_maximize_priority(
-            g, all_paths, hospital_id, time_budget, all_hospitals
-        )
     time_optimization = time.time() - start_optimization
     
     # Monta percurso detalhado (hospital -> paciente -> hospital -> ...)
@@ -372,9 +362,13 @@ def calculate_optimal_route(g: Graph, hospital_id: int, time_budget: float, forc
         'time_used': time_used,
         'method': metodo,
         'is_optimal': optimal,
+        'lower_bound': priority,
+        'upper_bound': upper_bound,
+        'gap': (upper_bound - priority) / upper_bound if upper_bound > 0 else 0.0,
         'num_patients': len(chosen_patients),
         'all_paths': all_paths,
         'time_dijkstra': time_dijkstra,
+        'paths_cached': paths_cached,
         'time_optimization': time_optimization,
         'time_total': time_dijkstra + time_optimization,
         'complexity': complexity,
@@ -602,6 +596,7 @@ def main():
     )
     
     g = None
+    data_files = None
     default_hospital_id = None
     default_time_budget = None
     stats = None
@@ -617,6 +612,10 @@ def main():
         )
         
         dataset_path = DATASETS[selected_dataset]
+        data_files = [
+            DATASETS_DIR / dataset_path / "pontos.csv",
+            DATASETS_DIR / dataset_path / "ruas.csv",
+        ]
         
         # Carrega dataset
         try:
@@ -660,6 +659,7 @@ def main():
                     g, default_hospital_id, default_time_budget = load_dataset_from_upload(
                         pontos_file, ruas_file, dados_iniciais_file
                     )
+                    data_files = [pontos_file.getvalue(), ruas_file.getvalue()]
                     stats = get_dataset_stats(g)
                 st.sidebar.success("✅ Arquivos carregados com sucesso!")
             except Exception as e:
@@ -750,28 +750,71 @@ def main():
     
     algorithm_choice = st.sidebar.radio(
         "Escolha o algoritmo de otimização:",
-        options=['Automático', 'DP (Programação Dinâmica)', 'Heurística Gulosa'],
+        options=['Automático', 'DP Esparso', 'Meet-in-the-Middle', 'DP (Programação Dinâmica)', 'Branch-and-Bound', 'Beam Search', 'Heurística Gulosa', 'Heurística + LNS', 'Decomposição por Hospital'],
         index=0,
         help=(
-            "**Automático:** Usa DP para ≤20 pacientes, Heurística para >20\n\n"
-            "**DP:** Solução ótima, mas exponencial (pode ser lento)\n\n"
-            "**Heurística:** Solução aproximada, mais rápida para muitos pacientes"
+            "**Automático:** Melhor resposta dentro do tempo limite: heurística gulosa, depois beam search "
+            f"e por fim DP esparso (se houver ≤{SPARSE_DP_MAX_STATES:,} estados viáveis no budget), "
+            f"meet-in-the-middle (se cada metade tiver ≤{MITM_MAX_STATES:,}) ou "
+            "Branch-and-Bound até provar o ótimo ou esgotar o tempo\n\n"
+            "**DP Esparso:** Solução ótima, expande só os estados que cabem no tempo disponível\n\n"
+            "**Meet-in-the-Middle:** Solução ótima, junta meias-rotas (prefixos e sufixos); "
+            "para conjuntos médios de pacientes\n\n"
+            "**DP:** Solução ótima, mas exponencial (pode ser lento); usa todos os núcleos, camada a camada\n\n"
+            "**Branch-and-Bound:** Ótimo provado quando termina; no fim do tempo limite "
+            "devolve a melhor rota e o gap até ao ótimo\n\n"
+            "**Beam Search:** Mantém as melhores rotas parciais por camada; a largura troca tempo por qualidade\n\n"
+            "**Heurística:** Solução aproximada, mais rápida para muitos pacientes (mostra o gap até ao limite superior)\n\n"
+            "**Heurística + LNS:** Rota gulosa melhorada até ao tempo limite por busca de vizinhança larga\n\n"
+            f"**Decomposição por Hospital:** Para centenas de pacientes (automático a partir de {DECOMP_MIN_PATIENTS}): "
+            "clusters por hospital mais próximo resolvidos em paralelo e costurados no tempo disponível"
         )
     )
     
     # Mapeia escolha para parâmetro
     if algorithm_choice == 'Automático':
         force_algorithm = 'auto'
+    elif algorithm_choice == 'DP Esparso':
+        force_algorithm = 'sparse'
+    elif algorithm_choice == 'Meet-in-the-Middle':
+        force_algorithm = 'mitm'
     elif algorithm_choice == 'DP (Programação Dinâmica)':
         force_algorithm = 'dp'
+    elif algorithm_choice == 'Branch-and-Bound':
+        force_algorithm = 'bnb'
+    elif algorithm_choice == 'Beam Search':
+        force_algorithm = 'beam'
+    elif algorithm_choice == 'Heurística + LNS':
+        force_algorithm = 'lns'
+    elif algorithm_choice == 'Decomposição por Hospital':
+        force_algorithm = 'decomp'
     else:
         force_algorithm = 'greedy'
     
+    time_limit_ms = st.sidebar.number_input(
+        "Tempo limite (ms):",
+        min_value=0,
+        max_value=600_000,
+        value=ANYTIME_TIME_LIMIT_MS,
+        step=500,
+        help="Prazo da otimização: devolve a melhor rota encontrada até lá e indica se o ótimo foi provado"
+    )
+    
     # Aviso se DP for escolhido com muitos pacientes
-    if force_algorithm == 'dp' and stats['pacientes'] > 20:
+    dp_max_patients = PARALLEL_DP_MAX_PATIENTS if (os.cpu_count() or 1) > 1 else DP_MAX_PATIENTS
+    if force_algorithm == 'dp' and stats['pacientes'] > dp_max_patients:
         st.sidebar.warning(
-            f"⚠️ Atenção: DP com {stats['pacientes']} pacientes pode ser muito lento! "
-            f"Complexidade: O(2^{stats['pacientes']}) subconjuntos."
+            f"⚠️ Atenção: DP com {stats['pacientes']} pacientes não cabe em memória "
+            f"(O(2^{stats['pacientes']}) subconjuntos); será usada a melhor resposta do modo automático."
+        )
+    
+    beam_width = BEAM_WIDTH
+    if force_algorithm == 'beam':
+        beam_width = st.sidebar.select_slider(
+            "Largura do beam:",
+            options=[1, 4, 16, 64, 256, 1024, 4096],
+            value=BEAM_WIDTH,
+            help="Rotas parciais mantidas por camada: mais largura → mais perto do ótimo, mais tempo"
         )
     
     # ========================================================================
@@ -797,7 +840,7 @@ def main():
     if calculate_button:
         with st.spinner("🔄 Calculando rota ótima..."):
             try:
-                result = calculate_optimal_route(g, hospital_id, time_budget, force_algorithm)
+                result = calculate_optimal_route(g, hospital_id, time_budget, force_algorithm, data_files, beam_width, time_limit_ms)
                 st.session_state.result = result
             except Exception as e:
                 st.error(f"❌ Erro ao calcular rota: {e}")
@@ -837,7 +880,11 @@ def main():
         if result['is_optimal']:
             st.success(f"✅ **Rota Calculada com Sucesso!** (Método: {result['method']})")
         else:
-            st.warning(f"⚠️ **Rota Calculada!** (Método: {result['method']} - Solução aproximada)")
+            st.warning(
+                f"⚠️ **Rota Calculada!** (Método: {result['method']} - "
+                f"prioridade {result['lower_bound']} ≤ ótimo ≤ {result['upper_bound']}, "
+                f"gap {result['gap']:.1%})"
+            )
     else:
         st.error("❌ Nenhuma rota viável encontrada dentro do budget de tempo.")
         return
@@ -851,6 +898,8 @@ def main():
         st.code(f"{result['dijkstra_complexity']} = {result['dijkstra_values']}", language="")
         st.markdown(result['dijkstra_explanation'])
         st.caption(f"⏱️ Tempo de execução: **{result['time_dijkstra']:.4f}s**")
+        if result.get('paths_cached'):
+            st.caption("💾 Matrizes de distâncias carregadas da cache em disco (mapa inalterado).")
         
         st.markdown("---")
         
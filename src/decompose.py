@@ -0,0 +1,186 @@
+"""
+Decomposição por hospital para instâncias com centenas de pacientes.
+
+1. Partição: cada paciente pertence ao cluster do hospital de entrega mais
+   próximo (distância de caminho mais curto, near_h da instância compilada)
+2. Cada cluster é resolvido à parte com best_within, só com os seus
+   pacientes e a partir do seu hospital, para alguns níveis de budget
+   (DECOMP_BUDGET_LEVELS), num pool de processos (ou em sequência com um
+   só processo); o prazo global é repartido pelas vagas de resoluções
+3. Costura: os clusters são visitados por vizinho mais próximo a partir do
+   hospital inicial e um DP com rótulos (tempo, prioridade) escolhe, para
+   cada cluster, uma das suas sub-rotas (as rotas dos vários níveis e os
+   seus prefixos) ou saltá-lo, dentro do time_budget global
+
+Entrar num cluster vindo do hospital h custa no máximo d(h, hc) mais a ida
+desde o seu hospital hc (desigualdade triangular dos caminhos mais curtos),
+por isso a rota costurada cabe sempre no budget; o tempo devolvido é o real.
+
+Cada cluster tem ~P/H pacientes; com o prazo global fixo, mais clusters
+significam menos tempo por resolução, não mais tempo total.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from graph import Graph
+from instance import compile_instance
+from dp import ANYTIME_TIME_LIMIT_MS, Incumbent, SubproblemTask, solve_subproblems
+
+INF = float('inf')
+
+# Número de pacientes candidatos a partir do qual o modo automático usa a decomposição
+DECOMP_MIN_PATIENTS = 200
+
+# Frações do time_budget para as quais cada cluster é resolvido
+DECOMP_BUDGET_LEVELS = (0.25, 0.5, 1.0)
+
+# Máximo de rótulos mantidos por hospital na costura
+DECOMP_MAX_LABELS = 256
+
+
+def cluster_patients(inst) -> Dict[int, List[int]]:
+    """Colunas dos pacientes atendíveis agrupadas pelo índice do hospital de entrega mais próximo."""
+    clusters: Dict[int, List[int]] = {}
+    for c in np.flatnonzero(np.isfinite(inst.min_cost)).tolist():
+        clusters.setdefault(int(inst.near_h[c]), []).append(c)
+    return clusters
+
+
+def _tour(start: int, hospitals: List[int], hosp_d: Dict[Tuple[int, int], float]) -> List[int]:
+    """Ordem de visita dos hospitais por vizinho mais próximo a partir de start."""
+    left = list(hospitals)
+    order = []
+    at = start
+    while left:
+        nxt = min(left, key=lambda h: (0.0 if h == at else hosp_d[(at, h)]))
+        order.append(nxt)
+        left.remove(nxt)
+        at = nxt
+    return order
+
+
+def _profile(incumbents: List[Incumbent], inst) -> List[Tuple[float, int, list]]:
+    """
+    Sub-rotas (tempo, prioridade, rota) de um cluster: as rotas dos vários
+    níveis e todos os seus prefixos (cada paciente é entregue no hospital do
+    cluster, por isso qualquer prefixo é uma sub-rota válida); só ficam as
+    não dominadas.
+    """
+    points = []
+    for inc in incumbents:
+        at = inst.row_of[inc.route[0][1]]
+        t, p = 0.0, 0
+        for i, (tipo, nid) in enumerate(inc.route[1:], 1):
+            if tipo == 'P':
+                c = inst.col_of[nid]
+                t += float(inst.dist_hp[at, c] + inst.svc[c] + inst.near_d[c])
+                p += int(inst.prio[c])
+            else:
+                at = inst.row_of[nid]
+                points.append((t, p, inc.route[:i + 1]))
+    front = []
+    for point in sorted(points, key=lambda pt: (pt[0], -pt[1])):
+        if not front or point[1] > front[-1][1]:
+            front.append(point)
+    return front
+
+
+def _stitch(order: List[int], profiles: Dict[int, List[Tuple[float, int, list]]], start: int, time_budget: float, hosp_d: Dict[Tuple[int, int], float]) -> List[list]:
+    """
+    Escolhe, pela ordem `order`, uma sub-rota de cada cluster (ou nenhuma)
+    com a maior prioridade total. Rótulo = (tempo majorado, prioridade,
+    hospital atual, escolhas); por hospital atual só ficam rótulos não
+    dominados.
+    """
+    labels = [(0.0, 0, start, ())]
+    for h in order:
+        new = list(labels)
+        for t, p, at, picks in labels:
+            transit = 0.0 if at == h else hosp_d[(at, h)]
+            for sub_time, sub_prio, sub_route in profiles[h]:
+                total = t + transit + sub_time
+                if total > time_budget:
+                    break  # perfil por tempo crescente
+                new.append((total, p + sub_prio, h, picks + (sub_route,)))
+        # por hospital atual: tempo crescente e prioridade estritamente crescente
+        by_at: Dict[int, list] = {}
+        for lab in sorted(new, key=lambda lab: (lab[0], -lab[1])):
+            kept = by_at.setdefault(lab[2], [])
+            if not kept or lab[1] > kept[-1][1]:
+                kept.append(lab)
+        labels = [lab for kept in by_at.values() for lab in kept[-DECOMP_MAX_LABELS:]]
+    return list(max(labels, key=lambda lab: (lab[1], -lab[0]))[3])
+
+
+def maximize_priority_decomposed(g: Graph, all_paths, hospital_id: int, time_budget: float, all_hospitals: List[int], time_limit_ms: float = ANYTIME_TIME_LIMIT_MS, workers: Optional[int] = None):
+    """
+    Rota aproximada por decomposição em clusters por hospital (ver docstring
+    do módulo).
+
+    Args:
+        time_limit_ms: Prazo total; o tempo que resta depois de montar os
+            subproblemas é dividido pelas vagas de resoluções
+            (ceil(resoluções / workers)), cada uma com a mesma fatia
+        workers: Processos do pool (por defeito todos os núcleos); com
+            workers <= 1 corre tudo no processo atual, em sequência
+
+    Retorna (route_with_hospitals, total_priority, total_time, False).
+    """
+    deadline = time.monotonic() + time_limit_ms / 1000.0
+    inst = compile_instance(g, all_paths, all_hospitals, starts=(hospital_id,))
+    hospitals = inst.hospitals
+    clusters = cluster_patients(inst)
+    if not clusters:
+        return [('H', hospital_id)], 0, 0.0, False
+
+    subproblems = {hi: inst.subproblem(g, cols) for hi, cols in clusters.items()}
+    n_tasks = len(subproblems) * len(DECOMP_BUDGET_LEVELS)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, n_tasks))
+    waves = -(-n_tasks // workers)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        share_ms = max(0.0, deadline - time.monotonic()) * 1000.0 / waves
+        tasks, keys = [], []
+        for hi, (sub, dist) in subproblems.items():
+            for level in DECOMP_BUDGET_LEVELS:
+                tasks.append(SubproblemTask(sub, dist, hospitals[hi], time_budget * level, hospitals, share_ms))
+                keys.append(hospitals[hi])
+        results = solve_subproblems(tasks, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    by_cluster: Dict[int, List[Incumbent]] = {}
+    for h, inc in zip(keys, results):
+        by_cluster.setdefault(h, []).append(inc)
+    profiles = {h: _profile(incs, inst) for h, incs in by_cluster.items()}
+
+    # Distâncias entre hospitais (início incluído) para majorar as transições
+    nodes = list(dict.fromkeys([hospital_id] + list(profiles)))
+    hosp_d = {
+        (u, v): all_paths.get((u, v), (INF, []))[0]
+        for u in nodes for v in nodes if u != v
+    }
+    picks = _stitch(_tour(hospital_id, list(profiles), hosp_d), profiles, hospital_id, time_budget, hosp_d)
+
+    # Rota costurada: cada cluster sem o seu hospital inicial (a ida ao
+    # primeiro paciente parte de onde a ambulância está)
+    route = [('H', hospital_id)]
+    for sub_route in picks:
+        route.extend(sub_route[1:])
+    at = inst.row_of[hospital_id]
+    total_time, total_prio = 0.0, 0
+    for tipo, nid in route[1:]:
+        if tipo == 'P':
+            c = inst.col_of[nid]
+            total_time += float(inst.dist_hp[at, c] + inst.svc[c] + inst.near_d[c])
+            total_prio += int(inst.prio[c])
+        else:
+            at = inst.row_of[nid]
+    return route, total_prio, total_time, False
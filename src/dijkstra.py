@@ -4,17 +4,111 @@ para cálculo de caminhos mais curtos em grafos.
 """
 
 import heapq
-from typing import Dict, List, Tuple, Optional
-from graph import Graph
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple, Optional, Union
+import numpy as np
+from graph import Graph, FrozenGraph
 
+INF = float('inf')
 
-def dijkstra(graph: Graph, start_node: int) -> Tuple[Dict[int, float], Dict[int, Optional[int]]]:
+
+def _as_frozen(graph: Union[Graph, FrozenGraph]) -> FrozenGraph:
+    return graph if isinstance(graph, FrozenGraph) else graph.freeze()
+
+
+def dijkstra_indices(frozen: FrozenGraph, source: int) -> Tuple[List[float], List[int]]:
+    """
+    Dijkstra sobre a vista CSR, trabalhando só com índices densos.
+
+    Args:
+        frozen: Vista CSR do grafo (Graph.freeze())
+        source: Índice denso do nó inicial
+
+    Returns:
+        Tupla (dist, pred) de listas indexadas pelo índice denso;
+        pred[i] == -1 quando i não tem predecessor
+    """
+    if frozen.paged:
+        return _dijkstra_paged(frozen.offsets, frozen.targets, frozen.weights, source)
+    offsets, targets, weights = frozen.as_lists()
+    return _dijkstra_csr(offsets, targets, weights, source)
+
+
+def _dijkstra_csr(offsets, targets, weights, source: int) -> Tuple[List[float], List[int]]:
+    n = len(offsets) - 1
+    dist = [INF] * n
+    pred = [-1] * n
+    dist[source] = 0.0
+
+    heap = [(0.0, source)]
+    pop = heapq.heappop
+    push = heapq.heappush
+    while heap:
+        d, u = pop(heap)
+        # entrada obsoleta na fila (nó já fechado com distância menor)
+        if d > dist[u]:
+            continue
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            nd = d + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                push(heap, (nd, v))
+
+    return dist, pred
+
+
+def _dijkstra_paged(offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray, source: int) -> Tuple[List[float], List[int]]:
+    """
+    Como _dijkstra_csr, mas lê só a fatia de vizinhos de cada nó fechado;
+    os arrays (memory-mapped) nunca são convertidos inteiros para listas.
+    """
+    n = len(offsets) - 1
+    dist = [INF] * n
+    pred = [-1] * n
+    dist[source] = 0.0
+
+    heap = [(0.0, source)]
+    pop = heapq.heappop
+    push = heapq.heappush
+    while heap:
+        d, u = pop(heap)
+        if d > dist[u]:
+            continue
+        a, b = offsets[u:u + 2].tolist()
+        for v, w in zip(targets[a:b].tolist(), weights[a:b].tolist()):
+            nd = d + w
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                push(heap, (nd, v))
+
+    return dist, pred
+
+
+def index_path(pred: List[int], source: int, target: int) -> List[int]:
+    """Reconstrói o caminho (em índices densos) a partir da lista de predecessores."""
+    if target != source and pred[target] == -1:
+        return []
+    path = []
+    current = target
+    while current != -1:
+        path.append(current)
+        current = pred[current]
+    path.reverse()
+    return path
+
+
+def dijkstra(graph: Union[Graph, FrozenGraph], start_node: int) -> Tuple[Dict[int, float], Dict[int, Optional[int]]]:
     """
     Implementa o algoritmo de Dijkstra para encontrar o caminho mais curto
     de um nó inicial para todos os outros nós.
     
     Args:
-        graph: O grafo a ser percorrido
+        graph: O grafo a ser percorrido (Graph ou vista CSR já congelada)
         start_node: O nó inicial
     
     Returns:
@@ -22,43 +116,11 @@ def dijkstra(graph: Graph, start_node: int) -> Tuple[Dict[int, float], Dict[int,
         - distances: Dicionário {node_id: distância_mínima_do_start}
         - predecessors: Dicionário {node_id: nó_anterior_no_caminho}
     """
-    # Inicializa distâncias com infinito para todos os nós
-    distances = {node_id: float('inf') for node_id in graph.nodes}
-    distances[start_node] = 0
-    
-    # Inicializa predecessores
-    predecessors = {node_id: None for node_id in graph.nodes}
-    
-    # Fila de prioridade: (distância, node_id)
-    priority_queue = [(0, start_node)]
-    
-    # Conjunto de nós visitados
-    visited = set()
-    
-    while priority_queue:
-        current_distance, current_node = heapq.heappop(priority_queue)
-        
-        # Se já visitamos este nó, pula
-        if current_node in visited:
-            continue
-        
-        visited.add(current_node)
-        
-        # Se a distância atual é maior que a registrada, pula
-        if current_distance > distances[current_node]:
-            continue
-        
-        # Explora os vizinhos
-        neighbors = graph.get_neighbors(current_node)
-        for neighbor_id, edge_weight in neighbors:
-            distance = current_distance + edge_weight
-            
-            # Se encontramos um caminho mais curto, atualiza
-            if distance < distances[neighbor_id]:
-                distances[neighbor_id] = distance
-                predecessors[neighbor_id] = current_node
-                heapq.heappush(priority_queue, (distance, neighbor_id))
-    
+    frozen = _as_frozen(graph)
+    dist, pred = dijkstra_indices(frozen, frozen.index_of(start_node))
+    ids = frozen.ids.tolist()
+    distances = dict(zip(ids, dist))
+    predecessors = {nid: (ids[p] if p != -1 else None) for nid, p in zip(ids, pred)}
     return distances, predecessors
 
 
@@ -92,33 +154,420 @@ def get_shortest_path(predecessors: Dict[int, Optional[int]], start_node: int, e
     return path
 
 
-def all_pairs_shortest_paths(graph: Graph) -> Dict[Tuple[int, int], Tuple[float, List[int]]]:
+class LazyPath(Sequence):
+    """
+    Caminho materializado apenas quando é lido pela primeira vez.
+
+    Permite que table.get((u, v)) devolva (dist, path) sem custo de
+    reconstrução quando o chamador só precisa da distância.
+    """
+
+    __slots__ = ('_table', '_u', '_v', '_nodes')
+
+    def __init__(self, table: "ShortestPathTable", u: int, v: int):
+        self._table = table
+        self._u = u
+        self._v = v
+        self._nodes: Optional[List[int]] = None
+
+    def _materialize(self) -> List[int]:
+        if self._nodes is None:
+            self._nodes = self._table.path(self._u, self._v)
+        return self._nodes
+
+    def __getitem__(self, i):
+        return self._materialize()[i]
+
+    def __len__(self) -> int:
+        return len(self._materialize())
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __eq__(self, other) -> bool:
+        return list(self._materialize()) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(self._materialize())
+
+
+class ShortestPathTable:
+    """
+    Resultado compacto de caminhos mais curtos.
+
+    - dist: matriz float64 [S × V] com a distância de cada origem a cada nó
+    - pred: matriz int32 [S × V] com o predecessor (índice denso, -1 se não há)
+
+    Cada linha corresponde a uma origem; em all_pairs_shortest_paths há uma
+    linha por vértice. Os caminhos só são reconstruídos em .path(u, v).
+
+    Com symmetric=True (grafo não-direcionado) um par (v, s) em que só s é
+    origem é respondido pela linha de s, com o caminho invertido. Em grafos
+    direcionados podem ser dadas linhas do grafo transposto (rdist/rpred)
+    para responder a esses pares.
+
+    Mantém a interface de dicionário usada por dp.py, main.py e app.py:
+    table.get((u, v), default) -> (dist, path) e table[(u, v)].
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        dist: np.ndarray,
+        pred: np.ndarray,
+        sources: Optional[np.ndarray] = None,
+        symmetric: bool = False,
+        rdist: Optional[np.ndarray] = None,
+        rpred: Optional[np.ndarray] = None,
+    ):
+        self.ids = ids
+        self.dist = dist
+        self.pred = pred
+        self.sources = np.arange(len(ids)) if sources is None else np.asarray(sources)
+        self.symmetric = symmetric
+        self.rdist = rdist
+        self.rpred = rpred
+        self._ids: List[int] = ids.tolist()
+        self.index: Dict[int, int] = {nid: i for i, nid in enumerate(self._ids)}
+        self._row: Dict[int, int] = {int(s): r for r, s in enumerate(self.sources.tolist())}
+
+    @classmethod
+    def compute(
+        cls,
+        frozen: FrozenGraph,
+        sources: Optional[List[int]] = None,
+        symmetric: Optional[bool] = None,
+        workers: Optional[int] = None,
+    ) -> "ShortestPathTable":
+        """
+        Corre Dijkstra a partir de cada origem (índices densos; None = todos
+        os nós) e preenche as matrizes. Em grafos direcionados com origens
+        parciais calcula também as linhas do grafo transposto.
+        Com workers > 1 as origens são distribuídas por vários processos.
+        """
+        n = frozen.nodes_count()
+        src = list(range(n)) if sources is None else list(sources)
+        if symmetric is None:
+            symmetric = frozen.is_symmetric()
+
+        dist, pred = _fill_rows(frozen, src, workers)
+        rdist = rpred = None
+        if not symmetric and sources is not None:
+            rdist, rpred = _fill_rows(frozen.transpose(), src, workers)
+
+        return cls(frozen.ids, dist, pred, np.asarray(src, dtype=np.int64), symmetric, rdist, rpred)
+
+    def _locate(self, u: int, v: int):
+        """Retorna (matriz_dist, matriz_pred, linha, origem, destino, invertido) ou None."""
+        iu = self.index.get(u)
+        iv = self.index.get(v)
+        if iu is None or iv is None:
+            return None
+        row = self._row.get(iu)
+        if row is not None:
+            return self.dist, self.pred, row, iu, iv, False
+        row = self._row.get(iv)
+        if row is not None:
+            if self.symmetric:
+                return self.dist, self.pred, row, iv, iu, True
+            if self.rdist is not None:
+                return self.rdist, self.rpred, row, iv, iu, True
+        return None
+
+    def distance(self, u: int, v: int) -> float:
+        loc = self._locate(u, v)
+        if loc is None:
+            raise KeyError((u, v))
+        dist, _pred, row, _s, t, _rev = loc
+        return float(dist[row, t])
+
+    def path(self, u: int, v: int) -> List[int]:
+        """Reconstrói o caminho u → v (lista de ids; vazia se não há caminho)."""
+        loc = self._locate(u, v)
+        if loc is None:
+            raise KeyError((u, v))
+        _dist, pred, row, s, t, reverse = loc
+        row_pred = pred[row]
+        if t != s and row_pred[t] == -1:
+            return []
+        path = []
+        current = t
+        while current != -1:
+            path.append(self._ids[current])
+            current = int(row_pred[current])
+        if not reverse:
+            path.reverse()
+        return path
+
+    def get(self, key: Tuple[int, int], default=None):
+        u, v = key
+        loc = self._locate(u, v)
+        if loc is None:
+            return default
+        dist, _pred, row, _s, t, _rev = loc
+        return (float(dist[row, t]), LazyPath(self, u, v))
+
+    def distance_block(self, us: List[int], vs: List[int]) -> np.ndarray:
+        """
+        Matriz float64 [len(us) × len(vs)] com d(u, v); INF para pares sem
+        caminho ou que a tabela não cobre. Lê linhas inteiras das matrizes em
+        vez de consultar par a par.
+        """
+        out = np.full((len(us), len(vs)), INF, dtype=np.float64)
+        cols = np.array([self.index.get(v, -1) for v in vs], dtype=np.int64)
+        known = cols >= 0
+        # linhas das origens de v (para pares em que só v é origem)
+        v_rows = np.array([self._row.get(int(c), -1) if c >= 0 else -1 for c in cols], dtype=np.int64)
+        back = self.dist if self.symmetric else self.rdist
+        for i, u in enumerate(us):
+            iu = self.index.get(u)
+            if iu is None:
+                continue
+            row = self._row.get(iu)
+            if row is not None:
+                out[i, known] = self.dist[row, cols[known]]
+            elif back is not None:
+                has = v_rows >= 0
+                out[i, has] = back[v_rows[has], iu]
+        return out
+
+    def __getitem__(self, key: Tuple[int, int]) -> Tuple[float, Sequence[int]]:
+        result = self.get(key)
+        if result is None:
+            raise KeyError(key)
+        return result
+
+    def __contains__(self, key) -> bool:
+        return self._locate(*key) is not None
+
+    def keys(self):
+        """Pares (origem, destino) a partir das origens da tabela."""
+        for s in self.sources.tolist():
+            u = self._ids[s]
+            for v in self._ids:
+                yield (u, v)
+
+    def __len__(self) -> int:
+        return len(self.sources) * len(self._ids)
+
+
+def _fill_rows(frozen: FrozenGraph, sources: List[int], workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    if workers is not None and workers > 1 and len(sources) > 1:
+        return _fill_rows_parallel(frozen, sources, workers)
+    n = frozen.nodes_count()
+    dist = np.empty((len(sources), n), dtype=np.float64)
+    pred = np.empty((len(sources), n), dtype=np.int32)
+    for row, s in enumerate(sources):
+        d, p = dijkstra_indices(frozen, s)
+        dist[row] = d
+        pred[row] = p
+    return dist, pred
+
+
+# ----------------------------------------------------------------------------
+# Execução paralela: o grafo CSR e as matrizes de saída vivem em memória
+# partilhada; cada processo anexa-se uma única vez (initializer) e escreve as
+# suas linhas diretamente nas matrizes, sem resultados a juntar no fim. As
+# matrizes de saída são depois entregues ao resultado (_adopt_shared).
+# ----------------------------------------------------------------------------
+
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def _create_shared(arr_or_shape, dtype=None):
+    """Cria um bloco de memória partilhada e devolve (shm, array, spec)."""
+    if isinstance(arr_or_shape, np.ndarray):
+        shape, dtype = arr_or_shape.shape, arr_or_shape.dtype
+    else:
+        shape, dtype = arr_or_shape, np.dtype(dtype)
+    nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if isinstance(arr_or_shape, np.ndarray):
+        arr[...] = arr_or_shape
+    return shm, arr, (shm.name, shape, np.dtype(dtype).str)
+
+
+class _SharedOwner:
+    """
+    Dono de um bloco de memória partilhada entregue ao chamador (ver
+    _adopt_shared): expõe a memória por __array_interface__ e, sendo a base
+    de todos os arrays e vistas sobre ela, mantém o bloco mapeado enquanto
+    algum existir. O SharedMemory fecha-se quando o dono é recolhido.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, interface: dict):
+        self._shm = shm
+        self.__array_interface__ = interface
+
+
+def _adopt_shared(shm: shared_memory.SharedMemory, arr: np.ndarray) -> np.ndarray:
+    """
+    Devolve `arr` sem o copiar, como array dono do bloco: o nome é apagado
+    já (unlink), mas a memória só é libertada com o último array sobre ela.
+    Depois disto o bloco não deve ser fechado pelo chamador.
+    """
+    shm.unlink()
+    return np.asarray(_SharedOwner(shm, dict(arr.__array_interface__)))
+
+
+def _attach_shared(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _apsp_worker_init(specs: Dict[str, tuple], paged_files: Optional[Dict[str, str]] = None) -> None:
+    handles = []
+    arrays = {}
+    for key, spec in specs.items():
+        shm, arr = _attach_shared(spec)
+        handles.append(shm)
+        arrays[key] = arr
+    _WORKER_STATE['handles'] = handles
+    _WORKER_STATE['arrays'] = arrays
+    if paged_files is not None:
+        # grafo em disco: cada processo abre os mesmos ficheiros (páginas partilhadas pelo SO)
+        _WORKER_STATE['paged'] = True
+        _WORKER_STATE['lists'] = tuple(
+            np.load(paged_files[key], mmap_mode='r') for key in ('offsets', 'targets', 'weights')
+        )
+        return
+    _WORKER_STATE['paged'] = False
+    _WORKER_STATE['lists'] = (
+        arrays['offsets'].tolist(),
+        arrays['targets'].tolist(),
+        arrays['weights'].tolist(),
+    )
+
+
+def _apsp_worker_batch(rows: Tuple[int, int]) -> int:
+    offsets, targets, weights = _WORKER_STATE['lists']
+    run = _dijkstra_paged if _WORKER_STATE['paged'] else _dijkstra_csr
+    arrays = _WORKER_STATE['arrays']
+    sources, dist, pred = arrays['sources'], arrays['dist'], arrays['pred']
+    start, end = rows
+    for row in range(start, end):
+        d, p = run(offsets, targets, weights, int(sources[row]))
+        dist[row] = d
+        pred[row] = p
+    return end - start
+
+
+def _fill_rows_parallel(frozen: FrozenGraph, sources: List[int], workers: int) -> Tuple[np.ndarray, np.ndarray]:
+    n = frozen.nodes_count()
+    s = len(sources)
+    blocks = [
+        _create_shared(np.asarray(sources, dtype=np.int64)),
+        _create_shared((s, n), np.float64),
+        _create_shared((s, n), np.int32),
+    ]
+    keys = ['sources', 'dist', 'pred']
+    paged_files = None
+    if frozen.paged:
+        paged_files = {key: str(path) for key, path in frozen.files.items()}
+    else:
+        blocks += [_create_shared(frozen.offsets), _create_shared(frozen.targets), _create_shared(frozen.weights)]
+        keys += ['offsets', 'targets', 'weights']
+    specs = {key: block[2] for key, block in zip(keys, blocks)}
+    try:
+        # lotes pequenos o suficiente para equilibrar a carga entre processos
+        batch = max(1, -(-s // (workers * 4)))
+        batches = [(i, min(i + batch, s)) for i in range(0, s, batch)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_apsp_worker_init,
+            initargs=(specs, paged_files),
+        ) as pool:
+            for _ in pool.map(_apsp_worker_batch, batches):
+                pass
+        # as matrizes de saída passam a ser do resultado: sem cópia, por isso
+        # o pico de memória é uma matriz S × V de cada, não duas
+        dist = _adopt_shared(*blocks[1][:2])
+        pred = _adopt_shared(*blocks[2][:2])
+        del blocks[1:3]
+    finally:
+        for shm, _arr, _spec in blocks:
+            shm.close()
+            shm.unlink()
+    return dist, pred
+
+
+def all_pairs_shortest_paths(graph: Union[Graph, FrozenGraph], workers: Optional[int] = None) -> ShortestPathTable:
     """
     Calcula o caminho mais curto entre todos os pares de nós usando Dijkstra.
     
     Args:
         graph: O grafo a ser analisado
+        workers: Número de processos; None ou 1 corre tudo no processo atual
     
     Returns:
-        Dicionário {(origem, destino): (distância, caminho)}
-        onde caminho é uma lista de nós
+        ShortestPathTable com matrizes V × V de distâncias e predecessores;
+        consulta table.get((origem, destino)) -> (distância, caminho)
     """
-    all_paths = {}
-    
-    # Para cada nó como origem
-    for start_node in graph.nodes:
-        distances, predecessors = dijkstra(graph, start_node)
-        
-        # Para cada nó como destino
-        for end_node in graph.nodes:
-            if start_node == end_node:
-                all_paths[(start_node, end_node)] = (0, [start_node])
-            else:
-                distance = distances[end_node]
-                path = get_shortest_path(predecessors, start_node, end_node)
-                all_paths[(start_node, end_node)] = (distance, path)
-    
-    return all_paths
+    return ShortestPathTable.compute(_as_frozen(graph), workers=workers)
+
+
+def is_undirected(graph: Union[Graph, FrozenGraph]) -> bool:
+    """
+    Verifica se o grafo é simétrico, isto é, se para cada aresta (u, v, w)
+    existe também (v, u, w). É o caso quando todas as arestas foram
+    adicionadas com bidirectional=True.
+    """
+    return _as_frozen(graph).is_symmetric()
+
+
+class HospitalDistanceOracle(ShortestPathTable):
+    """
+    Oráculo de distâncias enraizado nos hospitais.
+
+    Os solvers de dp.py só consultam trajetos que começam ou terminam num
+    hospital, por isso basta uma árvore de Dijkstra por hospital em vez de
+    uma por vértice: O(H × E log V) em vez de O(V × E log V).
+
+    - (h, v): lido diretamente da linha do hospital h
+    - (v, h): em grafos não-direcionados d(v, h) = d(h, v) e o caminho é o
+      inverso; em grafos direcionados usa-se uma árvore de Dijkstra sobre o
+      grafo transposto
+
+    Expõe a mesma interface de consulta que all_pairs_shortest_paths:
+    oracle.get((u, v), default) -> (dist, path).
+    """
+
+    def __init__(self, graph: Union[Graph, FrozenGraph], hospitals: List[int], workers: Optional[int] = None):
+        frozen = _as_frozen(graph)
+        self.hospitals: List[int] = list(dict.fromkeys(hospitals))
+        table = ShortestPathTable.compute(
+            frozen, [frozen.index_of(h) for h in self.hospitals], workers=workers
+        )
+        super().__init__(
+            table.ids, table.dist, table.pred, table.sources,
+            table.symmetric, table.rdist, table.rpred,
+        )
+
+    @property
+    def undirected(self) -> bool:
+        return self.symmetric
+
+
+def hospital_shortest_paths(
+    graph: Union[Graph, FrozenGraph],
+    hospitals: List[int],
+    workers: Optional[int] = None,
+) -> HospitalDistanceOracle:
+    """
+    Calcula apenas as árvores de caminhos mais curtos enraizadas nos hospitais.
+
+    Args:
+        graph: O grafo a ser analisado
+        hospitals: IDs dos hospitais
+        workers: Número de processos (ver all_pairs_shortest_paths)
+
+    Returns:
+        HospitalDistanceOracle com consulta oracle.get((u, v)) -> (distância, caminho)
+        para qualquer par em que u ou v seja hospital
+    """
+    return HospitalDistanceOracle(graph, hospitals, workers=workers)
 
 
 def print_shortest_paths(graph: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]]):
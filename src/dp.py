@@ -1,32 +1,94 @@
-from typing import Dict, List, Tuple, Optional
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Optional
+
+import numpy as np
 
 from graph import Graph
+from instance import StartCosts, compile_instance
 
 INF = float('inf')
 
+# Maior número de pacientes candidatos para o qual o DP exato é usado por
+# defeito (as tabelas ocupam ~10 bytes por par máscara × hospital)
+DP_MAX_PATIENTS = 24
 
-def read_time_budget(path) -> Optional[float]:
-	"""Lê tempo_total de dados_iniciais.csv (se existir)."""
-	import csv
-	try:
-		with open(path, newline='', encoding='utf-8') as f:
-			rdr = csv.DictReader(f)
-			for row in rdr:
-				# formatos suportados: 'tempo_total' ou segunda coluna
-				if 'tempo_total' in row and row['tempo_total'] not in (None, ''):
-					try:
-						return float(row['tempo_total'])
-					except Exception:
-						pass
-				vals = list(row.values())
-				if len(vals) >= 2 and vals[1] not in (None, ''):
-					try:
-						return float(vals[1])
-					except Exception:
-						pass
-	except FileNotFoundError:
-		return None
-	return None
+# Idem para o DP por camadas em vários processos (maximize_priority_dp com workers > 1)
+PARALLEL_DP_MAX_PATIENTS = 26
+
+# Maior número de candidatos para o qual o DP denso é tentado com prazo (DP
+# multi-partida de main.py): as tabelas 2^P × H são alocadas por inteiro
+# antes da primeira camada (~40 MB com 20 pacientes e 4 hospitais, ~600 MB
+# com DP_MAX_PATIENTS), e acima disto a passagem raramente cabe no prazo
+# por defeito
+ANYTIME_DP_MAX_PATIENTS = 20
+
+# Pacientes a partir dos quais vale a pena dividir as camadas do DP denso por
+# processos; abaixo, o DP serial termina antes de o pool e a memória
+# partilhada estarem prontos
+PARALLEL_DP_MIN_PATIENTS = 22
+
+# Maior limite de estados viáveis (ver estimate_feasible_states) para o qual o
+# DP esparso é usado por defeito, independentemente do número de pacientes
+SPARSE_DP_MAX_STATES = 2_000_000
+
+# Meet-in-the-middle (maximize_priority_mitm): máscaras em int64, por isso no
+# máximo 64 candidatos; usado por defeito quando cada metade tem até
+# MITM_MAX_STATES subconjuntos viáveis
+MITM_MAX_PATIENTS = 64
+MITM_MAX_STATES = 500_000
+
+# Pares prefixo × sufixo avaliados por operação vetorizada na junção do MITM
+MITM_JOIN_BLOCK = 1 << 20
+
+# Limites por defeito do branch-and-bound (nós expandidos / segundos); ao
+# atingir um deles devolve a melhor rota encontrada e o limite superior provado
+BNB_NODE_LIMIT = 5_000_000
+BNB_TIME_LIMIT = 10.0
+
+# Tempo por defeito (segundos) da melhoria por LNS de uma rota heurística
+LNS_TIME_LIMIT = 0.5
+
+# Pacientes atendíveis a partir dos quais improve_route_lns usa, por
+# defeito, um processo por núcleo (abaixo, arrancar o pool custa mais do
+# que a busca ganha)
+LNS_PARALLEL_MIN_PATIENTS = 150
+
+# Máscaras por operação vetorizada dos DPs por camadas (limita a memória
+# temporária a ~DP_CHUNK × hospitais valores por operação)
+DP_CHUNK = 1 << 16
+
+# Largura por defeito do beam search (estados mantidos por camada)
+BEAM_WIDTH = 256
+
+# Tempo por defeito (milissegundos) de best_within / "melhor resposta em X ms"
+ANYTIME_TIME_LIMIT_MS = 2000
+
+# Fração do tempo restante dada ao DP esparso / MITM em solve_anytime; o
+# resto fica para o branch-and-bound se o DP exato não terminar
+ANYTIME_EXACT_SHARE = 0.5
+
+
+class SolverTimeout(Exception):
+	"""Um solver exato atingiu o deadline ou max_states antes de terminar."""
+
+
+class Incumbent(NamedTuple):
+	"""
+	Melhor solução conhecida num dado momento de solve_anytime.
+	
+	- route, priority, time: rota, prioridade total e tempo total
+	- upper_bound: limite superior provado da prioridade ótima
+	- optimal: True quando priority == upper_bound (ótimo provado)
+	- method: solver que produziu a rota ('greedy', 'beam', 'sparse', 'mitm', 'dp', 'bnb')
+	"""
+	route: List[Tuple[str, int]]
+	priority: int
+	time: float
+	upper_bound: int
+	optimal: bool
+	method: str
 
 
 def build_distance_lookup(all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], nodes: List[int]) -> Dict[Tuple[int, int], float]:
@@ -41,117 +103,1062 @@ def build_distance_lookup(all_paths: Dict[Tuple[int, int], Tuple[float, List[int
 	return dist
 
 
-def maximize_priority_dp(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int]):
+def _start_costs(g: Graph, all_paths, hospital_id: int, all_hospitals: List[int]) -> StartCosts:
+	"""Custos dos pacientes atendíveis a partir de hospital_id (instância compilada em cache)."""
+	return compile_instance(g, all_paths, all_hospitals, starts=(hospital_id,)).start(hospital_id)
+
+
+def _expired(deadline: Optional[float]) -> bool:
+	return deadline is not None and time.monotonic() > deadline
+
+
+def maximize_priority_dp(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], deadline: Optional[float] = None, max_states: Optional[int] = None, workers: Optional[int] = None):
 	"""
 	DP exato para maximizar prioridades com modelo realista:
 	- Ambulância começa em hospital_id
 	- Para cada paciente, vai ao paciente, presta serviço, e leva ao hospital mais próximo
 	- Pode terminar em qualquer hospital (não precisa voltar ao inicial)
 	
+	As máscaras são preenchidas por camadas (número de pacientes atendidos):
+	cada camada só depende da anterior e é calculada com operações NumPy
+	sobre todas as suas máscaras de uma vez, um paciente de cada vez
+	(ver _pull_layer).
+	
+	Args:
+		deadline: Instante (time.monotonic) a partir do qual desiste
+		max_states: Máximo de estados (máscara, localização) das tabelas
+		workers: Com workers > 1, as camadas são divididas por processos
+			paralelos sobre tabelas em memória partilhada
+			(ver _parallel_layered_dp); mesma rota
+	
+	Levanta SolverTimeout se um dos limites for atingido.
+	
 	Retorna (route_with_hospitals, total_priority, total_time, is_optimal=True)
 	onde route_with_hospitals = [(tipo, nid), ...] sendo tipo 'H' ou 'P'
 	"""
-	# candidatos válidos: pacientes com prioridade > 0
-	pacientes_raw = [
-		(nid, n)
-		for nid, n in g.nodes.items()
-		if getattr(n, 'tipo', '') == 'paciente'
-		and (n.prioridade or 0) > 0
-		and not getattr(n, 'resgatado', False)
-	]
+	costs = _start_costs(g, all_paths, hospital_id, all_hospitals)
 	
-	if not pacientes_raw:
-		return [('H', hospital_id)], 0, 0.0, True
-	
-	# Para cada paciente, calcula custo mínimo de atendimento
-	# (considerando hospital mais próximo para deixá-lo)
-	candidates = []  # (pid, prio, min_cost_to_serve)
-	for pid, node in pacientes_raw:
-		prio = node.prioridade or 0
-		svc = node.tempo_cuidados_minimos or 0.0
-		
-		# custo mínimo = distância até qualquer hospital + serviço + distância do paciente até qualquer hospital
-		min_cost = INF
-		for h in all_hospitals:
-			d_to_patient = all_paths.get((h, pid), (INF, []))[0]
-			d_to_hosp = all_paths.get((pid, h), (INF, []))[0]
-			if d_to_patient != INF and d_to_hosp != INF:
-				cost = d_to_patient + svc + d_to_hosp
-				min_cost = min(min_cost, cost)
-		
-		if min_cost == INF:
-			continue
-		candidates.append((pid, prio, svc, min_cost))
-	
-	n = len(candidates)
+	n = len(costs.pids)
 	if n == 0:
 		return [('H', hospital_id)], 0, 0.0, True
 	
 	# DP com TSP simplificado: estado = (máscara de pacientes visitados, último hospital)
 	# Como permitimos terminar em qualquer lugar, fazemos DP considerando sequências
-	idx_to_pid = [c[0] for c in candidates]
+	L = len(costs.locations)
+	start_li = costs.loc_index[hospital_id]
+	if max_states is not None and (1 << n) * L > max_states:
+		raise SolverTimeout(f"DP com {(1 << n) * L} estados excede max_states={max_states}")
+	if _expired(deadline):
+		# antes de alocar as tabelas densas, não só entre camadas
+		raise SolverTimeout("DP interrompido pelo deadline")
+	if workers is not None and workers > 1:
+		return _parallel_layered_dp(costs, hospital_id, time_budget, workers, deadline)
 	
-	# Implementação simplificada: subset DP onde calculamos melhor sequência
-	# Estado: dp[mask][last_hosp] = (min_time, max_prio, path)
+	# Tabelas densas indexadas [máscara, localização]:
+	# - times: menor tempo para atender `mask` terminando na localização
+	# - parent_k / parent_loc: último paciente e localização anterior, para
+	#   reconstruir apenas a rota vencedora no fim
+	# A prioridade só depende da máscara, por isso basta um vetor por máscara.
 	MAX_MASK = 1 << n
+	popcount, prio_of_mask = _mask_tables(n, costs.prio)
+	times = np.full((MAX_MASK, L), INF, dtype=np.float64)
+	parent_k = np.full((MAX_MASK, L), -1, dtype=np.int8)
+	parent_loc = np.full((MAX_MASK, L), -1, dtype=np.int8 if L < 128 else np.int16)
+	consts = _layer_consts(costs, time_budget)
 	
 	# Inicialização: começamos no hospital_id
-	dp = {}  # (mask, last_location) -> (time, prio, route)
-	dp[(0, hospital_id)] = (0.0, 0, [('H', hospital_id)])
+	times[0, start_li] = 0.0
+	
+	for layer in range(1, n + 1):
+		if _expired(deadline):
+			raise SolverTimeout("DP interrompido pelo deadline")
+		masks = np.flatnonzero(popcount == layer)
+		reached = 0
+		for lo in range(0, len(masks), DP_CHUNK):
+			reached += _pull_layer(times, parent_k, parent_loc, masks[lo:lo + DP_CHUNK], *consts)
+		if not reached:
+			break  # nenhuma máscara desta camada cabe no budget: as seguintes também não
 	
-	best_solution = (0.0, 0, [('H', hospital_id)])
+	return _dp_route(costs, hospital_id, times, parent_k, parent_loc, prio_of_mask)
+
+
+def _mask_tables(n: int, prio_of: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+	"""Número de pacientes e prioridade total de cada uma das 2^n máscaras."""
+	masks = np.arange(1 << n)
+	popcount = np.zeros(1 << n, dtype=np.uint8)
+	prio_of_mask = np.zeros(1 << n, dtype=np.int64)
+	for k in range(n):
+		has_k = (masks >> k) & 1 == 1
+		popcount += has_k
+		prio_of_mask[has_k] += prio_of[k]
+	return popcount, prio_of_mask
+
+
+def _layer_consts(costs: StartCosts, time_budget: float) -> tuple:
+	"""Argumentos constantes de _pull_layer (d_cols[k] = distâncias até ao paciente k)."""
+	return (
+		np.array(costs.d_loc, dtype=np.float64).T.copy(),
+		costs.svc,
+		costs.near_li,
+		costs.near_d,
+		time_budget,
+	)
+
+
+def _pull_layer(times: np.ndarray, parent_k: np.ndarray, parent_loc: np.ndarray, masks: np.ndarray, d_cols: np.ndarray, svc_of: List[float], best_hosp_li: List[int], best_hosp_d: List[float], time_budget: float) -> int:
+	"""
+	Preenche as linhas `masks` (todas com o mesmo número de pacientes) a partir
+	das linhas da camada anterior: para cada paciente k, todas as máscaras que
+	o contêm são tentadas de uma vez com k como último atendimento, vindo de
+	qualquer localização ([máscaras × L] numa só operação).
+	
+	Os candidatos são percorridos pela mesma ordem do DP para a frente
+	(máscara anterior crescente, i.e. k decrescente, e localização crescente)
+	e só substituem com tempo estritamente menor, por isso tempos e ponteiros
+	de pai são idênticos aos do ciclo máscara × localização × paciente.
+	
+	Retorna o número de estados (máscara, localização) atualizados.
+	"""
+	updated = 0
+	for k in range(len(svc_of) - 1, -1, -1):
+		bh = best_hosp_li[k]
+		if bh < 0:
+			continue
+		bit = 1 << k
+		sel = masks[masks & bit != 0]
+		if not len(sel):
+			continue
+		cand = times[sel ^ bit] + d_cols[k]
+		cand += svc_of[k]
+		cand += best_hosp_d[k]
+		li = np.argmin(cand, axis=1)
+		new_time = cand[np.arange(len(sel)), li]
+		ok = (new_time <= time_budget) & (new_time < times[sel, bh])
+		if ok.any():
+			rows = sel[ok]
+			times[rows, bh] = new_time[ok]
+			parent_k[rows, bh] = k
+			parent_loc[rows, bh] = li[ok]
+			updated += len(rows)
+	return updated
+
+
+def _dp_route(costs: StartCosts, hospital_id: int, times: np.ndarray, parent_k: np.ndarray, parent_loc: np.ndarray, prio_of_mask: np.ndarray):
+	"""
+	Escolhe o melhor estado (maior prioridade, depois menor tempo, depois a
+	primeira máscara/localização) e reconstrói a rota pelos ponteiros de pai.
+	"""
+	L = times.shape[1]
+	prio_grid = np.where(np.isfinite(times), prio_of_mask[:, None], -1)
+	best_prio = int(prio_grid.max())
+	flat = np.where(prio_grid == best_prio, times, INF).ravel()
+	best_mask, best_li = divmod(int(np.argmin(flat)), L)
+	best_time = float(times[best_mask, best_li])
+	
+	tail = []
+	mask, li = best_mask, best_li
+	while mask:
+		k = int(parent_k[mask, li])
+		tail.append(('H', costs.locations[li]))
+		tail.append(('P', costs.pids[k]))
+		li = int(parent_loc[mask, li])
+		mask ^= 1 << k
+	route = [('H', hospital_id)] + tail[::-1]
+	
+	return route, best_prio, best_time, True
+
+
+# ----------------------------------------------------------------------------
+# DP por camadas em paralelo: as máscaras com c pacientes só dependem das
+# máscaras com c - 1, por isso cada camada é dividida por processos que leem a
+# camada anterior e escrevem as suas linhas diretamente nas tabelas em memória
+# partilhada; o fim de cada pool.map é a barreira entre camadas.
+# ----------------------------------------------------------------------------
+
+_DP_WORKER_STATE: Dict[str, object] = {}
+
+
+def _dp_worker_init(specs: Dict[str, tuple], consts: tuple) -> None:
+	from dijkstra import _attach_shared
+	handles = []
+	arrays = {}
+	for key, spec in specs.items():
+		shm, arr = _attach_shared(spec)
+		handles.append(shm)
+		arrays[key] = arr
+	_DP_WORKER_STATE['handles'] = handles
+	_DP_WORKER_STATE['arrays'] = arrays
+	_DP_WORKER_STATE['consts'] = consts
+
+
+def _dp_worker_range(task: Tuple[int, int, int]) -> int:
+	lo, hi, layer = task
+	arrays = _DP_WORKER_STATE['arrays']
+	masks = np.flatnonzero(arrays['popcount'][lo:hi] == layer) + lo
+	reached = 0
+	for start in range(0, len(masks), DP_CHUNK):
+		reached += _pull_layer(
+			arrays['times'], arrays['parent_k'], arrays['parent_loc'],
+			masks[start:start + DP_CHUNK], *_DP_WORKER_STATE['consts']
+		)
+	return reached
+
+
+def _parallel_layered_dp(costs: StartCosts, hospital_id: int, time_budget: float, workers: int, deadline: Optional[float] = None):
+	"""
+	maximize_priority_dp com as camadas divididas por `workers` processos.
+	Tabelas times / parent_k / parent_loc [2^P × L] e a contagem de bits de
+	cada máscara vivem em memória partilhada; cada tarefa é um intervalo de
+	máscaras de uma camada. O deadline é verificado entre camadas.
+	"""
+	from dijkstra import _create_shared
+	
+	n = len(costs.pids)
+	L = len(costs.locations)
+	start_li = costs.loc_index[hospital_id]
+	MAX_MASK = 1 << n
+	popcount, prio_of_mask = _mask_tables(n, costs.prio)
+	
+	blocks = [
+		_create_shared((MAX_MASK, L), np.float64),
+		_create_shared((MAX_MASK, L), np.int8),
+		_create_shared((MAX_MASK, L), np.int8 if L < 128 else np.int16),
+		_create_shared(popcount),
+	]
+	del popcount
+	keys = ('times', 'parent_k', 'parent_loc', 'popcount')
+	specs = {key: block[2] for key, block in zip(keys, blocks)}
+	times, parent_k, parent_loc = blocks[0][1], blocks[1][1], blocks[2][1]
+	try:
+		times[...] = INF
+		parent_k[...] = -1
+		parent_loc[...] = -1
+		times[0, start_li] = 0.0
+		
+		# intervalos pequenos o suficiente para equilibrar a carga entre processos
+		chunk = max(1024, -(-MAX_MASK // (workers * 4)))
+		ranges = [(lo, min(lo + chunk, MAX_MASK)) for lo in range(0, MAX_MASK, chunk)]
+		with ProcessPoolExecutor(
+			max_workers=workers,
+			initializer=_dp_worker_init,
+			initargs=(specs, _layer_consts(costs, time_budget)),
+		) as pool:
+			for layer in range(1, n + 1):
+				if _expired(deadline):
+					raise SolverTimeout("DP paralelo interrompido pelo deadline")
+				if not sum(pool.map(_dp_worker_range, [(lo, hi, layer) for lo, hi in ranges])):
+					break
+		
+		result = _dp_route(costs, hospital_id, times, parent_k, parent_loc, prio_of_mask)
+	finally:
+		del times, parent_k, parent_loc
+		for shm, _arr, _spec in blocks:
+			shm.close()
+			shm.unlink()
+	return result
+
+
+def maximize_priority_multi_start(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], time_budget: float, all_hospitals: List[int], starts: Optional[List[int]] = None, deadline: Optional[float] = None, max_states: Optional[int] = None):
+	"""
+	DP exato resolvido uma única vez para todos os hospitais iniciais.
 	
-	for mask in range(MAX_MASK):
-		for last_loc in [hospital_id] + all_hospitals:
-			if (mask, last_loc) not in dp:
+	Em vez de avançar a partir de um hospital, calcula para trás
+	G[máscara, h] = menor tempo para atender `máscara` partindo de h:
+	
+		G[M, h] = min_{k em M} d(h, k) + serviço(k) + d(k, próximo(k)) + G[M - {k}, próximo(k)]
+	
+	Depois do primeiro paciente a ambulância está sempre no hospital mais
+	próximo desse paciente, por isso as sub-rotas G[M - {k}, ·] são partilhadas
+	por todos os pontos de partida. Estados acima do budget ficam a INF (e
+	não são estendidos). Uma passagem custa o mesmo que um maximize_priority_dp
+	e responde a todos os hospitais iniciais.
+	
+	Args:
+		starts: Hospitais iniciais (por defeito, all_hospitals)
+		deadline, max_states: Limites como em maximize_priority_dp (levanta
+			SolverTimeout ao atingi-los)
+	
+	Retorna (best, per_start):
+	- best = (hospital_inicial, route_with_hospitals, total_priority, total_time)
+	  (em caso de empate ganha o primeiro hospital de `starts`)
+	- per_start = {hospital: (route_with_hospitals, total_priority, total_time)}
+	"""
+	starts = list(dict.fromkeys(all_hospitals if starts is None else starts))
+	if not starts:
+		return (None, [], 0, 0.0), {}
+	costs = compile_instance(g, all_paths, all_hospitals, starts=starts).start(*starts)
+	n = len(costs.pids)
+	
+	idx_to_pid, prio_of, svc_of = costs.pids, costs.prio, costs.svc
+	locations, loc_index, d_loc_to_p = costs.locations, costs.loc_index, costs.d_loc
+	best_hosp_li, best_hosp_d = costs.near_li, costs.near_d
+	L = len(locations)
+	
+	if max_states is not None and (1 << n) * L > max_states:
+		raise SolverTimeout(f"DP com {(1 << n) * L} estados excede max_states={max_states}")
+	if _expired(deadline):
+		# antes de alocar as tabelas densas, não só entre camadas
+		raise SolverTimeout("DP interrompido pelo deadline")
+	
+	# Custo fixo de cada paciente depois de lá chegar (serviço + entrega)
+	tail_cost = [svc_of[k] + best_hosp_d[k] for k in range(n)]
+	
+	# Tabelas densas [máscara, localização]: G e o primeiro paciente escolhido
+	MAX_MASK = 1 << n
+	popcount, prio_of_mask = _mask_tables(n, prio_of)
+	G = np.full((MAX_MASK, L), INF, dtype=np.float64)
+	first_k = np.full((MAX_MASK, L), -1, dtype=np.int8)
+	G[0, :] = 0.0
+	d_cols = np.array(d_loc_to_p, dtype=np.float64).T.copy()
+	
+	# Camadas por número de pacientes, cada uma vetorizada sobre as suas máscaras
+	for layer in range(1, n + 1):
+		if _expired(deadline):
+			raise SolverTimeout("DP interrompido pelo deadline")
+		masks = np.flatnonzero(popcount == layer)
+		reached = 0
+		for lo in range(0, len(masks), DP_CHUNK):
+			reached += _pull_first_layer(G, first_k, masks[lo:lo + DP_CHUNK], d_cols, tail_cost, best_hosp_li, time_budget)
+		if not reached:
+			break
+	
+	per_start = {}
+	best = None
+	for h in starts:
+		li = loc_index[h]
+		col = G[:, li]
+		feasible = np.flatnonzero(col <= time_budget)
+		top = prio_of_mask[feasible].max()
+		ties = feasible[prio_of_mask[feasible] == top]
+		mask = int(ties[np.argmin(col[ties])])
+		
+		# Reconstrói a rota e soma o tempo pela ordem de visita
+		route = [('H', h)]
+		t = 0.0
+		while mask:
+			k = int(first_k[mask, li])
+			t = t + d_loc_to_p[li][k] + svc_of[k] + best_hosp_d[k]
+			li = best_hosp_li[k]
+			route.append(('P', idx_to_pid[k]))
+			route.append(('H', locations[li]))
+			mask ^= 1 << k
+		prio = int(top)
+		per_start[h] = (route, prio, t)
+		if best is None or prio > best[2] or (prio == best[2] and t < best[3]):
+			best = (h, route, prio, t)
+	
+	return best, per_start
+
+
+def _pull_first_layer(G: np.ndarray, first_k: np.ndarray, masks: np.ndarray, d_cols: np.ndarray, tail_cost: List[float], best_hosp_li: List[int], time_budget: float) -> int:
+	"""
+	Preenche as linhas `masks` (mesmo número de pacientes) de G: para cada
+	paciente k, todas as máscaras que o contêm são avaliadas de uma vez com k
+	como primeiro atendimento ([máscaras × L]). Como no ciclo escalar, k é
+	tentado por ordem crescente e só substitui com tempo estritamente menor;
+	no fim, tempos acima do budget ficam a INF.
+	
+	Retorna o número de máscaras com G finito para algum hospital.
+	"""
+	rows = G[masks]
+	args = first_k[masks]
+	for k in range(len(tail_cost)):
+		bh = best_hosp_li[k]
+		if bh < 0:
+			continue
+		bit = 1 << k
+		has_k = masks & bit != 0
+		if not has_k.any():
+			continue
+		sub = G[masks[has_k] ^ bit, bh]
+		cand = d_cols[k] + (tail_cost[k] + sub)[:, None]
+		better = cand < rows[has_k]
+		rows[has_k] = np.where(better, cand, rows[has_k])
+		args[has_k] = np.where(better, k, args[has_k])
+	over = rows > time_budget
+	rows[over] = INF
+	args[over] = -1
+	G[masks] = rows
+	first_k[masks] = args
+	return int((~over).any(axis=1).sum())
+
+
+def _max_patients_within(min_costs, time_budget: float) -> int:
+	"""Maior k tal que os k pacientes de menor min_cost ainda cabem no budget."""
+	acc = 0.0
+	k_max = 0
+	for cost in sorted(min_costs):
+		acc += cost
+		if acc > time_budget:
+			break
+		k_max += 1
+	return k_max
+
+
+def estimate_feasible_states(g: Graph, all_paths, time_budget: float, all_hospitals: List[int]) -> Tuple[int, int]:
+	"""
+	Limite superior do número de subconjuntos de pacientes que cabem no budget.
+	
+	Cada paciente custa pelo menos min_cost (ida desde um hospital, serviço e
+	entrega); se os k pacientes mais baratos já não cabem, nenhum conjunto de
+	k pacientes cabe. Retorna (num_candidatos, soma_{i<=k_max} C(P, i)).
+	"""
+	from math import comb
+	min_cost = compile_instance(g, all_paths, all_hospitals).min_cost
+	costs = min_cost[np.isfinite(min_cost)].tolist()
+	n = len(costs)
+	k_max = _max_patients_within(costs, time_budget)
+	return n, sum(comb(n, i) for i in range(k_max + 1))
+
+
+def estimate_mitm_states(g: Graph, all_paths, time_budget: float, all_hospitals: List[int]) -> Tuple[int, int]:
+	"""
+	Como estimate_feasible_states, mas para cada metade de
+	maximize_priority_mitm: só se enumeram subconjuntos com até
+	ceil(k_max / 2) pacientes. Retorna (num_candidatos, soma_{i<=ceil(k_max/2)} C(P, i)).
+	"""
+	from math import comb
+	min_cost = compile_instance(g, all_paths, all_hospitals).min_cost
+	costs = min_cost[np.isfinite(min_cost)].tolist()
+	n = len(costs)
+	half = (_max_patients_within(costs, time_budget) + 1) // 2
+	return n, sum(comb(n, i) for i in range(half + 1))
+
+
+def choose_algorithm(g: Graph, all_paths, time_budget: float, all_hospitals: List[int]) -> str:
+	"""
+	Escolha automática do solver: 'sparse' se o número de estados viáveis
+	estimado cabe em SPARSE_DP_MAX_STATES, 'dp' se há no máximo
+	DP_MAX_PATIENTS candidatos, 'mitm' se cada metade do meet-in-the-middle
+	cabe em MITM_MAX_STATES, senão 'bnb' (com limite de tempo).
+	"""
+	n, states = estimate_feasible_states(g, all_paths, time_budget, all_hospitals)
+	if states <= SPARSE_DP_MAX_STATES:
+		return 'sparse'
+	if n <= DP_MAX_PATIENTS:
+		return 'dp'
+	if n <= MITM_MAX_PATIENTS:
+		_, half_states = estimate_mitm_states(g, all_paths, time_budget, all_hospitals)
+		if half_states <= MITM_MAX_STATES:
+			return 'mitm'
+	return 'bnb'
+
+
+def maximize_priority_sparse_dp(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], deadline: Optional[float] = None, max_states: Optional[int] = None):
+	"""
+	DP exato equivalente a maximize_priority_dp, mas que só expande estados
+	alcançáveis dentro do budget.
+	
+	- Os estados (máscara, hospital) são processados camada a camada pelo
+	  número de pacientes atendidos; só se guardam a camada atual e os
+	  ponteiros de pai dos estados efetivamente alcançados
+	- Em cada (máscara, hospital) só sobrevive o rótulo não-dominado: a
+	  prioridade é a soma da máscara, por isso fica o de menor tempo
+	- Os pacientes são tentados por ordem de custo a partir de cada hospital;
+	  quando o tempo decorrido mais o atendimento mais barato restante excede
+	  o budget, o estado deixa de ser expandido
+	
+	Em instâncias limitadas pelo budget só uma pequena fração das 2^P
+	máscaras é viável. Com `deadline` (time.monotonic) ou `max_states`
+	(estados alcançados) levanta SolverTimeout ao atingir o limite.
+	
+	Retorna (route_with_hospitals, total_priority, total_time, True).
+	"""
+	costs = _start_costs(g, all_paths, hospital_id, all_hospitals)
+	n = len(costs.pids)
+	if n == 0:
+		return [('H', hospital_id)], 0, 0.0, True
+	
+	idx_to_pid, prio_of, svc_of = costs.pids, costs.prio, costs.svc
+	locations, loc_index, d_loc_to_p = costs.locations, costs.loc_index, costs.d_loc
+	best_hosp_li, best_hosp_d = costs.near_li, costs.near_d
+	start_li = loc_index[hospital_id]
+	
+	# Para cada localização, pacientes ordenados pelo custo de atendimento a partir dela
+	eps = 1e-9 * max(1.0, abs(time_budget))
+	by_cost = []
+	for li in range(len(locations)):
+		row = []
+		for k in range(n):
+			if best_hosp_li[k] < 0 or d_loc_to_p[li][k] == INF:
 				continue
+			row.append((d_loc_to_p[li][k] + svc_of[k] + best_hosp_d[k], k))
+		row.sort()
+		by_cost.append(row)
+	
+	layer = {(0, start_li): (0.0, 0)}  # (mask, li) -> (time, prio)
+	parent = {}  # (mask, li) -> (k, li_anterior)
+	best_time, best_prio, best_key = 0.0, 0, (0, start_li)
+	
+	while layer:
+		next_layer = {}
+		for i, key in enumerate(sorted(layer)):
+			if i & 1023 == 0 and _expired(deadline):
+				raise SolverTimeout("DP esparso interrompido pelo deadline")
+			curr_time, curr_prio = layer[key]
+			mask, li = key
 			
-			curr_time, curr_prio, curr_route = dp[(mask, last_loc)]
-			
-			# Atualiza melhor solução global
-			if curr_prio > best_solution[1] or (curr_prio == best_solution[1] and curr_time < best_solution[0]):
-				best_solution = (curr_time, curr_prio, curr_route)
+			# Melhor solução global (desempate igual ao DP denso: menor máscara/localização)
+			if (curr_prio > best_prio
+					or (curr_prio == best_prio and curr_time < best_time)
+					or (curr_prio == best_prio and curr_time == best_time and key < best_key)):
+				best_time, best_prio, best_key = curr_time, curr_prio, key
 			
-			# Tenta adicionar próximo paciente
-			for k in range(n):
+			d_row = d_loc_to_p[li]
+			for cost, k in by_cost[li]:
+				if curr_time + cost > time_budget + eps:
+					break  # todos os restantes são ainda mais caros
 				if mask & (1 << k):
 					continue
-				
-				pid = idx_to_pid[k]
-				prio = candidates[k][1]
-				svc = candidates[k][2]
-				
-				# Distância de last_loc até paciente
-				d_to_p = all_paths.get((last_loc, pid), (INF, []))[0]
-				if d_to_p == INF:
+				new_time = curr_time + d_row[k] + svc_of[k] + best_hosp_d[k]
+				if new_time > time_budget:
 					continue
-				
-				# Encontra melhor hospital para levar o paciente
-				best_hosp = None
-				best_d = INF
-				for h in all_hospitals:
-					d_p_to_h = all_paths.get((pid, h), (INF, []))[0]
-					if d_p_to_h < best_d:
-						best_d = d_p_to_h
-						best_hosp = h
-				
-				if best_hosp is None:
+				new_key = (mask | (1 << k), best_hosp_li[k])
+				current = next_layer.get(new_key)
+				if current is None or new_time < current[0]:
+					next_layer[new_key] = (new_time, curr_prio + prio_of[k])
+					parent[new_key] = (k, li)
+		if max_states is not None and len(parent) > max_states:
+			raise SolverTimeout(f"DP esparso excede max_states={max_states}")
+		layer = next_layer
+	
+	# Reconstrói a rota seguindo os ponteiros de pai
+	tail = []
+	mask, li = best_key
+	while mask:
+		k, prev_li = parent[(mask, li)]
+		tail.append(('H', locations[li]))
+		tail.append(('P', idx_to_pid[k]))
+		mask ^= 1 << k
+		li = prev_li
+	route = [('H', hospital_id)] + tail[::-1]
+	
+	return route, best_prio, best_time, True
+
+# ----------------------------------------------------------------------------
+# Meet-in-the-middle: cada rota com k pacientes é partida na posição ceil(k/2)
+# num prefixo (a partir do hospital inicial) e num sufixo (a partir do
+# hospital onde o prefixo termina), cada um com no máximo metade dos
+# pacientes que cabem no budget. Os dois lados são enumerados camada a camada
+# e depois combinados por hospital de junção.
+# ----------------------------------------------------------------------------
+
+class _MitmStates(NamedTuple):
+	"""
+	Estados de um dos lados do meet-in-the-middle (arrays paralelos).
+	
+	- mask: pacientes servidos (int64)
+	- li: localização onde o prefixo termina / onde o sufixo começa
+	- time, prio: tempo mínimo e prioridade dos pacientes da máscara
+	- parent: índice do estado com um paciente a menos (-1 na camada 0)
+	- k: paciente acrescentado (último do prefixo / primeiro do sufixo)
+	"""
+	mask: np.ndarray
+	li: np.ndarray
+	time: np.ndarray
+	prio: np.ndarray
+	parent: np.ndarray
+	k: np.ndarray
+
+
+def _keep_fastest(states: _MitmStates, deadline: Optional[float] = None) -> _MitmStates:
+	"""
+	Fica só o estado de menor tempo por (máscara, localização). Ordena por
+	localização e depois cada localização por (máscara, tempo), verificando o
+	deadline entre localizações.
+	"""
+	li = states.li.astype(np.int16) if len(states.li) and states.li.max() < np.iinfo(np.int16).max else states.li
+	by_li = np.argsort(li, kind='stable')
+	li = li[by_li]
+	cuts = np.flatnonzero(li[1:] != li[:-1]) + 1
+	kept = []
+	for lo, hi in zip(np.concatenate(([0], cuts)).tolist(), np.concatenate((cuts, [len(li)])).tolist()):
+		if _expired(deadline):
+			raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+		sub = by_li[lo:hi]
+		order = sub[np.lexsort((states.time[sub], states.mask[sub]))]
+		mask = states.mask[order]
+		first = np.ones(len(order), dtype=bool)
+		first[1:] = mask[1:] != mask[:-1]
+		idx = np.sort(order[first])
+		kept.append(_MitmStates(*(arr[idx] for arr in states)))
+	return _concat_states(kept) if kept else states
+
+
+def _concat_states(parts: List[_MitmStates]) -> _MitmStates:
+	return _MitmStates(*(np.concatenate(arrs) for arrs in zip(*parts)))
+
+
+def _mitm_forward_layer(layer: _MitmStates, offset: int, leg: np.ndarray, near_li: np.ndarray, bits: np.ndarray, prio_of: np.ndarray, time_budget: float, deadline: Optional[float] = None) -> _MitmStates:
+	"""Prefixos com mais um paciente no fim (leg[li, k] = ida, serviço e entrega)."""
+	parts = []
+	for lo in range(0, len(layer.mask), DP_CHUNK):
+		if _expired(deadline):
+			raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+		m = layer.mask[lo:lo + DP_CHUNK]
+		cand = layer.time[lo:lo + DP_CHUNK, None] + leg[layer.li[lo:lo + DP_CHUNK]]
+		rows, ks = np.nonzero((m[:, None] & bits == 0) & (cand <= time_budget))
+		parts.append(_MitmStates(
+			m[rows] | bits[ks],
+			near_li[ks],
+			cand[rows, ks],
+			layer.prio[lo + rows] + prio_of[ks],
+			rows + (lo + offset),
+			ks,
+		))
+	if _expired(deadline):
+		raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+	return _keep_fastest(_concat_states(parts), deadline)
+
+
+def _mitm_backward_layer(layer: _MitmStates, offset: int, leg: np.ndarray, near_li: np.ndarray, bits: np.ndarray, prio_of: np.ndarray, time_budget: float, deadline: Optional[float] = None) -> _MitmStates:
+	"""
+	Sufixos com mais um paciente no início: k só pode preceder um sufixo que
+	começa no seu hospital de entrega, e o novo sufixo pode começar em
+	qualquer localização.
+	"""
+	parts = []
+	for lo in range(0, len(layer.mask), DP_CHUNK):
+		if _expired(deadline):
+			raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+		m = layer.mask[lo:lo + DP_CHUNK]
+		rows, ks = np.nonzero((m[:, None] & bits == 0) & (near_li[None, :] == layer.li[lo:lo + DP_CHUNK, None]))
+		cand = layer.time[lo + rows, None] + leg[:, ks].T  # [pares × L]
+		pair, lis = np.nonzero(cand <= time_budget)
+		rows, ks = rows[pair], ks[pair]
+		parts.append(_MitmStates(
+			m[rows] | bits[ks],
+			lis,
+			cand[pair, lis],
+			layer.prio[lo + rows] + prio_of[ks],
+			rows + (lo + offset),
+			ks,
+		))
+	if _expired(deadline):
+		raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+	return _keep_fastest(_concat_states(parts), deadline)
+
+
+def _mitm_enumerate(first: _MitmStates, depth: int, expand, consts: tuple, deadline: Optional[float], max_states: Optional[int], counted: int) -> _MitmStates:
+	"""Camadas 0..depth de um dos lados, concatenadas (parent indexa o resultado)."""
+	layers = [first]
+	offset, total = 0, len(first.mask)
+	while len(layers) <= depth and len(layers[-1].mask):
+		if _expired(deadline):
+			raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+		layer = expand(layers[-1], offset, *consts, deadline=deadline)
+		if _expired(deadline):
+			raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+		offset = total
+		total += len(layer.mask)
+		if max_states is not None and counted + total > max_states:
+			raise SolverTimeout(f"Meet-in-the-middle excede max_states={max_states}")
+		layers.append(layer)
+	return _concat_states(layers)
+
+
+def _mitm_side_bound(side: _MitmStates, sel: np.ndarray, other: _MitmStates, other_sel: np.ndarray, time_budget: float) -> np.ndarray:
+	"""
+	Para cada estado `sel` de um lado, a sua prioridade mais a maior
+	prioridade de `other_sel` que cabe no tempo restante (sem exigir
+	máscaras disjuntas).
+	"""
+	by_time = other_sel[np.argsort(other.time[other_sel], kind='stable')]
+	best_upto = np.maximum.accumulate(other.prio[by_time])
+	fits = np.searchsorted(other.time[by_time], time_budget - side.time[sel], side='right')
+	return side.prio[sel] + np.where(fits > 0, best_upto[np.maximum(fits - 1, 0)], -1)
+
+
+def maximize_priority_mitm(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], deadline: Optional[float] = None, max_states: Optional[int] = None, initial: Optional[Tuple[List[Tuple[str, int]], int, float]] = None):
+	"""
+	Solver exato meet-in-the-middle para conjuntos médios de pacientes
+	(demasiados para as 2^P máscaras de maximize_priority_dp).
+	
+	- Se no máximo k_max pacientes cabem no budget (ver estimate_feasible_states),
+	  qualquer rota com k pacientes é um prefixo com ceil(k/2) pacientes a
+	  partir de hospital_id seguido de um sufixo com floor(k/2) pacientes que
+	  começa no hospital onde o prefixo termina
+	- Enumeram-se, camada a camada e vetorizados, os prefixos com até
+	  ceil(k_max/2) pacientes e os sufixos com até floor(k_max/2) a partir de
+	  cada localização; por (máscara, localização) só fica o de menor tempo
+	  (a prioridade só depende da máscara)
+	- Junção por localização: prefixos por prioridade decrescente contra os
+	  sufixos também ordenados por prioridade; para cada bloco de prefixos só
+	  se olha para os sufixos que ainda podem igualar o melhor total
+	  (pesquisa binária), e a varredura para quando nenhum pode
+	
+	Cada lado tem no máximo soma_{i<=ceil(k_max/2)} C(P, i) estados por
+	localização (estimate_mitm_states), a raiz quadrada aproximada do DP
+	esparso. Com `deadline` (time.monotonic) ou `max_states` (estados dos
+	dois lados) levanta SolverTimeout ao atingir o limite.
+	
+	Args:
+		initial: (route_with_hospitals, total_priority, total_time) de uma
+			rota viável já conhecida (por defeito a de greedy_maximize_priority);
+			a junção só procura pares melhores e, se não houver, devolve-a
+	
+	Retorna (route_with_hospitals, total_priority, total_time, True).
+	"""
+	costs = _start_costs(g, all_paths, hospital_id, all_hospitals)
+	n = len(costs.pids)
+	if n == 0:
+		return [('H', hospital_id)], 0, 0.0, True
+	if n > MITM_MAX_PATIENTS:
+		raise ValueError(f"Meet-in-the-middle suporta no máximo {MITM_MAX_PATIENTS} pacientes (recebeu {n})")
+	
+	L = len(costs.locations)
+	start_li = costs.loc_index[hospital_id]
+	near_li = np.array(costs.near_li, dtype=np.int64)
+	prio_of = np.array(costs.prio, dtype=np.int64)
+	bits = np.left_shift(np.int64(1), np.arange(n, dtype=np.int64))
+	# leg[li, k]: ir de li ao paciente k, atendê-lo e entregá-lo
+	leg = np.array(costs.d_loc, dtype=np.float64) + (np.array(costs.svc) + np.array(costs.near_d))[None, :]
+	consts = (leg, near_li, bits, prio_of, time_budget)
+	
+	k_max = _max_patients_within(costs.min_cost, time_budget)
+	empty = np.full(1, -1, dtype=np.int64)
+	fwd = _mitm_enumerate(
+		_MitmStates(np.zeros(1, dtype=np.int64), np.array([start_li]), np.zeros(1), np.zeros(1, dtype=np.int64), empty, empty),
+		(k_max + 1) // 2, _mitm_forward_layer, consts, deadline, max_states, 0,
+	)
+	back = _mitm_enumerate(
+		_MitmStates(np.zeros(L, dtype=np.int64), np.arange(L), np.zeros(L), np.zeros(L, dtype=np.int64), np.full(L, -1), np.full(L, -1)),
+		k_max // 2, _mitm_backward_layer, consts, deadline, max_states, len(fwd.mask),
+	)
+	
+	# Junção: maior prioridade total, depois menor tempo; o incumbente
+	# inicial poda a varredura desde o primeiro bloco
+	if initial is None:
+		initial = greedy_maximize_priority(g, all_paths, hospital_id, time_budget, all_hospitals)[:3]
+	best_route, best_prio, best_time = initial
+	best_f = best_b = -1
+	for li in range(L):
+		if _expired(deadline):
+			raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+		f_sel = np.flatnonzero(fwd.li == li)
+		b_sel = np.flatnonzero(back.li == li)
+		if not len(f_sel) or not len(b_sel):
+			continue
+		# Limite de cada lado ignorando a disjunção: a sua prioridade mais a
+		# maior do outro lado que cabe no tempo restante (máximo acumulado
+		# por tempo); quem não chega a best_prio sai antes da varredura
+		f_ub = _mitm_side_bound(fwd, f_sel, back, b_sel, time_budget)
+		b_ub = _mitm_side_bound(back, b_sel, fwd, f_sel, time_budget)
+		f_sel, f_ub = f_sel[f_ub >= best_prio], f_ub[f_ub >= best_prio]
+		b_sel = b_sel[b_ub >= best_prio]
+		if not len(f_sel) or not len(b_sel):
+			continue
+		order = np.lexsort((fwd.time[f_sel], -fwd.prio[f_sel], -f_ub))
+		f_sel, f_ub = f_sel[order], f_ub[order]
+		b_sel = b_sel[np.lexsort((back.time[b_sel], -back.prio[b_sel]))]
+		b_mask, b_time, b_prio = back.mask[b_sel], back.time[b_sel], back.prio[b_sel]
+		neg_b_prio = -b_prio
+		f_prio_left = np.maximum.accumulate(fwd.prio[f_sel][::-1])[::-1]  # máximo de f_sel[lo:]
+		lo = 0
+		while lo < len(f_sel) and f_ub[lo] >= best_prio:
+			if _expired(deadline):
+				raise SolverTimeout("Meet-in-the-middle interrompido pelo deadline")
+			# só sufixos com prioridade >= best_prio - prefixo podem igualar o melhor
+			cnt = int(np.searchsorted(neg_b_prio, f_prio_left[lo] - best_prio, side='right'))
+			if cnt == 0:
+				break
+			# bloco de prefixos × sufixos [bloco × cnt] com ~MITM_JOIN_BLOCK pares
+			f = f_sel[lo:lo + max(1, MITM_JOIN_BLOCK // cnt)]
+			lo += len(f)
+			total = fwd.time[f, None] + b_time[None, :cnt]
+			prio = fwd.prio[f, None] + b_prio[None, :cnt]
+			ok = (fwd.mask[f, None] & b_mask[None, :cnt] == 0) & (total <= time_budget)
+			ok &= (prio > best_prio) | ((prio == best_prio) & (total < best_time))
+			if not ok.any():
+				continue
+			prio = np.where(ok, prio, -1)
+			top = int(prio.max())
+			flat = int(np.argmin(np.where(prio == top, total, INF)))
+			i, j = divmod(flat, cnt)
+			best_prio, best_time = top, float(total[i, j])
+			best_f, best_b = int(f[i]), int(b_sel[j])
+	if best_f < 0:
+		return best_route, best_prio, best_time, True
+	
+	# Reconstrói: prefixo pelos pais (do fim para o início), depois o sufixo
+	seq = []
+	f = best_f
+	while fwd.parent[f] >= 0:
+		seq.append(int(fwd.k[f]))
+		f = int(fwd.parent[f])
+	seq.reverse()
+	b = best_b
+	while back.parent[b] >= 0:
+		seq.append(int(back.k[b]))
+		b = int(back.parent[b])
+	route = [('H', hospital_id)]
+	for k in seq:
+		route.append(('P', costs.pids[k]))
+		route.append(('H', costs.locations[costs.near_li[k]]))
+	
+	return route, best_prio, best_time, True
+
+
+def _bound_order(prio_of: List[int], lb: List[float]) -> List[int]:
+	"""Pacientes por razão prioridade/custo mínimo decrescente (custo 0 primeiro)."""
+	return sorted(range(len(lb)), key=lambda k: (lb[k] > 0, -prio_of[k] / lb[k] if lb[k] > 0 else 0.0))
+
+
+def _knapsack_bound(order: List[int], prio_of: List[int], lb: List[float], mask: int, capacity: float) -> float:
+	"""
+	Mochila fracionária sobre os pacientes fora de `mask`.
+	
+	Cada atendimento custa pelo menos lb[k] (ida desde o hospital mais
+	favorável, serviço e entrega no hospital mais próximo), por isso a soma
+	das prioridades que ainda cabem em `capacity` não excede este valor.
+	Pacientes com lb[k] > capacity não cabem sozinhos e são ignorados.
+	"""
+	bound = 0.0
+	left = capacity
+	for k in order:
+		if mask >> k & 1:
+			continue
+		cost = lb[k]
+		if cost > capacity:
+			continue
+		if cost <= left:
+			bound += prio_of[k]
+			left -= cost
+		else:
+			bound += prio_of[k] * left / cost
+			break
+	return bound
+
+
+def priority_upper_bound(g: Graph, all_paths, time_budget: float, all_hospitals: List[int], starts: Iterable[int] = ()) -> int:
+	"""
+	Limite superior da prioridade total atingível com o budget (mochila
+	fracionária sobre o custo mínimo de cada paciente), válido para
+	qualquer hospital inicial de all_hospitals ou de `starts`. Usado para
+	reportar o gap da heurística.
+	
+	Um hospital inicial que não é de entrega tem de estar em `starts`: a
+	primeira ida parte dele e pode ser mais curta do que a partir de
+	qualquer hospital de entrega.
+	"""
+	inst = compile_instance(g, all_paths, all_hospitals, starts=starts)
+	servable = np.isfinite(inst.min_cost)
+	prio_of = inst.prio[servable].tolist()
+	lb = inst.min_cost[servable].tolist()
+	return int(_knapsack_bound(_bound_order(prio_of, lb), prio_of, lb, 0, time_budget) + 1e-9)
+
+
+def branch_and_bound_maximize_priority(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], node_limit: Optional[int] = BNB_NODE_LIMIT, time_limit: Optional[float] = BNB_TIME_LIMIT, initial: Optional[Tuple[List[Tuple[str, int]], int, float]] = None, on_improve: Optional[Callable[[List[Tuple[str, int]], int, float], None]] = None):
+	"""
+	Branch-and-bound exato sobre sequências de atendimentos (mesmo modelo
+	que maximize_priority_dp).
+	
+	- Incumbente inicial: `initial` ou o resultado de greedy_maximize_priority
+	- Limite superior de cada nó: prioridade acumulada + mochila fracionária
+	  sobre o custo mínimo dos pacientes restantes (_knapsack_bound)
+	- Busca em profundidade, filhos com maior limite primeiro; nós cujo
+	  limite não supera o incumbente são podados
+	- Estados (máscara, hospital) já expandidos com tempo menor ou igual são
+	  dominados e ignorados
+	
+	A prova de otimalidade é sobre a prioridade; entre rotas de igual
+	prioridade a devolvida não é necessariamente a mais curta.
+	
+	Args:
+		node_limit: Máximo de nós expandidos (None = sem limite)
+		time_limit: Máximo de segundos de busca (None = sem limite)
+		initial: (route_with_hospitals, total_priority, total_time) de uma
+			rota viável já conhecida, usada como incumbente inicial
+		on_improve: Chamado com (route_with_hospitals, total_priority,
+			total_time) sempre que a busca encontra um incumbente melhor
+	
+	Retorna (route_with_hospitals, total_priority, total_time, lower_bound, upper_bound);
+	lower_bound == upper_bound quando a rota é ótima provada.
+	"""
+	search = _branch_and_bound(g, all_paths, hospital_id, time_budget, all_hospitals, node_limit, time_limit, initial)
+	while True:
+		try:
+			route, prio, t = next(search)
+		except StopIteration as done:
+			return done.value
+		if on_improve is not None:
+			on_improve(route, prio, t)
+
+
+def _trail_route(hospital_id: int, trail, locations: List[int], idx_to_pid: List[int]) -> List[Tuple[str, int]]:
+	"""Rota [('H', h), ('P', p), ('H', h2), ...] a partir de um trilho (k, localização, trilho_pai)."""
+	tail = []
+	while trail is not None:
+		k, li, trail = trail
+		tail.append(('H', locations[li]))
+		tail.append(('P', idx_to_pid[k]))
+	return [('H', hospital_id)] + tail[::-1]
+
+
+def _branch_and_bound(g: Graph, all_paths, hospital_id: int, time_budget: float, all_hospitals: List[int], node_limit: Optional[int], time_limit: Optional[float], initial: Optional[Tuple[List[Tuple[str, int]], int, float]]):
+	"""
+	Busca de branch_and_bound_maximize_priority como gerador: produz
+	(route_with_hospitals, total_priority, total_time) a cada melhoria do
+	incumbente e devolve o resultado final no StopIteration. solve_anytime
+	consome-o diretamente para gerar cada melhoria como Incumbent.
+	"""
+	costs = _start_costs(g, all_paths, hospital_id, all_hospitals)
+	n = len(costs.pids)
+	if n == 0:
+		return [('H', hospital_id)], 0, 0.0, 0, 0
+	
+	idx_to_pid, prio_of, svc_of, lb = costs.pids, costs.prio, costs.svc, costs.min_cost
+	locations, loc_index, d_loc_to_p = costs.locations, costs.loc_index, costs.d_loc
+	best_hosp_li, best_hosp_d = costs.near_li, costs.near_d
+	start_li = loc_index[hospital_id]
+	order = _bound_order(prio_of, lb)
+	
+	# Incumbente inicial dado ou a partir da heurística gananciosa
+	if initial is not None:
+		best_route, best_prio, best_time = initial
+	else:
+		best_route, best_prio, best_time, _ = greedy_maximize_priority(
+			g, all_paths, hospital_id, time_budget, all_hospitals
+		)
+	best_trail = None
+	
+	# Entrada da pilha: (limite, tempo, prioridade, máscara, localização, trilho);
+	# trilho = (k, localização, trilho_pai) para reconstruir a rota
+	root_bound = int(_knapsack_bound(order, prio_of, lb, 0, time_budget) + 1e-9)
+	stack = [(root_bound, 0.0, 0, 0, start_li, None)]
+	seen = {}  # (mask, li) -> menor tempo já expandido
+	expanded = 0
+	limited = False
+	deadline = time.monotonic() + time_limit if time_limit is not None else None
+	
+	while stack:
+		if node_limit is not None and expanded >= node_limit:
+			limited = True
+			break
+		if deadline is not None and expanded & 1023 == 0 and time.monotonic() > deadline:
+			limited = True
+			break
+		
+		bound, curr_time, curr_prio, mask, li, trail = stack.pop()
+		if bound <= best_prio:
+			continue
+		key = (mask, li)
+		prev_time = seen.get(key)
+		if prev_time is not None and prev_time <= curr_time:
+			continue
+		seen[key] = curr_time
+		expanded += 1
+		
+		d_row = d_loc_to_p[li]
+		children = []
+		for k in range(n):
+			if mask >> k & 1 or best_hosp_li[k] < 0:
+				continue
+			new_time = curr_time + d_row[k] + svc_of[k] + best_hosp_d[k]
+			if new_time > time_budget:
+				continue
+			new_prio = curr_prio + prio_of[k]
+			new_mask = mask | (1 << k)
+			new_li = best_hosp_li[k]
+			new_trail = (k, new_li, trail)
+			if new_prio > best_prio or (new_prio == best_prio and new_time < best_time):
+				best_prio, best_time, best_trail = new_prio, new_time, new_trail
+				yield _trail_route(hospital_id, best_trail, locations, idx_to_pid), best_prio, best_time
+			child_bound = new_prio + int(
+				_knapsack_bound(order, prio_of, lb, new_mask, time_budget - new_time) + 1e-9
+			)
+			if child_bound > best_prio:
+				children.append((child_bound, new_time, new_prio, new_mask, new_li, new_trail))
+		children.sort(key=lambda c: c[0])
+		stack.extend(children)
+	
+	if best_trail is not None:
+		best_route = _trail_route(hospital_id, best_trail, locations, idx_to_pid)
+	
+	upper = best_prio
+	if limited:
+		upper = max([best_prio] + [entry[0] for entry in stack])
+	return best_route, best_prio, best_time, best_prio, upper
+
+
+def beam_search_maximize_priority(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], width: int = BEAM_WIDTH, deadline: Optional[float] = None):
+	"""
+	Beam search sobre o mesmo estado do DP (pacientes atendidos, hospital
+	atual, tempo decorrido), camada a camada pelo número de atendimentos.
+	
+	- Cada estado é estendido com todos os pacientes que ainda cabem no budget
+	- Estados equivalentes (mesma máscara e hospital) ficam com o menor tempo
+	- Mantêm-se os `width` melhores por prioridade alcançável (prioridade
+	  acumulada + mochila fracionária sobre o tempo que resta, como no
+	  branch-and-bound); em caso de empate ganha o de maior pontuação
+	  gananciosa do último passo (prioridade/custo com os bónus de
+	  greedy_maximize_priority) e depois o de menor tempo
+	
+	A largura troca tempo por qualidade: com width >= número de estados
+	viáveis equivale ao DP exato. O custo é O(width × P × P) por camada.
+	Com `deadline` (time.monotonic) pára entre camadas e devolve a melhor
+	rota completa até aí.
+	
+	Retorna (route_with_hospitals, total_priority, total_time, False)
+	"""
+	costs = _start_costs(g, all_paths, hospital_id, all_hospitals)
+	n = len(costs.pids)
+	if n == 0:
+		return [('H', hospital_id)], 0, 0.0, False
+	
+	idx_to_pid, prio_of, svc_of = costs.pids, costs.prio, costs.svc
+	locations, loc_index, d_loc_to_p = costs.locations, costs.loc_index, costs.d_loc
+	best_hosp_li, best_hosp_d = costs.near_li, costs.near_d
+	start_li = loc_index[hospital_id]
+	bonus = [1.5 if p >= 80 else 1.3 if p >= 60 else 1.1 if p >= 40 else 1.0 for p in prio_of]
+	lb = costs.min_cost
+	order = _bound_order(prio_of, lb)
+	
+	def rank(item):
+		# prioridade alcançável: acumulada + mochila fracionária no tempo restante
+		(mask, _li), (new_time, new_prio, score, _trail) = item
+		potential = new_prio + _knapsack_bound(order, prio_of, lb, mask, time_budget - new_time)
+		return (-potential, -score, new_time)
+	
+	# Estado: (mask, li) -> (tempo, prioridade, pontuação, trilho); trilho = (k, li, trilho_pai)
+	layer = {(0, start_li): (0.0, 0, 0.0, None)}
+	best_time, best_prio, best_trail = 0.0, 0, None
+	
+	while layer and not _expired(deadline):
+		next_layer = {}
+		for (mask, li), (curr_time, curr_prio, _score, trail) in layer.items():
+			time_left = time_budget - curr_time
+			d_row = d_loc_to_p[li]
+			for k in range(n):
+				if mask >> k & 1 or best_hosp_li[k] < 0:
 					continue
-				
-				new_time = curr_time + d_to_p + svc + best_d
+				new_time = curr_time + d_row[k] + svc_of[k] + best_hosp_d[k]
 				if new_time > time_budget:
 					continue
-				
-				new_prio = curr_prio + prio
-				new_mask = mask | (1 << k)
-				new_route = curr_route + [('P', pid), ('H', best_hosp)]
-				
-				# Atualiza DP se encontramos melhor solução para este estado
-				key = (new_mask, best_hosp)
-				if key not in dp or new_prio > dp[key][1] or (new_prio == dp[key][1] and new_time < dp[key][0]):
-					dp[key] = (new_time, new_prio, new_route)
-	
-	return best_solution[2], best_solution[1], best_solution[0], True
+				cost = new_time - curr_time
+				score = (prio_of[k] / cost if cost > 0 else prio_of[k] * 1000.0) * bonus[k]
+				score *= 1.0 - (cost / time_left) * 0.3 if time_left > 0 else 1.0
+				key = (mask | (1 << k), best_hosp_li[k])
+				current = next_layer.get(key)
+				if current is None or new_time < current[0]:
+					next_layer[key] = (new_time, curr_prio + prio_of[k], score, (k, best_hosp_li[k], trail))
+		
+		if len(next_layer) > width:
+			next_layer = dict(sorted(next_layer.items(), key=rank)[:width])
+		
+		for new_time, new_prio, _score, trail in next_layer.values():
+			if new_prio > best_prio or (new_prio == best_prio and new_time < best_time):
+				best_time, best_prio, best_trail = new_time, new_prio, trail
+		layer = next_layer
+	
+	tail = []
+	while best_trail is not None:
+		k, li, best_trail = best_trail
+		tail.append(('H', locations[li]))
+		tail.append(('P', idx_to_pid[k]))
+	route = [('H', hospital_id)] + tail[::-1]
+	return route, best_prio, best_time, False
+
 
 def greedy_maximize_priority(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int]):
     """
@@ -161,138 +1168,490 @@ def greedy_maximize_priority(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[fl
     - Prioriza pacientes críticos e eficiência espacial
     - Pode terminar em qualquer hospital
     
+    Cada passo pontua todos os candidatos de uma vez com NumPy sobre a
+    matriz hospital × paciente de custos de atendimento. O lookahead (quantos
+    pacientes continuam alcançáveis a partir do hospital de entrega) lê
+    contagens acumuladas sobre os custos ordenados de cada hospital, que são
+    atualizadas quando um paciente sai; cada passo custa O(P log P) em vez
+    de O(P²) em Python.
+    
     Retorna (route_with_hospitals, total_prio, total_time, False)
     """
-    pacientes_raw = [
-        (nid, n)
-        for nid, n in g.nodes.items()
-        if getattr(n, 'tipo', '') == 'paciente'
-        and (n.prioridade or 0) > 0
-        and not getattr(n, 'resgatado', False)
-    ]
+    inst = compile_instance(g, all_paths, all_hospitals, starts=(hospital_id,))
+    route = [('H', hospital_id)]
+    cols = np.flatnonzero(inst.near_h >= 0)
+    if cols.size == 0:
+        return route, 0, 0.0, False
     
-    if not pacientes_raw:
-        return [('H', hospital_id)], 0, 0.0, False
+    # Pré-calcula informações de todos os pacientes com hospital de entrega
+    P = cols.size
+    H = len(inst.hospitals)
+    pids = [inst.patients[c] for c in cols.tolist()]
+    prio = inst.prio[cols]
+    svc = inst.svc[cols]
+    best_h = inst.near_h[cols]
+    d_to_h = inst.near_d[cols]
+    dist = inst.dist_hp[:, cols]
     
-    # Pré-calcula informações de todos os pacientes
-    patient_info = {}
-    for pid, node in pacientes_raw:
-        prio = node.prioridade or 0
-        svc = node.tempo_cuidados_minimos or 0.0
-        
-        # Encontra hospital mais próximo
-        min_d_to_h = INF
-        best_h = None
-        for h in all_hospitals:
-            d_p_to_h = all_paths.get((pid, h), (INF, []))[0]
-            if d_p_to_h < min_d_to_h:
-                min_d_to_h = d_p_to_h
-                best_h = h
-        
-        if best_h is not None and min_d_to_h != INF:
-            patient_info[pid] = {
-                'prio': prio,
-                'service': svc,
-                'best_hospital': best_h,
-                'dist_to_hospital': min_d_to_h
-            }
+    # serve[h, q]: custo de atender q partindo do hospital h (ida, serviço e entrega)
+    serve = dist[:H] + svc + d_to_h
+    
+    # Custos ordenados por hospital e contagens/prioridades acumuladas dos
+    # pacientes ainda por atender (reach_count[h, i] = vivos entre os i mais baratos)
+    order = np.argsort(serve, axis=1, kind='stable')
+    sorted_cost = np.take_along_axis(serve, order, axis=1)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(P)[None, :].repeat(H, axis=0), axis=1)
+    reach_count = np.zeros((H, P + 1), dtype=np.int64)
+    reach_count[:, 1:] = np.arange(1, P + 1)
+    reach_prio = np.zeros((H, P + 1), dtype=np.int64)
+    reach_prio[:, 1:] = np.cumsum(prio[order], axis=1)
+    
+    # Bonus para alta prioridade (exponencial para prioridades > 80)
+    priority_bonus = np.select([prio >= 80, prio >= 60, prio >= 40], [1.5, 1.3, 1.1], 1.0)
     
-    remaining = set(patient_info.keys())
+    alive = np.ones(P, dtype=bool)
+    remaining = P
     total_time = 0.0
     total_prio = 0
-    route = [('H', hospital_id)]
-    current_loc = hospital_id
+    current_row = inst.row_of[hospital_id]
     
     while remaining:
         time_left = time_budget - total_time
-        best = None
-        best_score = -INF
         
-        for pid in list(remaining):
-            info = patient_info[pid]
-            prio = info['prio']
-            svc = info['service']
-            best_h = info['best_hospital']
-            d_to_h = info['dist_to_hospital']
-            
-            # Distância da localização atual até o paciente
-            d_to_p = all_paths.get((current_loc, pid), (INF, []))[0]
-            if d_to_p == INF:
-                continue
-            
-            cost = d_to_p + svc + d_to_h
-            
-            if cost > time_left:
-                continue
-            
-            # Scoring melhorado com múltiplos fatores
-            
-            # 1. Ratio base prioridade/custo
-            base_score = prio / cost if cost > 0 else prio * 1000.0
-            
-            # 2. Bonus para alta prioridade (exponencial para prioridades > 80)
-            priority_bonus = 1.0
-            if prio >= 80:
-                priority_bonus = 1.5
-            elif prio >= 60:
-                priority_bonus = 1.3
-            elif prio >= 40:
-                priority_bonus = 1.1
-            
+        # Distância da localização atual até cada paciente
+        cost = dist[current_row] + svc + d_to_h
+        ok = alive & (cost <= time_left)
+        cand = np.flatnonzero(ok)
+        if cand.size == 0:
+            break
+        c_cost = cost[cand]
+        c_prio = prio[cand]
+        
+        # 1. Ratio base prioridade/custo
+        with np.errstate(divide='ignore', invalid='ignore'):
+            base_score = np.where(c_cost > 0, c_prio / c_cost, c_prio * 1000.0)
             # 3. Penalização por distância relativa ao tempo restante
-            # Se o custo consome muito do tempo restante, penaliza
-            time_efficiency = 1.0 - (cost / time_left) * 0.3
-            
-            # 4. Lookahead: verifica quantos pacientes ainda são viáveis após este
-            lookahead_score = 0
-            time_after = total_time + cost
-            reachable_count = 0
-            reachable_prio = 0
-            
-            for next_pid in remaining:
-                if next_pid == pid:
-                    continue
-                next_info = patient_info[next_pid]
-                d_h_to_next = all_paths.get((best_h, next_pid), (INF, []))[0]
-                if d_h_to_next == INF:
-                    continue
-                
-                next_cost = d_h_to_next + next_info['service'] + next_info['dist_to_hospital']
-                if time_after + next_cost <= time_budget:
-                    reachable_count += 1
-                    reachable_prio += next_info['prio']
-            
-            # Bonus baseado em pacientes alcançáveis (normalizado)
-            if len(remaining) > 1:
-                lookahead_score = (reachable_count / (len(remaining) - 1)) * 0.3
-                # Bonus extra se os próximos pacientes têm alta prioridade
-                if reachable_count > 0:
-                    avg_next_prio = reachable_prio / reachable_count
-                    if avg_next_prio > 50:
-                        lookahead_score *= 1.2
-            
-            # 5. Penalização se estamos ficando sem tempo
+            time_efficiency = 1.0 - (c_cost / time_left) * 0.3
+        
+        # 4. Lookahead: quantos pacientes continuam viáveis depois deste
+        time_after = total_time + c_cost
+        c_h = best_h[cand]
+        reachable_count = np.zeros(cand.size, dtype=np.int64)
+        reachable_prio = np.zeros(cand.size, dtype=np.int64)
+        for h in np.unique(c_h).tolist():
+            sel = np.flatnonzero(c_h == h)
+            row = sorted_cost[h]
+            after = time_after[sel]
+            idx = _count_within(row, after, time_budget)
+            reachable_count[sel] = reach_count[h, idx]
+            reachable_prio[sel] = reach_prio[h, idx]
+        # o próprio candidato não conta
+        self_fits = time_after + serve[c_h, cand] <= time_budget
+        reachable_count -= self_fits
+        reachable_prio -= np.where(self_fits, c_prio, 0)
+        
+        # Bonus baseado em pacientes alcançáveis (normalizado)
+        if remaining > 1:
+            lookahead_score = (reachable_count / (remaining - 1)) * 0.3
+            # Bonus extra se os próximos pacientes têm alta prioridade
+            with np.errstate(divide='ignore', invalid='ignore'):
+                high_next = (reachable_count > 0) & (reachable_prio / reachable_count > 50)
+            lookahead_score = np.where(high_next, lookahead_score * 1.2, lookahead_score)
+        else:
+            lookahead_score = np.zeros(cand.size)
+        
+        # 5. Penalização se estamos ficando sem tempo
+        if time_left < time_budget * 0.3:  # Menos de 30% do tempo
+            # Prioriza pegar pacientes rapidamente
+            urgency_factor = np.where(c_cost < time_left * 0.5, 1.2, 0.8)
+        else:
             urgency_factor = 1.0
-            if time_left < time_budget * 0.3:  # Menos de 30% do tempo
-                # Prioriza pegar pacientes rapidamente
-                urgency_factor = 1.2 if cost < time_left * 0.5 else 0.8
-            
-            # Score final combinado
-            final_score = (base_score * priority_bonus * time_efficiency * urgency_factor) + lookahead_score
-            
-            if final_score > best_score:
-                best_score = final_score
-                best = (pid, cost, prio, best_h)
         
-        if best is None:
-            break
+        # Score final combinado
+        final_score = (base_score * priority_bonus[cand] * time_efficiency * urgency_factor) + lookahead_score
         
-        pid, cost, prio, hosp = best
-        route.append(('P', pid))
-        route.append(('H', hosp))
-        total_time += cost
-        total_prio += prio
-        current_loc = hosp
-        remaining.remove(pid)
+        i = int(np.argmax(final_score))
+        q = int(cand[i])
+        hosp = int(best_h[q])
+        route.append(('P', pids[q]))
+        route.append(('H', inst.hospitals[hosp]))
+        total_time += float(c_cost[i])
+        total_prio += int(prio[q])
+        current_row = hosp
+        
+        # Remove q das contagens acumuladas de todos os hospitais
+        alive[q] = False
+        remaining -= 1
+        for h in range(H):
+            reach_count[h, rank[h, q] + 1:] -= 1
+            reach_prio[h, rank[h, q] + 1:] -= prio[q]
+    
+    return route, total_prio, total_time, False
+
+
+def _count_within(sorted_cost: np.ndarray, time_after: np.ndarray, time_budget: float) -> np.ndarray:
+    """
+    Para cada t em time_after, quantos custos c (ordenados) satisfazem
+    t + c <= time_budget, com a mesma aritmética da comparação direta.
+    """
+    idx = np.searchsorted(sorted_cost, time_budget - time_after, side='right')
+    n = sorted_cost.size
+    # corrige arredondamentos na fronteira (o predicado é monótono em c)
+    while True:
+        lo = np.clip(idx - 1, 0, n - 1)
+        hi = np.clip(idx, 0, n - 1)
+        dec = (idx > 0) & ~(time_after + sorted_cost[lo] <= time_budget)
+        inc = (idx < n) & (time_after + sorted_cost[hi] <= time_budget)
+        if not dec.any() and not inc.any():
+            return idx
+        idx = idx - dec + inc
+
+
+def _lns_search(data, seq: List[int], seed: int, deadline: float) -> Tuple[List[int], int, float]:
+    """
+    Busca de vizinhança larga (destruir e reparar) a partir de `seq`, até
+    `deadline` (time.monotonic). Corre num processo do pool ou no próprio.
+
+    data = (dist, svc, near, near_d, prio, start, time_budget), com dist[linha][q]
+    a distância do hospital da linha ao paciente q e near[q] a linha do
+    hospital de entrega de q. Retorna a melhor (sequência, prioridade, tempo).
+    """
+    import random
+    dist, svc, near, near_d, prio, start, time_budget = data
+    rnd = random.Random(seed)
+    n = len(prio)
+
+    def seq_time(s):
+        t = 0.0
+        loc = start
+        for q in s:
+            t = t + dist[loc][q] + svc[q] + near_d[q]
+            loc = near[q]
+        return t
+
+    def insert_cost(s, q, i):
+        prev = start if i == 0 else near[s[i - 1]]
+        add = dist[prev][q] + svc[q] + near_d[q]
+        if i < len(s):
+            add += dist[near[q]][s[i]] - dist[prev][s[i]]
+        return add
+
+    def repair(s, t, noise):
+        # insere repetidamente o paciente com melhor prioridade / custo de inserção
+        served = set(s)
+        pool = [q for q in range(n) if q not in served]
+        while pool:
+            best = None
+            best_ratio = -1.0
+            keep = []
+            for q in pool:
+                cost, pos = min((insert_cost(s, q, i), i) for i in range(len(s) + 1))
+                if t + cost > time_budget:
+                    continue
+                keep.append(q)
+                ratio = prio[q] / cost if cost > 1e-12 else INF
+                ratio *= 1.0 + noise * rnd.random()
+                if ratio > best_ratio:
+                    best_ratio = ratio
+                    best = (q, pos)
+            if best is None:
+                break
+            q, pos = best
+            s.insert(pos, q)
+            new_t = seq_time(s)
+            if new_t > time_budget:
+                del s[pos]
+            else:
+                t = new_t
+            keep.remove(q)
+            pool = keep
+        return s, t
+
+    def destroy(s):
+        k = rnd.randint(1, max(1, min(len(s), 2 + len(s) // 4)))
+        mode = rnd.random()
+        if mode < 0.4:
+            # remoção aleatória
+            for _ in range(k):
+                del s[rnd.randrange(len(s))]
+        elif mode < 0.7:
+            # remove um segmento consecutivo
+            i = rnd.randrange(len(s))
+            del s[i:i + k]
+        else:
+            # remove os de pior prioridade / custo de remoção
+            t = seq_time(s)
+            scored = []
+            for i, q in enumerate(s):
+                saving = t - seq_time(s[:i] + s[i + 1:])
+                scored.append((prio[q] / max(saving, 1e-12), i))
+            for i in sorted((i for _, i in sorted(scored)[:k]), reverse=True):
+                del s[i]
+        return s
+
+    def swap(s):
+        # troca um atendido por um não atendido de prioridade maior
+        served = set(s)
+        outside = [q for q in range(n) if q not in served]
+        if not outside or not s:
+            return s
+        u = max(rnd.sample(outside, min(3, len(outside))), key=lambda q: prio[q])
+        i = rnd.randrange(len(s))
+        if prio[u] <= prio[s[i]]:
+            return s
+        rest = s[:i] + s[i + 1:]
+        t_rest = seq_time(rest)
+        cost, pos = min((insert_cost(rest, u, j), j) for j in range(len(rest) + 1))
+        if t_rest + cost <= time_budget:
+            rest.insert(pos, u)
+            return rest
+        return s
+
+    def reorder(s):
+        # reposiciona cada paciente no melhor lugar da sequência (reduz o tempo)
+        t = seq_time(s)
+        for q in list(s):
+            i = s.index(q)
+            rest = s[:i] + s[i + 1:]
+            base = seq_time(rest)
+            cost, pos = min((insert_cost(rest, q, j), j) for j in range(len(rest) + 1))
+            if base + cost < t - 1e-9:
+                rest.insert(pos, q)
+                s = rest
+                t = seq_time(s)
+        return s
+
+    cur = list(seq)
+    cur_t = seq_time(cur)
+    while cur and cur_t > time_budget:
+        cur.pop()
+        cur_t = seq_time(cur)
+    cur, cur_t = repair(cur, cur_t, 0.0)
+    cur_p = sum(prio[q] for q in cur)
+    best, best_p, best_t = list(cur), cur_p, cur_t
+
+    while time.monotonic() < deadline:
+        s = list(cur)
+        move = rnd.random()
+        if s and move < 0.6:
+            s = destroy(s)
+        elif s and move < 0.8:
+            s = swap(s)
+        else:
+            s = reorder(s)
+        t = seq_time(s)
+        if t > time_budget:
+            continue
+        s, t = repair(s, t, 0.3)
+        p = sum(prio[q] for q in s)
+
+        if p > best_p or (p == best_p and t < best_t):
+            best, best_p, best_t = list(s), p, t
+        # aceitação record-to-record: aceita pioras pequenas face ao melhor
+        if p > cur_p or (p == cur_p and t <= cur_t) or p >= best_p * (1.0 - 0.03 * rnd.random()):
+            cur, cur_p, cur_t = s, p, t
+
+    return best, best_p, best_t
+
+
+def improve_route_lns(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], route, time_budget: float, all_hospitals: List[int], time_limit: float = LNS_TIME_LIMIT, workers: Optional[int] = None, seed: int = 0, executor: Optional[Executor] = None):
+    """
+    Melhora uma rota [('H', id), ('P', id), ...] por busca de vizinhança
+    larga (LNS) durante time_limit segundos:
+    - destruir: remove k pacientes (aleatórios, um segmento ou os de pior
+      prioridade/custo) e repara inserindo por prioridade/custo de inserção
+    - troca: substitui um atendido por um não atendido de prioridade maior
+    - reordenação: reposiciona pacientes para libertar tempo
+    
+    Com workers > 1 corre sementes independentes num pool de processos e
+    fica com a melhor. O resultado nunca é pior que a rota dada, mas depende
+    do tempo disponível (não é determinístico entre execuções).
+    
+    Args:
+        workers: Sementes em paralelo; por defeito 1 abaixo de
+            LNS_PARALLEL_MIN_PATIENTS pacientes atendíveis, senão o número
+            de núcleos
+        executor: Pool já criado pelo chamador, reutilizado entre chamadas
+            (com executor, workers por defeito é o número de núcleos)
+    
+    Retorna (route_with_hospitals, total_prio, total_time, False)
+    """
+    hospital_id = route[0][1]
+    inst = compile_instance(g, all_paths, all_hospitals, starts=(hospital_id,))
+    cols = np.flatnonzero(np.isfinite(inst.min_cost))
+    col_pos = {inst.patients[c]: i for i, c in enumerate(cols.tolist())}
+    seq = [col_pos[nid] for tipo, nid in route if tipo == 'P' and nid in col_pos]
+    
+    data = (
+        inst.dist_hp[:, cols].tolist(),
+        inst.svc[cols].tolist(),
+        inst.near_h[cols].tolist(),
+        inst.near_d[cols].tolist(),
+        inst.prio[cols].tolist(),
+        inst.row_of[hospital_id],
+        time_budget,
+    )
+    deadline = time.monotonic() + time_limit
+    if workers is None:
+        parallel = executor is not None or len(cols) >= LNS_PARALLEL_MIN_PATIENTS
+        workers = (os.cpu_count() or 1) if parallel else 1
+    
+    if workers <= 1:
+        results = [_lns_search(data, seq, seed, deadline)]
+    elif executor is not None:
+        futures = [executor.submit(_lns_search, data, seq, seed + i, deadline) for i in range(workers)]
+        results = [f.result() for f in futures]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_lns_search, data, seq, seed + i, deadline) for i in range(workers)]
+            results = [f.result() for f in futures]
+    
+    best_seq, best_p, best_t = results[0]
+    for s, p, t in results[1:]:
+        if p > best_p or (p == best_p and t < best_t):
+            best_seq, best_p, best_t = s, p, t
+    
+    pids = [inst.patients[c] for c in cols.tolist()]
+    new_route = [('H', hospital_id)]
+    for q in best_seq:
+        new_route.append(('P', pids[q]))
+        new_route.append(('H', inst.hospitals[data[2][q]]))
+    return new_route, best_p, best_t, False
+
+
+def solve_anytime(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], deadline: Optional[float] = None, max_states: Optional[int] = None) -> Iterator[Incumbent]:
+    """
+    Interface comum dos solvers com latência limitada: gera incumbentes
+    (Incumbent) cada vez melhores até provar o ótimo ou atingir o `deadline`
+    (time.monotonic) / `max_states`.
     
-    return route, total_prio, total_time, False
\ No newline at end of file
+    1. greedy_maximize_priority, com o limite superior de priority_upper_bound
+       (corre sempre, mesmo com o deadline já passado)
+    2. beam_search_maximize_priority com largura BEAM_WIDTH, parado no deadline
+    3. Exato: o solver de choose_algorithm (DP esparso, DP denso ou
+       meet-in-the-middle, este semeado com o incumbente), com
+       ANYTIME_EXACT_SHARE do tempo restante; com deadline, o DP denso só
+       até ANYTIME_DP_MAX_PATIENTS candidatos
+    4. Se o exato não terminar (ou exceder max_states), branch-and-bound
+       semeado com o incumbente até ao deadline, limitado a max_states nós;
+       cada rota melhor que encontra é gerada logo como incumbente
+    
+    Cada incumbente é pelo menos tão bom como o anterior e o upper_bound
+    nunca aumenta; o gerador termina quando optimal é True ou o tempo acaba.
+    """
+    route, prio, t, _ = greedy_maximize_priority(g, all_paths, hospital_id, time_budget, all_hospitals)
+    upper = max(prio, priority_upper_bound(g, all_paths, time_budget, all_hospitals, starts=(hospital_id,)))
+    best = Incumbent(route, prio, t, upper, prio == upper, 'greedy')
+    yield best
+    if best.optimal or _expired(deadline):
+        return
+    
+    route, prio, t, _ = beam_search_maximize_priority(
+        g, all_paths, hospital_id, time_budget, all_hospitals, deadline=deadline
+    )
+    if prio > best.priority or (prio == best.priority and t < best.time):
+        best = Incumbent(route, prio, t, upper, prio == upper, 'beam')
+        yield best
+        if best.optimal:
+            return
+    if _expired(deadline):
+        return
+    
+    choice = choose_algorithm(g, all_paths, time_budget, all_hospitals)
+    exact_deadline = None
+    if deadline is not None:
+        now = time.monotonic()
+        exact_deadline = now + max(0.0, deadline - now) * ANYTIME_EXACT_SHARE
+    if choice == 'sparse':
+        try:
+            route, prio, t, _ = maximize_priority_sparse_dp(
+                g, all_paths, hospital_id, time_budget, all_hospitals,
+                deadline=exact_deadline, max_states=max_states,
+            )
+        except SolverTimeout:
+            pass
+        else:
+            yield Incumbent(route, prio, t, prio, True, 'sparse')
+            return
+    elif choice == 'dp' and (deadline is None or len(_start_costs(g, all_paths, hospital_id, all_hospitals).pids) <= ANYTIME_DP_MAX_PATIENTS):
+        try:
+            route, prio, t, _ = maximize_priority_dp(
+                g, all_paths, hospital_id, time_budget, all_hospitals,
+                deadline=exact_deadline, max_states=max_states,
+            )
+        except SolverTimeout:
+            pass
+        else:
+            yield Incumbent(route, prio, t, prio, True, 'dp')
+            return
+    elif choice == 'mitm':
+        try:
+            route, prio, t, _ = maximize_priority_mitm(
+                g, all_paths, hospital_id, time_budget, all_hospitals,
+                deadline=exact_deadline, max_states=max_states,
+                initial=(best.route, best.priority, best.time),
+            )
+        except SolverTimeout:
+            pass
+        else:
+            yield Incumbent(route, prio, t, prio, True, 'mitm')
+            return
+    
+    if _expired(deadline):
+        return
+    time_limit = None if deadline is None else max(0.0, deadline - time.monotonic())
+    search = _branch_and_bound(
+        g, all_paths, hospital_id, time_budget, all_hospitals,
+        max_states, time_limit, (best.route, best.priority, best.time),
+    )
+    while True:
+        try:
+            route, prio, t = next(search)
+        except StopIteration as done:
+            route, prio, t, _, ub = done.value
+            break
+        best = Incumbent(route, prio, t, upper, prio == upper, 'bnb')
+        yield best
+        if best.optimal:
+            return
+    upper = min(upper, max(ub, prio))
+    if prio > best.priority or upper < best.upper_bound:
+        yield Incumbent(route, prio, t, upper, prio == upper, 'bnb')
+
+
+def best_within(g: Graph, all_paths: Dict[Tuple[int, int], Tuple[float, List[int]]], hospital_id: int, time_budget: float, all_hospitals: List[int], time_limit_ms: float = ANYTIME_TIME_LIMIT_MS, max_states: Optional[int] = None) -> Incumbent:
+    """
+    Melhor resposta de solve_anytime em time_limit_ms milissegundos
+    (o último incumbente gerado). A heurística gananciosa corre sempre, por
+    isso há resposta mesmo com time_limit_ms = 0.
+    """
+    deadline = time.monotonic() + time_limit_ms / 1000.0
+    best = None
+    for best in solve_anytime(g, all_paths, hospital_id, time_budget, all_hospitals, deadline, max_states):
+        pass
+    return best
+
+
+class SubproblemTask(NamedTuple):
+    """Argumentos de best_within para uma resolução independente (ver solve_subproblems)."""
+    graph: Graph
+    all_paths: object
+    hospital_id: int
+    time_budget: float
+    all_hospitals: List[int]
+    time_limit_ms: float
+
+
+def _solve_task(task: SubproblemTask) -> Incumbent:
+    return best_within(*task)
+
+
+def solve_subproblems(tasks: List[SubproblemTask], pool: Optional[Executor] = None) -> List[Incumbent]:
+    """
+    Resolve cada tarefa com best_within, no pool de processos se for dado
+    (senão uma a uma); os resultados vêm pela ordem de `tasks`.
+    """
+    if pool is None:
+        return [_solve_task(task) for task in tasks]
+    return list(pool.map(_solve_task, tasks))
@@ -0,0 +1,372 @@
+"""
+Manutenção incremental de caminhos mais curtos para fecho/reabertura de ruas.
+
+DynamicShortestPaths subscreve as alterações de um Graph (Graph.subscribe) e
+repara apenas as árvores de caminhos mais curtos afetadas, em vez de voltar
+a correr Dijkstra para todas as origens:
+
+- inserção de aresta / diminuição de peso: propaga as melhorias a partir do
+  extremo de chegada (Dijkstra parcial a partir desse nó)
+- remoção de aresta / aumento de peso / remoção de nó: se a aresta pertence
+  à árvore, invalida a subárvore que a usava e recalcula só esses nós a
+  partir dos vizinhos que não foram afetados
+
+Expõe a mesma consulta que ShortestPathTable: get((u, v)) -> (dist, path)
+e distance_block(us, vs), para pares em que u ou v é uma das origens (por
+defeito, os hospitais).
+"""
+
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from graph import Graph, IndexedGraph
+from dijkstra import dijkstra
+
+INF = float('inf')
+
+
+class _Tree:
+    """Árvore de caminhos mais curtos enraizada em `root`."""
+
+    __slots__ = ('root', 'dist', 'pred', 'children')
+
+    def __init__(self, root: int, dist: Dict[int, float], pred: Dict[int, Optional[int]]):
+        self.root = root
+        self.dist = dist
+        self.pred = pred
+        self.children: Dict[int, Set[int]] = {}
+        for v, u in pred.items():
+            if u is not None:
+                self.children.setdefault(u, set()).add(v)
+
+    def set_parent(self, v: int, u: Optional[int]) -> None:
+        old = self.pred.get(v)
+        if old is not None:
+            siblings = self.children.get(old)
+            if siblings is not None:
+                siblings.discard(v)
+        self.pred[v] = u
+        if u is not None:
+            self.children.setdefault(u, set()).add(v)
+
+    def subtree(self, v: int) -> List[int]:
+        nodes = [v]
+        i = 0
+        while i < len(nodes):
+            nodes.extend(self.children.get(nodes[i], ()))
+            i += 1
+        return nodes
+
+
+class DynamicShortestPaths:
+    """
+    Oráculo de caminhos mais curtos mantido incrementalmente.
+
+    Args:
+        graph: Grafo a acompanhar (as alterações chegam por Graph.subscribe)
+        sources: Origens das árvores mantidas (tipicamente os hospitais)
+
+    Em grafos não-direcionados d(v, s) = d(s, v) e basta a árvore de saída
+    de cada origem; se o grafo deixar de ser simétrico (aresta adicionada ou
+    removida num só sentido) passam a ser mantidas também árvores de chegada.
+
+    Atributos:
+        last_touched: entradas (nó, origem) recalculadas na última alteração
+        total_touched: total acumulado desde a construção
+        version: número de alterações recebidas (muda sempre que as
+            distâncias podem ter mudado; usado pela cache de compile_instance)
+    """
+
+    def __init__(self, graph: Graph, sources: Iterable[int]):
+        self.graph = graph
+        self.sources: List[int] = list(dict.fromkeys(sources))
+        self.symmetric: bool = graph.freeze().is_symmetric()
+        self.last_touched = 0
+        self.total_touched = 0
+        self.version = 0
+
+        # índice de vizinhos de entrada (v -> {u : existe aresta u→v});
+        # um IndexedGraph já mantém a adjacência inversa
+        self._in: Optional[Dict[int, Set[int]]] = None
+        if not isinstance(graph, IndexedGraph):
+            self._in = {nid: set() for nid in graph.nodes}
+            for u, neighbors in graph.adjacency.items():
+                for v, _w in neighbors:
+                    self._in.setdefault(v, set()).add(u)
+
+        self._forward: Dict[int, _Tree] = {s: _Tree(s, *dijkstra(graph, s)) for s in self.sources}
+        self._backward: Dict[int, _Tree] = {}
+        if not self.symmetric:
+            self._build_backward()
+
+        graph.subscribe(self._on_change)
+
+    def close(self) -> None:
+        """Deixa de acompanhar as alterações do grafo."""
+        self.graph.unsubscribe(self._on_change)
+
+    # ------------------------------------------------------------------
+    # vizinhanças (com o menor peso entre arestas paralelas)
+    # ------------------------------------------------------------------
+
+    def _out_arcs(self, x: int) -> Iterable[Tuple[int, float]]:
+        return self.graph.adjacency.get(x, [])
+
+    def _in_arcs(self, x: int) -> Iterable[Tuple[int, float]]:
+        if self._in is None:
+            return self.graph.reverse.get(x, {}).items()
+        return self._scan_in_arcs(x)
+
+    def _scan_in_arcs(self, x: int) -> Iterable[Tuple[int, float]]:
+        adjacency = self.graph.adjacency
+        for u in self._in.get(x, ()):
+            w = min((w for v, w in adjacency.get(u, []) if v == x), default=INF)
+            if w < INF:
+                yield u, w
+
+    def _build_backward(self) -> None:
+        transposed = self.graph.freeze().transpose()
+        self._backward = {s: _Tree(s, *dijkstra(transposed, s)) for s in self.sources}
+
+    # ------------------------------------------------------------------
+    # reparações sobre uma árvore; succ/preds dão os arcos no sentido da árvore
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _decrease(tree: _Tree, a: int, b: int, w: float, succ: Callable) -> int:
+        da = tree.dist.get(a, INF)
+        nd = da + w
+        if da == INF or nd >= tree.dist.get(b, INF):
+            return 0
+        tree.dist[b] = nd
+        tree.set_parent(b, a)
+        touched = 1
+        heap = [(nd, b)]
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > tree.dist[x]:
+                continue
+            for y, wy in succ(x):
+                ny = d + wy
+                if ny < tree.dist.get(y, INF):
+                    tree.dist[y] = ny
+                    tree.set_parent(y, x)
+                    touched += 1
+                    heapq.heappush(heap, (ny, y))
+        return touched
+
+    @staticmethod
+    def _repair(tree: _Tree, root_of_damage: int, succ: Callable, preds: Callable,
+                removed: Optional[int] = None) -> int:
+        affected = tree.subtree(root_of_damage)
+        affected_set = set(affected)
+        for x in affected:
+            tree.set_parent(x, None)
+            tree.dist[x] = INF
+        if removed is not None:
+            affected_set.discard(removed)
+            tree.dist.pop(removed, None)
+            tree.pred.pop(removed, None)
+            tree.children.pop(removed, None)
+
+        # fronteira: melhor ligação de cada nó afetado a um nó intacto
+        heap = []
+        for x in affected_set:
+            for u, w in preds(x):
+                if u in affected_set or u == removed:
+                    continue
+                du = tree.dist.get(u, INF)
+                if du + w < tree.dist[x]:
+                    tree.dist[x] = du + w
+                    tree.set_parent(x, u)
+            if tree.dist[x] < INF:
+                heapq.heappush(heap, (tree.dist[x], x))
+
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > tree.dist[x]:
+                continue
+            for y, w in succ(x):
+                if y in affected_set and d + w < tree.dist[y]:
+                    tree.dist[y] = d + w
+                    tree.set_parent(y, x)
+                    heapq.heappush(heap, (d + w, y))
+
+        return len(affected)
+
+    def _arc_added(self, u: int, v: int, w: float) -> int:
+        touched = 0
+        for tree in self._forward.values():
+            touched += self._decrease(tree, u, v, w, self._out_arcs)
+        for tree in self._backward.values():
+            touched += self._decrease(tree, v, u, w, self._in_arcs)
+        return touched
+
+    def _arc_removed(self, u: int, v: int) -> int:
+        touched = 0
+        for tree in self._forward.values():
+            if tree.pred.get(v) == u:
+                touched += self._repair(tree, v, self._out_arcs, self._in_arcs)
+        for tree in self._backward.values():
+            if tree.pred.get(u) == v:
+                touched += self._repair(tree, u, self._in_arcs, self._out_arcs)
+        return touched
+
+    # ------------------------------------------------------------------
+    # eventos do grafo
+    # ------------------------------------------------------------------
+
+    def _on_change(self, event: str, *args) -> None:
+        touched = 0
+        if self._in is not None:
+            self._update_in_index(event, args)
+
+        if event == 'add_node':
+            (nid,) = args
+            for tree in list(self._forward.values()) + list(self._backward.values()):
+                tree.dist[nid] = INF
+                tree.pred[nid] = None
+            touched = len(self._forward) + len(self._backward)
+
+        elif event == 'add_edge':
+            u, v, w, bidirectional = args
+            if self.symmetric and not bidirectional and u != v:
+                self.symmetric = False
+                self._build_backward()
+                touched += len(self._backward) * len(self.graph.nodes)
+            touched += self._arc_added(u, v, w)
+            if bidirectional:
+                touched += self._arc_added(v, u, w)
+
+        elif event == 'remove_edge':
+            u, v, bidirectional = args
+            if self.symmetric and not bidirectional and u != v:
+                self.symmetric = False
+                self._build_backward()
+                touched += len(self._backward) * len(self.graph.nodes)
+            touched += self._arc_removed(u, v)
+            if bidirectional:
+                touched += self._arc_removed(v, u)
+
+        elif event == 'remove_node':
+            nid, _out_neighbors, _in_neighbors = args
+            self._forward.pop(nid, None)
+            self._backward.pop(nid, None)
+            if nid in self.sources:
+                self.sources.remove(nid)
+            for tree in self._forward.values():
+                if nid in tree.dist:
+                    touched += self._repair(tree, nid, self._out_arcs, self._in_arcs, removed=nid)
+            for tree in self._backward.values():
+                if nid in tree.dist:
+                    touched += self._repair(tree, nid, self._in_arcs, self._out_arcs, removed=nid)
+
+        self.last_touched = touched
+        self.total_touched += touched
+        self.version += 1
+
+    def _update_in_index(self, event: str, args: tuple) -> None:
+        index = self._in
+        if event == 'add_node':
+            index.setdefault(args[0], set())
+        elif event == 'add_edge':
+            u, v, _w, bidirectional = args
+            index.setdefault(v, set()).add(u)
+            if bidirectional:
+                index.setdefault(u, set()).add(v)
+        elif event == 'remove_edge':
+            u, v, bidirectional = args
+            index.get(v, set()).discard(u)
+            if bidirectional:
+                index.get(u, set()).discard(v)
+        elif event == 'remove_node':
+            nid, out_neighbors, _in_neighbors = args
+            index.pop(nid, None)
+            for v in out_neighbors:
+                index.get(v, set()).discard(nid)
+
+    # ------------------------------------------------------------------
+    # consulta (mesma interface que ShortestPathTable)
+    # ------------------------------------------------------------------
+
+    def _tree_for(self, u: int, v: int) -> Optional[Tuple[_Tree, int, bool]]:
+        """(árvore, nó procurado, caminho invertido?) que cobre o par u→v."""
+        if u in self._forward:
+            return self._forward[u], v, True
+        if v in self._forward:
+            return (self._forward[v] if self.symmetric else self._backward[v]), u, False
+        return None
+
+    def _lookup(self, u: int, v: int) -> Optional[Tuple[float, List[int]]]:
+        if u not in self.graph.nodes or v not in self.graph.nodes:
+            return None
+        if u == v:
+            return (0.0, [u])
+        found = self._tree_for(u, v)
+        if found is None:
+            return None
+        tree, target, reverse = found
+
+        d = tree.dist.get(target, INF)
+        if d == INF:
+            return (INF, [])
+        path = []
+        current: Optional[int] = target
+        while current is not None:
+            path.append(current)
+            current = tree.pred.get(current)
+        if reverse:
+            path.reverse()
+        return (d, path)
+
+    def _distance(self, u: int, v: int) -> Optional[float]:
+        nodes = self.graph.nodes
+        if u not in nodes or v not in nodes:
+            return None
+        if u == v:
+            return 0.0
+        found = self._tree_for(u, v)
+        if found is None:
+            return None
+        tree, target, _reverse = found
+        return tree.dist.get(target, INF)
+
+    def distance(self, u: int, v: int) -> float:
+        d = self._distance(u, v)
+        if d is None:
+            raise KeyError((u, v))
+        return d
+
+    def distance_block(self, us: List[int], vs: List[int]) -> np.ndarray:
+        """
+        Matriz float64 [len(us) × len(vs)] com d(u, v), lida das árvores sem
+        reconstruir caminhos; INF para pares sem caminho ou não cobertos.
+        """
+        out = np.full((len(us), len(vs)), INF, dtype=np.float64)
+        for i, u in enumerate(us):
+            for j, v in enumerate(vs):
+                d = self._distance(u, v)
+                if d is not None:
+                    out[i, j] = d
+        return out
+
+    def path(self, u: int, v: int) -> List[int]:
+        result = self._lookup(u, v)
+        if result is None:
+            raise KeyError((u, v))
+        return result[1]
+
+    def get(self, key: Tuple[int, int], default=None):
+        result = self._lookup(*key)
+        return default if result is None else result
+
+    def __getitem__(self, key: Tuple[int, int]) -> Tuple[float, List[int]]:
+        result = self._lookup(*key)
+        if result is None:
+            raise KeyError(key)
+        return result
+
+    def __contains__(self, key) -> bool:
+        return self._lookup(*key) is not None
@@ -0,0 +1,184 @@
+"""
+Planeamento de uma frota de ambulâncias.
+
+Cada veículo parte de um hospital com o seu próprio budget de tempo. O plano
+é feito em três passos:
+
+1. Partição: cada paciente é atribuído ao veículo que o atende mais barato
+   a partir do hospital de partida, sem exceder FLEET_LOAD_FACTOR × budget
+   do veículo em custo mínimo (min_cost) dos pacientes atribuídos
+2. Cada veículo resolve o seu subproblema (best_within restrito aos seus
+   pacientes) num pool de processos, todos ao mesmo tempo
+3. Trocas entre veículos: os pacientes que ficaram por atender são
+   oferecidos aos FLEET_EXCHANGE_CANDIDATES veículos mais próximos, que
+   voltam a resolver em paralelo; cada paciente fica com um só veículo
+
+Com pelo menos tantos processos como veículos, planear a frota demora o
+mesmo que planear um veículo: cada fase tem uma fatia fixa do tempo limite.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from graph import Graph
+from instance import ProblemInstance, compile_instance
+from dp import ANYTIME_TIME_LIMIT_MS, Incumbent, SubproblemTask, solve_subproblems
+
+# Folga da partição: soma dos min_cost atribuídos a um veículo até este
+# múltiplo do seu budget (o solver do veículo escolhe quais atender)
+FLEET_LOAD_FACTOR = 1.5
+
+# Rondas de trocas entre veículos depois da resolução inicial
+FLEET_EXCHANGE_ROUNDS = 2
+
+# Veículos (os mais próximos) a quem cada paciente por atender é oferecido
+FLEET_EXCHANGE_CANDIDATES = 2
+
+
+class Vehicle(NamedTuple):
+    """Ambulância da frota: hospital de partida e tempo disponível."""
+    hospital_id: int
+    time_budget: float
+
+
+class FleetPlan(NamedTuple):
+    """
+    Plano da frota.
+
+    - routes: um Incumbent por veículo, pela ordem de `vehicles`
+    - priority, time: prioridade total e soma dos tempos das rotas
+    - unserved: pacientes candidatos que nenhum veículo atende
+    """
+    routes: List[Incumbent]
+    priority: int
+    time: float
+    unserved: List[int]
+
+
+def _visit_costs(inst: ProblemInstance, vehicles: List[Vehicle], cols: np.ndarray) -> np.ndarray:
+    """[V × P] custo de cada veículo ir do seu hospital ao paciente, atendê-lo e entregá-lo."""
+    rows = [inst.row_of[v.hospital_id] for v in vehicles]
+    return inst.dist_hp[np.ix_(rows, cols)] + (inst.svc[cols] + inst.near_d[cols])[None, :]
+
+
+def partition_patients(inst: ProblemInstance, vehicles: List[Vehicle], load_factor: float = FLEET_LOAD_FACTOR) -> Tuple[List[List[int]], List[int]]:
+    """
+    Atribui os pacientes atendíveis aos veículos.
+
+    Os pacientes são percorridos por prioridade / min_cost decrescente e cada
+    um vai para o veículo com menor custo de visita (_visit_costs) que ainda
+    tem carga livre e o consegue atender dentro do budget.
+
+    Retorna (índices de coluna por veículo, colunas não atribuídas).
+    """
+    cols = np.flatnonzero(np.isfinite(inst.min_cost))
+    cost = _visit_costs(inst, vehicles, cols)
+    by_vehicle = np.argsort(cost, axis=0, kind='stable')  # veículos por custo, por paciente
+    budgets = np.array([v.time_budget for v in vehicles], dtype=np.float64)
+    capacity = budgets * load_factor
+    load = np.zeros(len(vehicles), dtype=np.float64)
+    min_cost = inst.min_cost[cols]
+    order = np.lexsort((min_cost, -inst.prio[cols] / np.maximum(min_cost, 1e-9)))
+
+    assigned: List[List[int]] = [[] for _ in vehicles]
+    unassigned: List[int] = []
+    for j in order.tolist():
+        for v in by_vehicle[:, j].tolist():
+            if cost[v, j] <= budgets[v] and load[v] + min_cost[j] <= capacity[v]:
+                load[v] += min_cost[j]
+                assigned[v].append(int(cols[j]))
+                break
+        else:
+            unassigned.append(int(cols[j]))
+    return assigned, unassigned
+
+
+def _served(route) -> List[int]:
+    return [nid for tipo, nid in route if tipo == 'P']
+
+
+def plan_fleet(g: Graph, all_paths, vehicles: List[Vehicle], all_hospitals: List[int], time_limit_ms: float = ANYTIME_TIME_LIMIT_MS, workers: Optional[int] = None, exchange_rounds: int = FLEET_EXCHANGE_ROUNDS) -> FleetPlan:
+    """
+    Planeia as rotas de todos os veículos (ver docstring do módulo).
+
+    Args:
+        vehicles: Veículos (hospital de partida e budget de cada um)
+        time_limit_ms: Prazo de cada veículo; a resolução inicial e cada
+            ronda de trocas ficam com uma fatia igual
+        workers: Processos do pool (por defeito min(veículos, núcleos));
+            com workers <= 1 corre tudo no processo atual
+        exchange_rounds: Máximo de rondas de trocas entre veículos
+    """
+    starts = [v.hospital_id for v in vehicles]
+    inst = compile_instance(g, all_paths, all_hospitals, starts=starts)
+    hospitals = list(dict.fromkeys(all_hospitals))
+    assigned, _ = partition_patients(inst, vehicles)
+    cols = np.flatnonzero(np.isfinite(inst.min_cost))
+    cost = _visit_costs(inst, vehicles, cols)
+    col_pos = {int(c): j for j, c in enumerate(cols.tolist())}
+    col_of = {inst.patients[c]: c for c in cols.tolist()}
+
+    share_ms = time_limit_ms / (1 + max(0, exchange_rounds))
+    if workers is None:
+        workers = min(len(vehicles), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(vehicles) > 1 else None
+    try:
+        routes = solve_subproblems([
+            SubproblemTask(*inst.subproblem(g, assigned[v], starts), *vehicles[v], hospitals, share_ms)
+            for v in range(len(vehicles))
+        ], pool)
+
+        for _ in range(max(0, exchange_rounds)):
+            taken: Set[int] = {c for inc in routes for c in map(col_of.get, _served(inc.route))}
+            unserved = [c for c in cols.tolist() if c not in taken]
+            # cada paciente por atender é oferecido aos veículos mais baratos que o alcançam
+            offers: List[List[int]] = [[] for _ in vehicles]
+            for c in unserved:
+                j = col_pos[c]
+                nearest = np.argsort(cost[:, j], kind='stable')[:FLEET_EXCHANGE_CANDIDATES]
+                for v in nearest.tolist():
+                    if cost[v, j] <= vehicles[v].time_budget:
+                        offers[v].append(c)
+            active = [v for v in range(len(vehicles)) if offers[v]]
+            if not active:
+                break
+            results = solve_subproblems([
+                SubproblemTask(*inst.subproblem(g, [col_of[p] for p in _served(routes[v].route)] + offers[v], starts),
+                               *vehicles[v], hospitals, share_ms)
+                for v in active
+            ], pool)
+
+            # Aceita primeiro os veículos que mais ganham; um paciente
+            # oferecido a vários fica com o primeiro que o leva
+            improved = False
+            gains = sorted(
+                zip(active, results),
+                key=lambda vr: (vr[1].priority - routes[vr[0]].priority, routes[vr[0]].time - vr[1].time),
+                reverse=True,
+            )
+            for v, inc in gains:
+                old = routes[v]
+                if inc.priority < old.priority or (inc.priority == old.priority and inc.time >= old.time):
+                    continue
+                new = {col_of[p] for p in _served(inc.route)} - {col_of[p] for p in _served(old.route)}
+                if new & taken:
+                    continue
+                taken |= new
+                routes[v] = inc
+                improved = True
+            if not improved:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    served = {p for inc in routes for p in _served(inc.route)}
+    return FleetPlan(
+        routes,
+        sum(inc.priority for inc in routes),
+        sum(inc.time for inc in routes),
+        [inst.patients[c] for c in cols.tolist() if inst.patients[c] not in served],
+    )
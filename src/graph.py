@@ -1,19 +1,48 @@
 from pathlib import Path
 import csv
-from typing import Dict, List, Tuple, Optional
-from node import Node
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, Union
+import numpy as np
+from node import Node, NodeTable
 
 class Graph:
     def __init__(self):
-        self.nodes: Dict[int, Node] = {}
+        # nós em colunas (mapeamento id -> NodeView)
+        self.nodes: NodeTable = NodeTable()
         # adjacency[u] = list of (v, weight)
         self.adjacency: Dict[int, List[Tuple[int, float]]] = {}
+        # vista CSR em cache (invalidada a cada alteração do grafo)
+        self._frozen: Optional["FrozenGraph"] = None
+        # callbacks notificados a cada alteração da topologia
+        self._listeners: List[Callable[..., None]] = []
+
+    def subscribe(self, listener: Callable[..., None]) -> None:
+        """
+        Regista um callback chamado após cada alteração da topologia:
+        - listener('add_node', node_id)
+        - listener('add_edge', from_id, to_id, weight, bidirectional)
+        - listener('remove_edge', from_id, to_id, bidirectional)
+        - listener('remove_node', node_id, out_neighbors, in_neighbors)
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[..., None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, *args) -> None:
+        for listener in list(self._listeners):
+            listener(event, *args)
 
     def add_node(self, node: Node) -> None:
         """Adiciona/atualiza um nó no grafo."""
+        is_new = node.id not in self.nodes
         self.nodes[node.id] = node
+        self._frozen = None
         if node.id not in self.adjacency:
             self.adjacency[node.id] = []
+        if is_new:
+            self._notify('add_node', node.id)
 
     def has_node(self, node_id: int) -> bool:
         return node_id in self.nodes
@@ -31,14 +60,47 @@ class Graph:
         """
         if from_id not in self.nodes or to_id not in self.nodes:
             raise KeyError("Both nodes must exist in the graph before adding an edge.")
+        self._frozen = None
         self.adjacency.setdefault(from_id, [])
         self.adjacency[from_id].append((to_id, float(weight)))
         if bidirectional:
             self.adjacency.setdefault(to_id, [])
             self.adjacency[to_id].append((from_id, float(weight)))
+        self._notify('add_edge', from_id, to_id, float(weight), bidirectional)
+
+    def add_edges(self, edges: Iterable[Tuple[int, int, float]], bidirectional: bool = True) -> int:
+        """
+        Adiciona várias arestas (from_id, to_id, weight) de uma vez; arestas
+        com nós inexistentes são ignoradas. Sem listeners registados não há
+        notificações por aresta. Retorna o número de arestas ignoradas.
+        """
+        if self._listeners:
+            return self._add_edges_notifying(edges, bidirectional)
+        self._frozen = None
+        nodes, adjacency = self.nodes, self.adjacency
+        skipped = 0
+        for u, v, w in edges:
+            if u not in nodes or v not in nodes:
+                skipped += 1
+                continue
+            w = float(w)
+            adjacency[u].append((v, w))
+            if bidirectional:
+                adjacency[v].append((u, w))
+        return skipped
+
+    def _add_edges_notifying(self, edges: Iterable[Tuple[int, int, float]], bidirectional: bool) -> int:
+        skipped = 0
+        for u, v, w in edges:
+            if u not in self.nodes or v not in self.nodes:
+                skipped += 1
+                continue
+            self.add_edge(u, v, w, bidirectional)
+        return skipped
 
     def remove_edge(self, from_id: int, to_id: int, bidirectional: bool = True) -> None:
         """Remove aresta(s) entre from_id e to_id se existirem."""
+        self._frozen = None
         if from_id in self.adjacency:
             self.adjacency[from_id] = [
                 (v, w) for (v, w) in self.adjacency[from_id] if v != to_id
@@ -47,16 +109,29 @@ class Graph:
             self.adjacency[to_id] = [
                 (v, w) for (v, w) in self.adjacency[to_id] if v != from_id
             ]
+        self._notify('remove_edge', from_id, to_id, bidirectional)
+
+    def set_edge_weight(self, from_id: int, to_id: int, weight: float, bidirectional: bool = True) -> None:
+        """Substitui a(s) aresta(s) entre from_id e to_id por uma única com o novo peso."""
+        self.remove_edge(from_id, to_id, bidirectional)
+        self.add_edge(from_id, to_id, weight, bidirectional)
 
     def remove_node(self, node_id: int) -> None:
         """Remove nó e todas as arestas entrantes/saientes relacionadas."""
+        self._frozen = None
+        out_neighbors = [v for v, _w in self.adjacency.get(node_id, [])]
+        in_neighbors = []
         if node_id in self.adjacency:
             del self.adjacency[node_id]
         # remover arestas que apontam para node_id
         for u in list(self.adjacency.keys()):
-            self.adjacency[u] = [(v, w) for (v, w) in self.adjacency[u] if v != node_id]
+            kept = [(v, w) for (v, w) in self.adjacency[u] if v != node_id]
+            if len(kept) != len(self.adjacency[u]):
+                in_neighbors.append(u)
+            self.adjacency[u] = kept
         if node_id in self.nodes:
             del self.nodes[node_id]
+            self._notify('remove_node', node_id, out_neighbors, in_neighbors)
 
     def get_neighbors(self, node_id: int) -> List[Tuple[int, float]]:
         """Retorna lista de (vizinho_id, peso)."""
@@ -74,3 +149,373 @@ class Graph:
             "nodes": {nid: node.to_dict() for nid, node in self.nodes.items()},
             "adjacency": {nid: list(neigh) for nid, neigh in self.adjacency.items()},
         }
+
+    @classmethod
+    def from_csr(cls, nodes: Union[NodeTable, Iterable[Node]], offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> "Graph":
+        """
+        Constrói o grafo a partir de arrays CSR indexados pela ordem de
+        `nodes` (o formato de FrozenGraph), sem passar aresta a aresta por
+        add_edge. Uma NodeTable é usada diretamente como g.nodes. A vista
+        freeze() fica logo disponível.
+        """
+        g = cls()
+        g.nodes = nodes if isinstance(nodes, NodeTable) else NodeTable(nodes)
+        ids = np.fromiter(g.nodes, dtype=np.int64, count=len(g.nodes))
+        if g._fill_csr(ids, offsets, targets, weights):
+            g._frozen = FrozenGraph(ids, offsets, targets, weights)
+        return g
+
+    def _fill_csr(self, ids: np.ndarray, offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> bool:
+        """Preenche adjacency a partir do CSR; True se o grafo ficou igual ao CSR."""
+        bounds = offsets.tolist()
+        neighbor_ids = ids[targets].tolist()
+        ws = weights.tolist()
+        for i, nid in enumerate(ids.tolist()):
+            a, b = bounds[i], bounds[i + 1]
+            self.adjacency[nid] = list(zip(neighbor_ids[a:b], ws[a:b]))
+        return True
+
+    def freeze(self, reorder: Optional[str] = None) -> "FrozenGraph":
+        """
+        Retorna uma vista imutável em formato CSR (compressed sparse row).
+
+        Args:
+            reorder: None mantém a ordem de inserção dos nós; 'bfs' renumera
+                os nós por busca em largura para melhorar a localidade.
+
+        A vista sem reordenação fica em cache até à próxima alteração do grafo.
+        """
+        if reorder is None and self._frozen is not None:
+            return self._frozen
+        frozen = FrozenGraph.from_graph(self, reorder=reorder)
+        if reorder is None:
+            self._frozen = frozen
+        return frozen
+
+
+class IndexedGraph(Graph):
+    """
+    Grafo mutável indexado, para aplicar edições frequentes (fecho e
+    reabertura de ruas) em redes grandes.
+
+    Além de `adjacency` (mesmo formato de Graph) mantém:
+    - edge_weights[(u, v)]: peso da aresta u→v
+    - reverse[v][u]: peso da aresta u→v (adjacência inversa)
+    - a posição de cada aresta na lista adjacency[u], para remover em O(1)
+
+    Arestas paralelas (a mesma rua listada duas vezes) são fundidas,
+    ficando o menor peso. Remover uma aresta custa O(1) e remover um nó
+    O(grau); as contagens de nós e arestas são mantidas incrementalmente.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._edge_weights: Dict[Tuple[int, int], float] = {}
+        self._reverse: Dict[int, Dict[int, float]] = {}
+        self._positions: Dict[int, Dict[int, int]] = {}
+        # CSR de from_csr cujos índices ainda não foram construídos
+        self._pending_csr: Optional[tuple] = None
+        self._edge_count = 0
+
+    # edge_weights / reverse / _pos são construídos no primeiro acesso quando
+    # o grafo vem de from_csr: um grafo carregado só para consultas não paga
+    # os dicionários por aresta
+
+    @property
+    def edge_weights(self) -> Dict[Tuple[int, int], float]:
+        if self._pending_csr is not None:
+            self._build_index()
+        return self._edge_weights
+
+    @property
+    def reverse(self) -> Dict[int, Dict[int, float]]:
+        if self._pending_csr is not None:
+            self._build_index()
+        return self._reverse
+
+    @property
+    def _pos(self) -> Dict[int, Dict[int, int]]:
+        if self._pending_csr is not None:
+            self._build_index()
+        return self._positions
+
+    def add_node(self, node: Node) -> None:
+        """Adiciona/atualiza um nó no grafo."""
+        self.reverse.setdefault(node.id, {})
+        self._pos.setdefault(node.id, {})
+        super().add_node(node)
+
+    def _add_arc(self, u: int, v: int, w: float) -> None:
+        current = self.edge_weights.get((u, v))
+        if current is None:
+            self._pos[u][v] = len(self.adjacency[u])
+            self.adjacency[u].append((v, w))
+            self._edge_count += 1
+        elif w < current:
+            self.adjacency[u][self._pos[u][v]] = (v, w)
+        else:
+            return
+        self.edge_weights[(u, v)] = w
+        self.reverse[v][u] = w
+
+    def _remove_arc(self, u: int, v: int) -> bool:
+        if self.edge_weights.pop((u, v), None) is None:
+            return False
+        neighbors = self.adjacency[u]
+        positions = self._pos[u]
+        i = positions.pop(v)
+        last = neighbors.pop()
+        # troca com o último elemento para remover em O(1)
+        if i < len(neighbors):
+            neighbors[i] = last
+            positions[last[0]] = i
+        del self.reverse[v][u]
+        self._edge_count -= 1
+        return True
+
+    def add_edge(
+        self,
+        from_id: int,
+        to_id: int,
+        weight: float = 1.0,
+        bidirectional: bool = True,
+    ) -> None:
+        """
+        Adiciona uma aresta. Se os nós não existirem, lança KeyError.
+        Se a aresta já existir fica o menor dos dois pesos.
+        """
+        if from_id not in self.nodes or to_id not in self.nodes:
+            raise KeyError("Both nodes must exist in the graph before adding an edge.")
+        self._frozen = None
+        self._add_arc(from_id, to_id, float(weight))
+        if bidirectional:
+            self._add_arc(to_id, from_id, float(weight))
+        self._notify('add_edge', from_id, to_id, float(weight), bidirectional)
+
+    def add_edges(self, edges: Iterable[Tuple[int, int, float]], bidirectional: bool = True) -> int:
+        """Como Graph.add_edges, fundindo arestas repetidas (fica o menor peso)."""
+        if self._listeners:
+            return self._add_edges_notifying(edges, bidirectional)
+        self._frozen = None
+        nodes, add_arc = self.nodes, self._add_arc
+        skipped = 0
+        for u, v, w in edges:
+            if u not in nodes or v not in nodes:
+                skipped += 1
+                continue
+            w = float(w)
+            add_arc(u, v, w)
+            if bidirectional:
+                add_arc(v, u, w)
+        return skipped
+
+    def _fill_csr(self, ids: np.ndarray, offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> bool:
+        n = len(ids)
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+        keys = np.sort(sources * n + targets)
+        if np.any(keys[1:] == keys[:-1]):
+            # arestas paralelas: funde-as pelo caminho normal
+            for nid in ids.tolist():
+                self.adjacency[nid], self.reverse[nid], self._pos[nid] = [], {}, {}
+            self.add_edges(zip(ids[sources].tolist(), ids[targets].tolist(), weights.tolist()), bidirectional=False)
+            return False
+        super()._fill_csr(ids, offsets, targets, weights)
+        self._pending_csr = (ids, sources, offsets, targets, weights)
+        self._edge_count = len(targets)
+        return True
+
+    def _build_index(self) -> None:
+        """Constrói edge_weights / reverse / _pos a partir do CSR guardado por _fill_csr."""
+        ids, sources, offsets, targets, weights = self._pending_csr
+        self._pending_csr = None
+        n = len(ids)
+        node_ids = ids.tolist()
+        src_ids = ids[sources].tolist()
+        tgt_ids = ids[targets].tolist()
+        self._edge_weights = dict(zip(zip(src_ids, tgt_ids), weights.tolist()))
+        self._positions = {}
+        bounds = offsets.tolist()
+        for i, u in enumerate(node_ids):
+            a, b = bounds[i], bounds[i + 1]
+            self._positions[u] = dict(zip(tgt_ids[a:b], range(b - a)))
+        # adjacência inversa: arestas agrupadas por destino
+        order = np.argsort(targets, kind='stable')
+        rbounds = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=rbounds[1:])
+        rbounds = rbounds.tolist()
+        r_src = ids[sources[order]].tolist()
+        r_w = weights[order].tolist()
+        self._reverse = {}
+        for i, v in enumerate(node_ids):
+            a, b = rbounds[i], rbounds[i + 1]
+            self._reverse[v] = dict(zip(r_src[a:b], r_w[a:b]))
+
+    def remove_edge(self, from_id: int, to_id: int, bidirectional: bool = True) -> None:
+        """Remove aresta(s) entre from_id e to_id se existirem."""
+        self._frozen = None
+        self._remove_arc(from_id, to_id)
+        if bidirectional:
+            self._remove_arc(to_id, from_id)
+        self._notify('remove_edge', from_id, to_id, bidirectional)
+
+    def remove_node(self, node_id: int) -> None:
+        """Remove nó e todas as arestas entrantes/saientes relacionadas em O(grau)."""
+        if node_id not in self.nodes:
+            return
+        self._frozen = None
+        out_neighbors = [v for v, _w in self.adjacency.get(node_id, [])]
+        in_neighbors = list(self.reverse.get(node_id, {}))
+        for v in out_neighbors:
+            self._remove_arc(node_id, v)
+        for u in in_neighbors:
+            self._remove_arc(u, node_id)
+        del self.adjacency[node_id]
+        del self.reverse[node_id]
+        del self._pos[node_id]
+        del self.nodes[node_id]
+        self._notify('remove_node', node_id, out_neighbors, in_neighbors)
+
+    def in_neighbors(self, node_id: int) -> List[Tuple[int, float]]:
+        """Retorna lista de (vizinho_de_entrada_id, peso)."""
+        return list(self.reverse.get(node_id, {}).items())
+
+    def get_weight(self, from_id: int, to_id: int) -> Optional[float]:
+        return self.edge_weights.get((from_id, to_id))
+
+    def edges_count(self) -> int:
+        return self._edge_count
+
+
+class FrozenGraph:
+    """
+    Vista imutável do grafo em formato CSR.
+
+    Os nós são mapeados para índices densos 0..V-1:
+    - ids[i]: id original do nó de índice i
+    - index[nid]: índice denso do nó nid
+    - vizinhos do nó i: targets[offsets[i]:offsets[i+1]] com pesos
+      weights[offsets[i]:offsets[i+1]]
+    """
+
+    # True quando os arrays vivem em disco (mapped_graph.MappedFrozenGraph):
+    # os laços devem ler fatias em vez de converter tudo com as_lists()
+    paged = False
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray):
+        # vistas próprias só de leitura; os arrays do chamador ficam como estão
+        self.ids, self.offsets, self.targets, self.weights = (
+            arr.view() for arr in (ids, offsets, targets, weights)
+        )
+        for arr in (self.ids, self.offsets, self.targets, self.weights):
+            arr.flags.writeable = False
+        self.index: Dict[int, int] = {int(nid): i for i, nid in enumerate(ids.tolist())}
+        self._lists: Optional[Tuple[List[int], List[int], List[float]]] = None
+
+    @classmethod
+    def from_graph(cls, graph: Graph, reorder: Optional[str] = None) -> "FrozenGraph":
+        order = list(graph.nodes)
+        if reorder == 'bfs':
+            order = _bfs_order(graph, order)
+        elif reorder is not None:
+            raise ValueError(f"Reordenação desconhecida: {reorder!r}")
+
+        index = {nid: i for i, nid in enumerate(order)}
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        targets: List[int] = []
+        weights: List[float] = []
+        for i, nid in enumerate(order):
+            for v, w in graph.adjacency.get(nid, []):
+                targets.append(index[v])
+                weights.append(w)
+            offsets[i + 1] = len(targets)
+
+        return cls(
+            np.asarray(order, dtype=np.int64),
+            offsets,
+            np.asarray(targets, dtype=np.int32),
+            np.asarray(weights, dtype=np.float64),
+        )
+
+    def nodes_count(self) -> int:
+        return len(self.ids)
+
+    def edges_count(self) -> int:
+        return len(self.targets)
+
+    def index_of(self, node_id: int) -> int:
+        return self.index[node_id]
+
+    def node_id(self, idx: int) -> int:
+        return int(self.ids[idx])
+
+    def neighbors(self, idx: int) -> List[Tuple[int, float]]:
+        """Retorna lista de (índice_vizinho, peso) do nó de índice idx."""
+        offsets, targets, weights = self.as_lists()
+        a, b = offsets[idx], offsets[idx + 1]
+        return list(zip(targets[a:b], weights[a:b]))
+
+    def as_lists(self) -> Tuple[List[int], List[int], List[float]]:
+        """
+        Retorna (offsets, targets, weights) como listas Python.
+        Usado nos laços interpretados (Dijkstra), onde indexar listas é
+        bem mais rápido do que indexar escalares NumPy.
+        """
+        if self._lists is None:
+            self._lists = (self.offsets.tolist(), self.targets.tolist(), self.weights.tolist())
+        return self._lists
+
+    def transpose(self) -> "FrozenGraph":
+        """Retorna o grafo com todas as arestas invertidas (mesma indexação)."""
+        n = len(self.ids)
+        sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.offsets))
+        order = np.argsort(self.targets, kind='stable')
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.targets, minlength=n), out=offsets[1:])
+        return FrozenGraph(
+            self.ids.copy(),
+            offsets,
+            sources[order],
+            self.weights[order],
+        )
+
+    def is_symmetric(self) -> bool:
+        """
+        Verifica se para cada aresta (u, v, w) existe (v, u, w), considerando
+        o menor peso entre arestas paralelas.
+        """
+        n = len(self.ids)
+        if len(self.targets) == 0:
+            return True
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.offsets))
+        targets = self.targets.astype(np.int64)
+
+        def min_weight_edges(u, v):
+            keys = u * n + v
+            order = np.lexsort((self.weights, keys))
+            keys, w = keys[order], self.weights[order]
+            first = np.ones(len(keys), dtype=bool)
+            first[1:] = keys[1:] != keys[:-1]
+            return keys[first], w[first]
+
+        fwd_keys, fwd_w = min_weight_edges(sources, targets)
+        rev_keys, rev_w = min_weight_edges(targets, sources)
+        return bool(np.array_equal(fwd_keys, rev_keys) and np.array_equal(fwd_w, rev_w))
+
+
+def _bfs_order(graph: Graph, order: List[int]) -> List[int]:
+    """Ordem de visita BFS (componente a componente, pela ordem de inserção)."""
+    seen = set()
+    result: List[int] = []
+    for root in order:
+        if root in seen:
+            continue
+        seen.add(root)
+        queue = deque([root])
+        while queue:
+            u = queue.popleft()
+            result.append(u)
+            for v, _w in graph.adjacency.get(u, []):
+                if v not in seen:
+                    seen.add(v)
+                    queue.append(v)
+    return result
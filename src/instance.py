@@ -0,0 +1,210 @@
+"""
+Instância compilada do problema de rotas.
+
+compile_instance transforma o Graph e o resultado dos caminhos mais curtos
+(ShortestPathTable, HospitalDistanceOracle, DynamicShortestPaths ou um
+dicionário) numa ProblemInstance com arrays NumPy densos indexados por
+hospital e paciente. Os solvers de dp.py leem só estes arrays, sem filtrar
+g.nodes nem consultar all_paths.get((u, v), ...) dentro dos ciclos.
+
+As instâncias ficam em cache por tabela de caminhos e por conjunto de
+pacientes por atender (mudam quando há pacientes resgatados).
+"""
+
+import weakref
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from graph import Graph
+from node import Node
+
+INF = float('inf')
+
+# Instâncias guardadas por tabela de caminhos (as mais recentes primeiro a sair)
+_CACHE_SIZE = 8
+_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class StartCosts:
+    """
+    Custos vistos a partir de um ou mais hospitais iniciais, restritos aos
+    pacientes atendíveis (min_cost finito), em listas Python para os ciclos
+    dos DPs.
+
+    - pids, prio, svc, min_cost: por paciente k (índice local)
+    - locations: hospitais iniciais seguidos dos hospitais de entrega
+    - loc_index: id do hospital -> índice de localização
+    - d_loc[li][k]: distância da localização li ao paciente k
+    - near_li[k], near_d[k]: localização e distância do hospital de
+      entrega mais próximo do paciente k
+    """
+
+    def __init__(self, inst: "ProblemInstance", starts: List[int]):
+        cols = np.flatnonzero(np.isfinite(inst.min_cost))
+        self.cols = cols
+        self.pids: List[int] = [inst.patients[c] for c in cols.tolist()]
+        self.prio: List[int] = inst.prio[cols].tolist()
+        self.svc: List[float] = inst.svc[cols].tolist()
+        self.min_cost: List[float] = inst.min_cost[cols].tolist()
+
+        self.locations: List[int] = list(dict.fromkeys(list(starts) + inst.hospitals))
+        self.loc_index: Dict[int, int] = {h: i for i, h in enumerate(self.locations)}
+        rows = [inst.row_of[h] for h in self.locations]
+        self.d_loc: List[List[float]] = inst.dist_hp[np.ix_(rows, cols)].tolist()
+        self.near_li: List[int] = [
+            self.loc_index[inst.hospitals[h]] if h >= 0 else -1
+            for h in inst.near_h[cols].tolist()
+        ]
+        self.near_d: List[float] = inst.near_d[cols].tolist()
+
+
+class ProblemInstance:
+    """
+    Forma densa do problema (P = pacientes por atender, H = hospitais).
+
+    Atributos:
+        hospitals: ids dos hospitais de entrega
+        row_of: id do hospital -> linha de dist_hp (os hospitais iniciais
+            que não são de entrega ficam nas últimas linhas)
+        patients: ids dos pacientes (colunas), pela ordem de g.nodes
+        prio: int64 [P] prioridade
+        svc: float64 [P] tempo de atendimento
+        dist_hp: float64 [linhas × P] distância hospital → paciente (INF se não há caminho)
+        dist_ph: float64 [P × H] distância paciente → hospital de entrega
+        near_h: int64 [P] índice em `hospitals` do hospital de entrega mais
+            próximo do paciente (o primeiro em caso de empate), -1 se nenhum
+        near_d: float64 [P] distância do paciente até esse hospital
+        min_cost: float64 [P] menor custo de um atendimento (ida desde
+            algum hospital, serviço e entrega); INF se o paciente não é atendível
+    """
+
+    def __init__(self, hospitals: List[int], starts: List[int], patients: List[int],
+                 prio: np.ndarray, svc: np.ndarray, dist_hp: np.ndarray, dist_ph: np.ndarray):
+        self.hospitals = hospitals
+        self.row_of: Dict[int, int] = {h: i for i, h in enumerate(hospitals + starts)}
+        self.patients = patients
+        self.col_of: Dict[int, int] = {p: i for i, p in enumerate(patients)}
+        self.prio = prio
+        self.svc = svc
+        self.dist_hp = dist_hp
+        self.dist_ph = dist_ph
+
+        if len(hospitals) and len(patients):
+            self.near_h = np.argmin(dist_ph, axis=1).astype(np.int64)
+            self.near_d = dist_ph[np.arange(len(patients)), self.near_h]
+            self.near_h[~np.isfinite(self.near_d)] = -1
+        else:
+            self.near_h = np.full(len(patients), -1, dtype=np.int64)
+            self.near_d = np.full(len(patients), INF, dtype=np.float64)
+
+        if dist_hp.shape[0] and len(patients):
+            self.min_cost = dist_hp.min(axis=0) + svc + self.near_d
+        else:
+            self.min_cost = np.full(len(patients), INF, dtype=np.float64)
+
+        self._starts: Dict[tuple, StartCosts] = {}
+
+    def start(self, *hospital_ids: int) -> StartCosts:
+        """Custos a partir dos hospitais dados (calculados uma vez por combinação)."""
+        costs = self._starts.get(hospital_ids)
+        if costs is None:
+            costs = self._starts[hospital_ids] = StartCosts(self, list(hospital_ids))
+        return costs
+
+    def subproblem(self, g: Graph, cols: List[int], starts: Iterable[int] = ()) -> Tuple[Graph, Dict[Tuple[int, int], Tuple[float, List[int]]]]:
+        """
+        Grafo só com os hospitais e os pacientes `cols`, e as distâncias de
+        que os solvers precisam (sem caminhos): pequeno o suficiente para
+        enviar a um processo de um pool.
+        """
+        sub = Graph()
+        hospitals = list(dict.fromkeys(self.hospitals + list(starts)))
+        for h in hospitals:
+            sub.add_node(g.nodes[h])
+        dist: Dict[Tuple[int, int], Tuple[float, List[int]]] = {}
+        for c in cols:
+            pid = self.patients[c]
+            node = g.nodes[pid]
+            sub.add_node(Node(
+                id=pid, tipo=node.tipo, nome=node.nome, prioridade=node.prioridade,
+                tempo_cuidados_minimos=node.tempo_cuidados_minimos,
+            ))
+            for h in hospitals:
+                dist[(h, pid)] = (float(self.dist_hp[self.row_of[h], c]), [])
+            for j, h in enumerate(self.hospitals):
+                dist[(pid, h)] = (float(self.dist_ph[c, j]), [])
+        return sub, dist
+
+
+def _distance_block(all_paths, us: List[int], vs: List[int]) -> np.ndarray:
+    block = getattr(all_paths, 'distance_block', None)
+    if block is not None:
+        return block(us, vs)
+    out = np.full((len(us), len(vs)), INF, dtype=np.float64)
+    distance = getattr(all_paths, 'distance', None)
+    for i, u in enumerate(us):
+        for j, v in enumerate(vs):
+            if distance is not None:
+                try:
+                    out[i, j] = distance(u, v)
+                except KeyError:
+                    pass
+            else:
+                out[i, j] = all_paths.get((u, v), (INF, []))[0]
+    return out
+
+
+def compile_instance(g: Graph, all_paths, all_hospitals: List[int], starts: Iterable[int] = ()) -> ProblemInstance:
+    """
+    Compila (ou devolve da cache) a instância para os pacientes por atender.
+
+    Args:
+        g: Grafo (fornece os pacientes, prioridades e tempos de atendimento)
+        all_paths: Caminhos mais curtos; consultados só nesta compilação
+        all_hospitals: Hospitais de entrega
+        starts: Hospitais iniciais adicionais (se não forem de entrega)
+    """
+    hospitals = list(dict.fromkeys(all_hospitals))
+    extra = [h for h in dict.fromkeys(starts) if h not in set(hospitals)]
+    select = getattr(g.nodes, 'candidates', None)
+    if select is not None:
+        # NodeTable: filtro vetorizado sobre as colunas
+        ids, prio, svc = select()
+    else:
+        rows = [
+            (nid, n.prioridade or 0, n.tempo_cuidados_minimos or 0.0)
+            for nid, n in g.nodes.items()
+            if getattr(n, 'tipo', '') == 'paciente'
+            and (n.prioridade or 0) > 0
+            and not getattr(n, 'resgatado', False)
+        ]
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        prio = np.array([r[1] for r in rows], dtype=np.int64)
+        svc = np.array([r[2] for r in rows], dtype=np.float64)
+    key = (tuple(hospitals), tuple(extra), ids.tobytes(), prio.tobytes(), svc.tobytes(), getattr(all_paths, 'version', None))
+
+    try:
+        entries = _cache.setdefault(all_paths, {})
+    except TypeError:
+        # dicionários simples não aceitam weakref: compila sem cache
+        entries = None
+    if entries is not None and key in entries:
+        return entries[key]
+
+    patients = ids.tolist()
+    inst = ProblemInstance(
+        hospitals,
+        extra,
+        patients,
+        prio.astype(np.int64),
+        svc.astype(np.float64),
+        _distance_block(all_paths, hospitals + extra, patients),
+        _distance_block(all_paths, patients, hospitals),
+    )
+
+    if entries is not None:
+        if len(entries) >= _CACHE_SIZE:
+            entries.pop(next(iter(entries)))
+        entries[key] = inst
+    return inst
@@ -0,0 +1,232 @@
+"""
+Leitura dos datasets (pontos.csv, ruas.csv e dados_iniciais.csv).
+
+Cada ficheiro é lido em streaming com csv.reader: o cabeçalho é resolvido
+uma vez para índices de coluna (aceitando os nomes alternativos de
+NODE_COLUMNS / EDGE_COLUMNS / INITIAL_COLUMNS) e as linhas são convertidas
+sem dicionários por linha. As arestas entram no grafo em lotes de
+LOADER_BATCH com Graph.add_edges, por isso a memória usada além do próprio
+grafo não depende do tamanho do ficheiro.
+
+As fontes podem ser caminhos (str / Path), bytes ou objetos tipo ficheiro
+em modo binário ou texto (incluindo os ficheiros de upload do Streamlit).
+Linhas malformadas (ids em falta ou inválidos, arestas para nós
+inexistentes) são ignoradas e contadas.
+"""
+
+import csv
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from graph import Graph, IndexedGraph
+from node import Node
+
+# Nomes aceites para cada campo (comparação sem maiúsculas nem espaços);
+# o primeiro presente no cabeçalho é usado
+NODE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'id': ('id', 'node'),
+    'tipo': ('tipo',),
+    'nome': ('nome',),
+    'prioridade': ('prioridade',),
+    'tempo': ('tempo_cuidados_minimos',),
+    'is_hospital': ('is_hospital',),
+}
+EDGE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'from': ('ponto_origem', 'from', 'a', 'u', 'origem', 'source'),
+    'to': ('ponto_destino', 'to', 'b', 'v', 'destino', 'target'),
+    'weight': ('tempo_transporte', 'weight', 'peso', 'cost', 'time'),
+}
+INITIAL_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'ponto_inicial': ('ponto_inicial',),
+    'tempo_total': ('tempo_total',),
+}
+
+# Arestas acumuladas antes de cada Graph.add_edges
+LOADER_BATCH = 65536
+
+_TRUE = ('1', 'true', 'sim', 'yes')
+
+Source = object  # str | Path | bytes | objeto tipo ficheiro
+
+
+@contextmanager
+def open_text(source: Source) -> Iterator[io.TextIOBase]:
+    """Abre a fonte como texto UTF-8 sem a ler toda; não fecha objetos recebidos."""
+    if isinstance(source, (str, Path)):
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            yield f
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    if isinstance(source, io.TextIOBase):
+        yield source
+        return
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        yield text
+    finally:
+        text.detach()
+
+
+def _resolve(header: List[str], aliases: Dict[str, Tuple[str, ...]]) -> Dict[str, int]:
+    """Índice da coluna de cada campo presente no cabeçalho."""
+    position = {name.strip().lower(): i for i, name in reversed(list(enumerate(header)))}
+    columns = {}
+    for field, names in aliases.items():
+        for name in names:
+            if name in position:
+                columns[field] = position[name]
+                break
+    return columns
+
+
+def _int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def _rows(f: io.TextIOBase, aliases: Dict[str, Tuple[str, ...]]) -> Tuple[Dict[str, int], Iterator[List[str]]]:
+    reader = csv.reader(f)
+    header = next(reader, None)
+    return _resolve(header or [], aliases), reader
+
+
+def iter_nodes(f: io.TextIOBase) -> Iterator[Optional[Node]]:
+    """
+    Nós de pontos.csv já aberto, um por linha; None nas linhas malformadas.
+    Um nó é hospital se a coluna is_hospital for verdadeira ou tipo == 'hospital'.
+    """
+    cols, reader = _rows(f, NODE_COLUMNS)
+    if 'id' not in cols:
+        raise ValueError("pontos.csv sem coluna de id")
+    i_id = cols['id']
+    i_tipo, i_nome = cols.get('tipo'), cols.get('nome')
+    i_prio, i_tempo, i_hosp = cols.get('prioridade'), cols.get('tempo'), cols.get('is_hospital')
+    for row in reader:
+        n = len(row)
+        try:
+            nid = _int(row[i_id])
+            tipo = row[i_tipo] if i_tipo is not None and i_tipo < n else ''
+            nome = row[i_nome] if i_nome is not None and i_nome < n else ''
+            prio = row[i_prio] if i_prio is not None and i_prio < n else ''
+            tempo = row[i_tempo] if i_tempo is not None and i_tempo < n else ''
+            flag = row[i_hosp] if i_hosp is not None and i_hosp < n else ''
+            yield Node(
+                id=nid,
+                tipo=tipo,
+                nome=nome,
+                prioridade=_int(prio) if prio else None,
+                tempo_cuidados_minimos=float(tempo) if tempo else None,
+                is_hospital=flag.strip().lower() in _TRUE or tipo.strip().lower() == 'hospital',
+            )
+        except (IndexError, ValueError):
+            yield None
+
+
+def iter_edges(f: io.TextIOBase) -> Iterator[Optional[Tuple[int, int, float]]]:
+    """
+    Arestas (origem, destino, peso) de ruas.csv já aberto, uma por linha
+    (peso 1.0 se a coluna estiver vazia ou ausente); None nas linhas
+    malformadas.
+    """
+    cols, reader = _rows(f, EDGE_COLUMNS)
+    if 'from' not in cols or 'to' not in cols:
+        raise ValueError("ruas.csv sem colunas de origem/destino")
+    i_a, i_b, i_w = cols['from'], cols['to'], cols.get('weight')
+    for row in reader:
+        try:
+            w_raw = row[i_w] if i_w is not None and i_w < len(row) else ''
+            yield _int(row[i_a]), _int(row[i_b]), float(w_raw) if w_raw.strip() else 1.0
+        except (IndexError, ValueError):
+            yield None
+
+
+def load_nodes(g: Graph, source: Source) -> int:
+    """
+    Adiciona ao grafo os nós de pontos.csv.
+
+    Retorna o número de linhas ignoradas.
+    """
+    skipped = 0
+    with open_text(source) as f:
+        for node in iter_nodes(f):
+            if node is None:
+                skipped += 1
+                continue
+            g.add_node(node)
+    return skipped
+
+
+def load_edges(g: Graph, source: Source, bidirectional: bool = True) -> int:
+    """
+    Adiciona ao grafo as arestas de ruas.csv, em lotes de LOADER_BATCH.
+
+    Retorna o número de linhas ignoradas.
+    """
+    skipped = 0
+    with open_text(source) as f:
+        batch: List[Tuple[int, int, float]] = []
+        for edge in iter_edges(f):
+            if edge is None:
+                skipped += 1
+                continue
+            batch.append(edge)
+            if len(batch) >= LOADER_BATCH:
+                skipped += g.add_edges(batch, bidirectional)
+                batch = []
+        skipped += g.add_edges(batch, bidirectional)
+    return skipped
+
+
+def read_initial(source: Source) -> Tuple[Optional[int], Optional[float]]:
+    """
+    (ponto_inicial, tempo_total) de dados_iniciais.csv; sem as colunas com
+    esses nomes usa a primeira e a segunda. None no que faltar.
+    """
+    hospital_id, tempo_total = None, None
+    with open_text(source) as f:
+        cols, reader = _rows(f, INITIAL_COLUMNS)
+        i_start, i_total = cols.get('ponto_inicial', 0), cols.get('tempo_total', 1)
+        for row in reader:
+            if hospital_id is None and i_start < len(row) and row[i_start].strip():
+                try:
+                    hospital_id = _int(row[i_start])
+                except ValueError:
+                    pass
+            if tempo_total is None and i_total < len(row) and row[i_total].strip():
+                try:
+                    tempo_total = float(row[i_total])
+                except ValueError:
+                    pass
+            if hospital_id is not None and tempo_total is not None:
+                break
+    return hospital_id, tempo_total
+
+
+def read_time_budget(source: Source) -> Optional[float]:
+    """tempo_total de dados_iniciais.csv; None se o ficheiro não existir ou não o tiver."""
+    try:
+        return read_initial(source)[1]
+    except FileNotFoundError:
+        return None
+
+
+def load_dataset(nodes: Source, edges: Source, initial: Optional[Source] = None, graph_cls: Type[Graph] = IndexedGraph) -> Tuple[Graph, Optional[int], Optional[float]]:
+    """
+    Carrega um dataset completo.
+
+    Returns:
+        (grafo, ponto_inicial, tempo_total); os dois últimos são None sem
+        dados_iniciais.csv
+    """
+    g = graph_cls()
+    load_nodes(g, nodes)
+    load_edges(g, edges)
+    hospital_id, tempo_total = read_initial(initial) if initial is not None else (None, None)
+    return g, hospital_id, tempo_total
@@ -1,83 +1,53 @@
 from pathlib import Path
-from node import Node
-from graph import Graph
+from graph import Graph, IndexedGraph
+import loader
 from dijkstra import (
     dijkstra,
     get_shortest_path,
     all_pairs_shortest_paths,
+    hospital_shortest_paths,
     print_shortest_paths,
     print_distance_matrix
 )
+from path_cache import cached_shortest_paths
+from fleet import Vehicle, plan_fleet
+from snapshot import SNAPSHOT_NAME, dataset_sources, load_snapshot
 from dp import (
-    read_time_budget,
-    maximize_priority_dp,
-    greedy_maximize_priority,
+    ANYTIME_DP_MAX_PATIENTS,
+    ANYTIME_TIME_LIMIT_MS,
+    SolverTimeout,
+    best_within,
+    maximize_priority_multi_start,
 )
-import csv
 import time
 from UI.interface import draw_graph
 
 DIFFICULTY = "hard"
 LEVEL = "9"
 
+# Frota: [(hospital_inicial, budget), ...]; budget None usa o tempo_total do
+# dataset. Vazia = uma só ambulância a partir do melhor hospital
+FLEET = []
+
 # Make dataset paths relative to repository root (two levels up from this file's folder)
 BASE_DIR = Path(__file__).resolve().parent.parent
 PATH_NODES = BASE_DIR / "datasets" / DIFFICULTY / LEVEL / "pontos.csv"
 PATH_EDGES = BASE_DIR / "datasets" / DIFFICULTY / LEVEL / "ruas.csv"
 PATH_INITIAL = BASE_DIR / "datasets" / DIFFICULTY / LEVEL / "dados_iniciais.csv"
+# Gerado com `python src/snapshot.py datasets/<nível>/<n>`; ignorado se os CSV mudarem
+PATH_SNAPSHOT = BASE_DIR / "datasets" / DIFFICULTY / LEVEL / SNAPSHOT_NAME
 
-g = Graph()
+g = IndexedGraph()
 
 def load_nodes(path):
-    with open(path, newline='', encoding='utf-8') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            nid = int(row.get('id') or row.get('Id') or row.get('ID') or row.get('node') )
-            tipo = row.get('tipo','')
-            nome = row.get('nome','')
-            prioridade = int(row['prioridade']) if row.get('prioridade') else None
-            tempo = float(row['tempo_cuidados_minimos']) if row.get('tempo_cuidados_minimos') else None
-            # determina is_hospital a partir da coluna se existir, caso contrário deduz pelo tipo
-            is_h_col = row.get('is_hospital', '')
-            is_h = False
-            try:
-                if isinstance(is_h_col, str) and is_h_col.strip() != '':
-                    is_h = is_h_col.lower().strip() in ('1', 'true', 'sim', 'yes')
-            except Exception:
-                is_h = False
-            # se não houver coluna explícita, marque como hospital quando tipo == 'hospital'
-            if not is_h and isinstance(tipo, str) and tipo.strip().lower() == 'hospital':
-                is_h = True
-            n = Node(id=nid, tipo=tipo, nome=nome, prioridade=prioridade, tempo_cuidados_minimos=tempo, is_hospital=is_h)
-            g.add_node(n)
+    skipped = loader.load_nodes(g, path)
+    if skipped:
+        print(f"Ignorados {skipped} nós malformados em {path}")
 
 def load_edges(path):
-    with open(path, newline='', encoding='utf-8') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            # suporte a diferentes nomes de coluna encontrados nos datasets
-            a_raw = row.get('from') or row.get('a') or row.get('u') or row.get('ponto_origem') or row.get('origem') or row.get('source')
-            b_raw = row.get('to') or row.get('b') or row.get('v') or row.get('ponto_destino') or row.get('destino') or row.get('target')
-            w_raw = row.get('weight') or row.get('peso') or row.get('cost') or row.get('tempo_transporte') or row.get('time')
-
-            if a_raw is None or b_raw is None:
-                # pula linhas malformadas
-                print(f"Ignorando aresta com colunas ausentes: {row}")
-                continue
-
-            try:
-                a = int(a_raw)
-                b = int(b_raw)
-            except ValueError:
-                print(f"Ignorando aresta com ids inválidos: {row}")
-                continue
-
-            try:
-                w = float(w_raw) if w_raw not in (None, '') else 1.0
-            except ValueError:
-                w = 1.0
-
-            g.add_edge(a, b, w, bidirectional=True)
+    skipped = loader.load_edges(g, path)
+    if skipped:
+        print(f"Ignoradas {skipped} arestas malformadas ou com nós inexistentes em {path}")
 
 def print_graph(graph: Graph):
     # print nodes
@@ -124,14 +94,18 @@ def print_graph(graph: Graph):
             print("\nNenhuma representação de arestas encontrada no objeto Graph.")
 
 def main():
-    # Carrega os dados do grafo
+    global g
+    # Carrega os dados do grafo (do snapshot binário, se estiver atualizado)
     print("Carregando grafo do dataset...")
-    load_nodes(PATH_NODES)
-    load_edges(PATH_EDGES)
+    snap = load_snapshot(PATH_SNAPSHOT, sources=dataset_sources(PATH_SNAPSHOT.parent))
+    if snap is not None:
+        g = snap.graph
+        print(f"Grafo lido do snapshot {PATH_SNAPSHOT.name}")
+    else:
+        load_nodes(PATH_NODES)
+        load_edges(PATH_EDGES)
     # opcional: zera estado de resgate no início da execução
-    for _nid, _n in g.nodes.items():
-        if getattr(_n, 'tipo', '') == 'paciente':
-            _n.resgatado = False
+    g.nodes.reset_rescued()
     print_graph(g)
     # Desenha o grafo usando NetworkX/Matplotlib (UI)
     #try:
@@ -139,59 +113,87 @@ def main():
     #except Exception as e:
     #    print(f"Aviso: falha ao desenhar grafo na UI: {e}")
     
-    # Calcula caminhos mais curtos entre todos os pares de nós
-    print("\nCalculando caminhos mais curtos com Dijkstra...")
-    print("Complexidade: O(V² × (V + E) log V) onde V = nós, E = arestas")
+    # Identifica hospitais (raízes das árvores de caminhos mais curtos)
+    hospital_ids = g.nodes.hospitals().tolist()
+
+    # Calcula caminhos mais curtos a partir/até cada hospital
+    print("\nCalculando caminhos mais curtos com Dijkstra (enraizado nos hospitais)...")
+    print("Complexidade: O(H × E log V) onde H = hospitais, V = nós, E = arestas")
     start_dijkstra = time.time()
-    all_paths = all_pairs_shortest_paths(g)
+    if snap is not None and snap.paths is not None and set(hospital_ids) <= set(snap.paths.ids[snap.paths.sources].tolist()):
+        all_paths, origem = snap.paths, " (snapshot)"
+    else:
+        all_paths, from_cache = cached_shortest_paths(g, [PATH_NODES, PATH_EDGES], hospitals=hospital_ids)
+        origem = " (cache em disco)" if from_cache else ""
     elapsed_dijkstra = time.time() - start_dijkstra
-    print(f"⏱️ Tempo Dijkstra: {elapsed_dijkstra:.4f}s")
+    print(f"⏱️ Tempo Dijkstra: {elapsed_dijkstra:.4f}s{origem}")
 
 
     # Lê budget de tempo
-    time_budget = read_time_budget(PATH_INITIAL)
+    time_budget = loader.read_time_budget(PATH_INITIAL)
     if time_budget is None:
         print("\n[AVISO] Nenhum tempo_total encontrado em dados_iniciais.csv; não será feita otimização por budget.\n")
         return
 
     print(f"\nTempo total disponível (budget): {time_budget:.2f}")
 
-    # Identifica hospitais e pacientes
-    hospital_ids = [nid for nid, n in g.nodes.items() if getattr(n, 'is_hospital', False)]
-    pacientes = [(nid, n) for nid, n in g.nodes.items() if getattr(n, 'tipo', '') == 'paciente' and (n.prioridade or 0) > 0]
-    num_pacientes = len(pacientes)
+    # Identifica pacientes
+    num_pacientes = len(g.nodes.candidates(include_rescued=True)[0])
     print(f"Hospitais encontrados: {len(hospital_ids)} | Pacientes candidatos: {num_pacientes}")
 
     if not hospital_ids:
         print("Nenhum hospital encontrado no grafo; abortando.")
         return
 
-    # Escolhe método conforme número de pacientes
-    use_dp = num_pacientes <= 20
-    metodo = 'DP (ótimo)' if use_dp else 'Heurística (gananciosa)'
-    print(f"Método de otimização: {metodo}")
-    
-    if use_dp:
-        print("Complexidade DP: O(H × 2^P × P × V) onde H = hospitais, P = pacientes, V = nós")
-    else:
-        print("Complexidade Heurística: O(H × P² × V) onde H = hospitais, P = pacientes, V = nós")
+    if FLEET:
+        run_fleet(all_paths, hospital_ids, time_budget)
+        return
+
+    # Melhor resposta dentro de ANYTIME_TIME_LIMIT_MS: primeiro o DP
+    # multi-partida (ótimo para todos os hospitais numa só passagem); se não
+    # couber no prazo, solve_anytime por hospital com a sua parte do tempo restante
+    print(f"Método de otimização: melhor resposta em {ANYTIME_TIME_LIMIT_MS} ms")
+    print("Complexidade DP (multi-partida): O(2^P × P × H) onde H = hospitais, P = pacientes "
+          "(uma só passagem para todos os hospitais iniciais)")
+    print("Senão, por hospital: heurística O(P × (P log P + H × P)) → beam search → "
+          "DP esparso O(H × S × P), meet-in-the-middle ou branch-and-bound, até ao prazo")
 
     best = {
         'hospital': None,
         'route': [],
         'priority': 0,
         'time': float('inf'),
-        'optimal': use_dp,
+        'method': None,
     }
+    # Limite superior da prioridade da rota escolhida (do mesmo hospital inicial)
+    upper_bound = 0
 
     start_optimization = time.time()
-    for hid in hospital_ids:
-        if use_dp:
-            route, prio, t, _ = maximize_priority_dp(g, all_paths, hid, time_budget, hospital_ids)
-        else:
-            route, prio, t, _ = greedy_maximize_priority(g, all_paths, hid, time_budget, hospital_ids)
-        if prio > best['priority'] or (prio == best['priority'] and t < best['time']):
-            best.update({'hospital': hid, 'route': route, 'priority': prio, 'time': t, 'optimal': use_dp})
+    deadline = time.monotonic() + ANYTIME_TIME_LIMIT_MS / 1000.0
+    try:
+        # Uma única passagem do DP responde a todos os hospitais iniciais
+        (hid, route, prio, t), per_start = maximize_priority_multi_start(
+            g, all_paths, time_budget, hospital_ids,
+            deadline=deadline, max_states=(1 << ANYTIME_DP_MAX_PATIENTS) * len(hospital_ids),
+        )
+    except SolverTimeout as e:
+        print(f"  DP multi-partida interrompido ({e}); melhor resposta por hospital")
+        for i, hid in enumerate(hospital_ids):
+            share_ms = max(0.0, deadline - time.monotonic()) * 1000.0 / (len(hospital_ids) - i)
+            inc = best_within(g, all_paths, hid, time_budget, hospital_ids, share_ms)
+            estado = "ótima" if inc.optimal else f"≤ {inc.upper_bound}"
+            print(f"  Partindo de H{hid}: prioridade {inc.priority} em {inc.time:.2f} ({inc.method}, {estado})")
+            if inc.priority > best['priority'] or (inc.priority == best['priority'] and inc.time < best['time']):
+                best.update({'hospital': hid, 'route': inc.route, 'priority': inc.priority,
+                             'time': inc.time, 'method': inc.method})
+                upper_bound = inc.upper_bound
+    else:
+        best.update({'hospital': hid, 'route': route, 'priority': prio, 'time': t, 'method': 'dp'})
+        upper_bound = prio
+        for h, (_route, p, ht) in per_start.items():
+            print(f"  Partindo de H{h}: prioridade {p} em {ht:.2f}")
+    best['upper_bound'] = max(upper_bound, best['priority'])
+    best['optimal'] = best['upper_bound'] == best['priority']
     elapsed_optimization = time.time() - start_optimization
     print(f"⏱️ Tempo Otimização: {elapsed_optimization:.4f}s")
 
@@ -205,7 +207,17 @@ def main():
     print("="*80)
     hid = best['hospital']
     print(f"Hospital inicial: {hid} ({g.nodes[hid].nome})")
-    print(f"Tipo de solução: {'ÓTIMA (DP)' if best['optimal'] else 'HEURÍSTICA'}")
+    if best['optimal']:
+        print(f"Tipo de solução: {'ÓTIMA (DP)' if best['method'] in ('sparse', 'dp') else 'ÓTIMA (provada)'}")
+    else:
+        gap = (best['upper_bound'] - best['priority']) / best['upper_bound']
+        metodo = {
+            'greedy': 'Heurística (gananciosa)',
+            'beam': 'Beam search',
+            'bnb': 'Branch-and-bound',
+            'lns': 'Heurística (LNS)',
+        }.get(best['method'], best['method'])
+        print(f"Tipo de solução: {metodo} | prioridade {best['priority']} ≤ ótimo ≤ {best['upper_bound']} (gap {gap:.1%})")
 
     # A rota agora é uma lista de tuplas (tipo, nid)
     route_nodes = best['route']
@@ -269,5 +281,33 @@ def main():
     print(f"Pacientes resgatados: {', '.join(rescued_ids) if rescued_ids else 'nenhum'}")
     print("="*80)
 
+def run_fleet(all_paths, hospital_ids, time_budget):
+    """Planeia e imprime as rotas da frota FLEET."""
+    vehicles = [Vehicle(h, time_budget if b is None else float(b)) for h, b in FLEET]
+    print(f"Método de otimização: frota de {len(vehicles)} ambulâncias, "
+          f"melhor resposta em {ANYTIME_TIME_LIMIT_MS} ms por veículo (em paralelo)")
+
+    start_optimization = time.time()
+    plan = plan_fleet(g, all_paths, vehicles, hospital_ids)
+    print(f"⏱️ Tempo Otimização: {time.time() - start_optimization:.4f}s")
+
+    print("\n" + "="*80)
+    print("PLANO DA FROTA")
+    print("="*80)
+    for i, (vehicle, inc) in enumerate(zip(vehicles, plan.routes), 1):
+        percurso = " → ".join(f"{tipo}{nid}" for tipo, nid in inc.route)
+        estado = "ótima" if inc.optimal else f"≤ {inc.upper_bound}"
+        print(f"Ambulância {i} (H{vehicle.hospital_id}, budget {vehicle.time_budget:.2f}): "
+              f"prioridade {inc.priority} em {inc.time:.2f} ({inc.method}, {estado})")
+        print(f"  Percurso: {percurso}")
+        for tipo, nid in inc.route:
+            if tipo == 'P':
+                g.nodes[nid].resgatado = True
+    print("-"*80)
+    print(f"Prioridade total atendida: {plan.priority}")
+    print(f"Tempo total usado (soma das ambulâncias): {plan.time:.2f}")
+    print(f"Pacientes por atender: {', '.join(str(p) for p in plan.unserved) if plan.unserved else 'nenhum'}")
+    print("="*80)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,435 @@
+"""
+Grafo guardado em ficheiros memory-mapped, para redes que não cabem em RAM
+como objetos Python (Node + listas de tuplos em Graph.adjacency).
+
+Uma pasta de grafo mapeado contém arrays .npy abertos com
+np.load(mmap_mode='r'); o SO só carrega as páginas que forem lidas:
+- ids (int64, ordenados), offsets (int64), targets (int32), weights
+  (WEIGHT_DTYPE): adjacência em CSR, no formato de FrozenGraph
+- tipo (códigos em meta.json), prioridade / has_prioridade, tempo (NaN se
+  não há), is_hospital: uma coluna por atributo de Node
+- nomes (bytes UTF-8 concatenados), nome_offsets e nome_row
+
+MappedGraph expõe a interface de leitura de Graph (nodes, adjacency,
+get_neighbors, freeze...) com vistas que constroem Node e listas de
+vizinhos só para os nós consultados; dijkstra.dijkstra funciona sem
+alterações e, como a vista CSR é paged, lê só a fatia de cada nó fechado.
+
+A construção a partir dos CSV também não passa por um Graph: as colunas dos
+nós são acumuladas em arrays e os arcos vão para ficheiros temporários,
+sendo depois espalhados pelo CSR em disco por blocos (contagem por origem).
+Converter um dataset:
+
+    python src/mapped_graph.py datasets/hard/9 /caminho/grafo
+"""
+
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from graph import FrozenGraph, Graph
+from node import Node
+import loader
+
+# Incrementar sempre que o formato dos ficheiros mudar
+MAPPED_VERSION = 1
+
+# Pesos das arestas (o array dominante): float32 chega para tempos de transporte
+WEIGHT_DTYPE = np.float32
+
+# Arcos processados por bloco ao espalhar o CSR
+MAPPED_CHUNK = 1 << 20
+
+_NODE_COLUMNS = ('tipo', 'prioridade', 'has_prioridade', 'tempo', 'is_hospital', 'nome_row')
+
+
+class MappedFrozenGraph(FrozenGraph):
+    """
+    Vista CSR sobre arrays memory-mapped. Os ids estão ordenados, por isso
+    index_of é uma pesquisa binária e não há dicionário id → índice.
+    """
+
+    paged = True
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray, files: Dict[str, Path], symmetric: Optional[bool] = None):
+        self.ids = ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        # ficheiros de cada array, reabertos pelos processos de dijkstra
+        self.files = files
+        self._symmetric = symmetric
+        self._lists = None
+
+    def index_of(self, node_id: int) -> int:
+        i = int(np.searchsorted(self.ids, node_id))
+        if i == len(self.ids) or int(self.ids[i]) != node_id:
+            raise KeyError(node_id)
+        return i
+
+    def neighbors(self, idx: int) -> List[Tuple[int, float]]:
+        a, b = self.offsets[idx:idx + 2].tolist()
+        return list(zip(self.targets[a:b].tolist(), self.weights[a:b].tolist()))
+
+    def is_symmetric(self) -> bool:
+        if self._symmetric is None:
+            self._symmetric = super().is_symmetric()
+        return self._symmetric
+
+
+def _iter_ids(ids: np.ndarray) -> Iterator[int]:
+    for start in range(0, len(ids), MAPPED_CHUNK):
+        yield from ids[start:start + MAPPED_CHUNK].tolist()
+
+
+class _NodeView(Mapping):
+    """graph.nodes de um MappedGraph: cada acesso constrói um Node novo a partir das colunas."""
+
+    def __init__(self, frozen: MappedFrozenGraph, columns: Dict[str, np.ndarray], tipos: List[str]):
+        self._frozen = frozen
+        self._columns = columns
+        self._tipos = tipos
+
+    def __getitem__(self, node_id: int) -> Node:
+        i = self._frozen.index_of(node_id)
+        c = self._columns
+        row = int(c['nome_row'][i])
+        a, b = c['nome_offsets'][row:row + 2].tolist()
+        tempo = float(c['tempo'][i])
+        return Node(
+            id=node_id,
+            tipo=self._tipos[int(c['tipo'][i])],
+            nome=c['nomes'][a:b].tobytes().decode('utf-8'),
+            prioridade=int(c['prioridade'][i]) if c['has_prioridade'][i] else None,
+            tempo_cuidados_minimos=None if math.isnan(tempo) else tempo,
+            is_hospital=bool(c['is_hospital'][i]),
+        )
+
+    def __contains__(self, node_id) -> bool:
+        try:
+            self._frozen.index_of(node_id)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        return _iter_ids(self._frozen.ids)
+
+    def __len__(self) -> int:
+        return len(self._frozen.ids)
+
+    # mesmos filtros que NodeTable, calculados sobre as colunas mapeadas
+
+    def hospitals(self) -> np.ndarray:
+        """Ids dos hospitais."""
+        return np.asarray(self._frozen.ids[np.asarray(self._columns['is_hospital'])], dtype=np.int64)
+
+    def candidates(self, include_rescued: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pacientes com prioridade > 0, pela ordem dos ids. Não há estado de
+        resgate (os Node são cópias), por isso include_rescued não muda nada.
+
+        Returns:
+            (ids, prioridades, tempos de cuidados com 0.0 onde não há)
+        """
+        c = self._columns
+        if 'paciente' not in self._tipos:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float64)
+        prio = np.asarray(c['prioridade'])
+        mask = (np.asarray(c['tipo']) == self._tipos.index('paciente')) & np.asarray(c['has_prioridade']) & (prio > 0)
+        return (
+            np.asarray(self._frozen.ids[mask], dtype=np.int64),
+            prio[mask].astype(np.int64),
+            np.nan_to_num(np.asarray(c['tempo'])[mask], nan=0.0).astype(np.float64),
+        )
+
+    def reset_rescued(self, tipo: str = 'paciente') -> None:
+        """Nada a fazer: o grafo mapeado não guarda o estado de resgate."""
+
+
+class _AdjacencyView(Mapping):
+    """graph.adjacency de um MappedGraph: lista (vizinho_id, peso) construída a cada acesso."""
+
+    def __init__(self, frozen: MappedFrozenGraph):
+        self._frozen = frozen
+
+    def __getitem__(self, node_id: int) -> List[Tuple[int, float]]:
+        frozen = self._frozen
+        i = frozen.index_of(node_id)
+        a, b = frozen.offsets[i:i + 2].tolist()
+        return list(zip(frozen.ids[frozen.targets[a:b]].tolist(), frozen.weights[a:b].tolist()))
+
+    def __contains__(self, node_id) -> bool:
+        try:
+            self._frozen.index_of(node_id)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        return _iter_ids(self._frozen.ids)
+
+    def __len__(self) -> int:
+        return len(self._frozen.ids)
+
+
+class MappedGraph(Graph):
+    """
+    Grafo só de leitura sobre uma pasta criada por build_mapped_graph ou
+    write_mapped_graph. Os Node devolvidos são cópias: alterá-los não muda
+    o grafo.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        # sem Graph.__init__: nodes e adjacency são vistas sobre os ficheiros
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != MAPPED_VERSION:
+            raise ValueError(f"Versão de grafo mapeado não suportada: {meta.get('version')!r}")
+        files = {name: self.path / f"{name}.npy" for name in ('ids', 'offsets', 'targets', 'weights')}
+        arrays = {name: np.load(file, mmap_mode='r') for name, file in files.items()}
+        self._frozen = MappedFrozenGraph(
+            arrays['ids'], arrays['offsets'], arrays['targets'], arrays['weights'],
+            files, meta.get("symmetric"),
+        )
+        columns = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode='r')
+            for name in _NODE_COLUMNS + ('nome_offsets', 'nomes')
+        }
+        self.nodes = _NodeView(self._frozen, columns, meta["tipos"])
+        self.adjacency = _AdjacencyView(self._frozen)
+        self._listeners = []
+
+    def freeze(self, reorder: Optional[str] = None) -> FrozenGraph:
+        if reorder is None:
+            return self._frozen
+        return FrozenGraph.from_graph(self, reorder=reorder)
+
+    def nodes_count(self) -> int:
+        return len(self._frozen.ids)
+
+    def edges_count(self) -> int:
+        return len(self._frozen.targets)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("MappedGraph é só de leitura")
+
+    add_node = add_edge = add_edges = remove_edge = set_edge_weight = remove_node = _read_only
+
+
+# ----------------------------------------------------------------------------
+# Construção: colunas dos nós em memória (arrays), arcos em ficheiros
+# temporários e CSR escrito diretamente nos .npy de destino.
+# ----------------------------------------------------------------------------
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _node_columns(nodes: Iterable[Node]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """
+    Colunas da tabela de nós, ordenadas por id (com ids repetidos fica o
+    último, como em Graph.add_node). Os nomes ficam pela ordem de chegada e
+    nome_row liga cada nó à sua linha original.
+    """
+    tipos: Dict[str, int] = {}
+    parts: Dict[str, list] = {name: [] for name in ('ids', 'tipo', 'prioridade', 'has_prioridade', 'tempo', 'is_hospital', 'nome_len')}
+    nomes = bytearray()
+    for batch in _batches(nodes, loader.LOADER_BATCH):
+        encoded = [(n.nome or '').encode('utf-8') for n in batch]
+        nomes.extend(b''.join(encoded))
+        parts['nome_len'].append(np.fromiter(map(len, encoded), dtype=np.int64, count=len(batch)))
+        parts['ids'].append(np.array([n.id for n in batch], dtype=np.int64))
+        parts['tipo'].append(np.array([tipos.setdefault(n.tipo or '', len(tipos)) for n in batch], dtype=np.int32))
+        parts['prioridade'].append(np.array([n.prioridade or 0 for n in batch], dtype=np.int64))
+        parts['has_prioridade'].append(np.array([n.prioridade is not None for n in batch], dtype=bool))
+        parts['tempo'].append(np.array([np.nan if n.tempo_cuidados_minimos is None else n.tempo_cuidados_minimos for n in batch], dtype=np.float64))
+        parts['is_hospital'].append(np.array([bool(n.is_hospital) for n in batch], dtype=bool))
+    empty = {'ids': np.int64, 'tipo': np.int32, 'prioridade': np.int64, 'has_prioridade': bool, 'tempo': np.float64, 'is_hospital': bool, 'nome_len': np.int64}
+    cols = {name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=empty[name]) for name, chunks in parts.items()}
+
+    order = np.argsort(cols['ids'], kind='stable')
+    sorted_ids = cols['ids'][order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+    order = order[last]
+
+    nome_offsets = np.zeros(len(cols['nome_len']) + 1, dtype=np.int64)
+    np.cumsum(cols['nome_len'], out=nome_offsets[1:])
+    out = {name: cols[name][order] for name in ('ids', 'tipo', 'prioridade', 'has_prioridade', 'tempo', 'is_hospital')}
+    out['nome_row'] = order.astype(np.int64)
+    out['nome_offsets'] = nome_offsets
+    out['nomes'] = np.frombuffer(bytes(nomes), dtype=np.uint8)
+    names = sorted(tipos, key=tipos.get)
+    if len(names) > np.iinfo(np.int8).max:
+        out['tipo'] = out['tipo'].astype(np.int32)
+    else:
+        out['tipo'] = out['tipo'].astype(np.int8)
+    return out, names
+
+
+def _group_counts(sorted_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(valores distintos, início de cada grupo, tamanho de cada grupo) de um array ordenado."""
+    starts = np.flatnonzero(np.r_[True, sorted_idx[1:] != sorted_idx[:-1]]) if len(sorted_idx) else np.zeros(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(sorted_idx)])
+    return sorted_idx[starts], starts, counts
+
+
+class _ArcSpool:
+    """Arcos (origem, destino, peso) em índices densos, guardados em ficheiros temporários."""
+
+    def __init__(self, folder: Path, n: int):
+        self.folder = folder
+        self.n = n
+        self.degree = np.zeros(n, dtype=np.int64)
+        self.count = 0
+        self._files = {name: open(folder / f"{name}.bin", "wb") for name in ('src', 'dst', 'w')}
+
+    def add(self, src: np.ndarray, dst: np.ndarray, w: np.ndarray) -> None:
+        src.astype(np.int32).tofile(self._files['src'])
+        dst.astype(np.int32).tofile(self._files['dst'])
+        w.astype(WEIGHT_DTYPE).tofile(self._files['w'])
+        uniq, _starts, counts = _group_counts(np.sort(src))
+        self.degree[uniq] += counts
+        self.count += len(src)
+
+    def write_csr(self, out: Path) -> None:
+        """Escreve offsets / targets / weights em `out`, arcos de cada nó pela ordem de chegada."""
+        for f in self._files.values():
+            f.close()
+        offsets = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(self.degree, out=offsets[1:])
+        np.save(out / "offsets.npy", offsets)
+        targets = np.lib.format.open_memmap(out / "targets.npy", mode='w+', dtype=np.int32, shape=(self.count,))
+        weights = np.lib.format.open_memmap(out / "weights.npy", mode='w+', dtype=WEIGHT_DTYPE, shape=(self.count,))
+        if self.count:
+            spool = {
+                'src': np.memmap(self.folder / "src.bin", dtype=np.int32, mode='r'),
+                'dst': np.memmap(self.folder / "dst.bin", dtype=np.int32, mode='r'),
+                'w': np.memmap(self.folder / "w.bin", dtype=WEIGHT_DTYPE, mode='r'),
+            }
+            cursor = offsets[:-1].copy()
+            for start in range(0, self.count, MAPPED_CHUNK):
+                end = min(start + MAPPED_CHUNK, self.count)
+                src = np.asarray(spool['src'][start:end])
+                order = np.argsort(src, kind='stable')
+                s = src[order]
+                uniq, starts, counts = _group_counts(s)
+                # posição = próximo lugar livre da origem + ordem dentro do bloco
+                rank = np.arange(len(s), dtype=np.int64) - np.repeat(starts, counts)
+                pos = cursor[s] + rank
+                targets[pos] = spool['dst'][start:end][order]
+                weights[pos] = spool['w'][start:end][order]
+                cursor[uniq] += counts
+            del spool
+        targets.flush()
+        weights.flush()
+        del targets, weights
+
+
+def _write(path: Union[str, Path], nodes: Iterable[Node], arcs: Iterable[Tuple[int, int, float]], bidirectional: bool, symmetric: Optional[bool]) -> Tuple[MappedGraph, int]:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        cols, tipos = _node_columns(nodes)
+        ids = cols['ids']
+        n = len(ids)
+        for name, arr in cols.items():
+            np.save(tmp / f"{name}.npy", arr)
+
+        spool_dir = tmp / "spool"
+        spool_dir.mkdir()
+        spool = _ArcSpool(spool_dir, n)
+        skipped = 0
+        for batch in _batches(arcs, loader.LOADER_BATCH):
+            u = np.array([a[0] for a in batch], dtype=np.int64)
+            v = np.array([a[1] for a in batch], dtype=np.int64)
+            w = np.array([a[2] for a in batch], dtype=np.float64)
+            iu = np.searchsorted(ids, u)
+            iv = np.searchsorted(ids, v)
+            ok = (iu < n) & (iv < n)
+            ok[ok] &= (ids[iu[ok]] == u[ok]) & (ids[iv[ok]] == v[ok])
+            skipped += int(len(batch) - ok.sum())
+            iu, iv, w = iu[ok], iv[ok], w[ok]
+            if bidirectional:
+                # u→v e v→u intercalados, como em Graph.add_edges
+                iu, iv, w = np.stack([iu, iv], axis=1).ravel(), np.stack([iv, iu], axis=1).ravel(), np.repeat(w, 2)
+            spool.add(iu, iv, w)
+        spool.write_csr(tmp)
+        shutil.rmtree(spool_dir)
+
+        meta = {
+            "version": MAPPED_VERSION,
+            "nodes": n,
+            "arcs": spool.count,
+            "symmetric": True if bidirectional else symmetric,
+            "tipos": tipos,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            shutil.rmtree(tmp, ignore_errors=True)
+    return MappedGraph(path), skipped
+
+
+def build_mapped_graph(nodes: loader.Source, edges: loader.Source, path: Union[str, Path], bidirectional: bool = True) -> Tuple[MappedGraph, int]:
+    """
+    Cria a pasta `path` a partir de pontos.csv e ruas.csv sem construir um
+    Graph em memória.
+
+    Returns:
+        (grafo mapeado, arestas ignoradas: malformadas ou com nós inexistentes)
+    """
+    with loader.open_text(nodes) as fn, loader.open_text(edges) as fe:
+        bad = [0]
+
+        def valid(rows):
+            for row in rows:
+                if row is None:
+                    bad[0] += 1
+                else:
+                    yield row
+
+        g, skipped = _write(path, valid(loader.iter_nodes(fn)), valid(loader.iter_edges(fe)), bidirectional, None)
+    return g, skipped + bad[0]
+
+
+def write_mapped_graph(g: Graph, path: Union[str, Path]) -> MappedGraph:
+    """Grava um grafo já em memória como pasta de grafo mapeado."""
+    arcs = ((u, v, w) for u, neighbors in g.adjacency.items() for v, w in neighbors)
+    mapped, _skipped = _write(path, g.nodes.values(), arcs, False, g.freeze().is_symmetric())
+    return mapped
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Uso: python src/mapped_graph.py <pasta_do_dataset> <pasta_de_saida>")
+        sys.exit(2)
+    folder, out = Path(argv[0]), Path(argv[1])
+    g, skipped = build_mapped_graph(folder / "pontos.csv", folder / "ruas.csv", out)
+    print(f"{folder} -> {out}: {g.nodes_count()} nós, {g.edges_count()} arcos ({skipped} linhas ignoradas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-from typing import Optional
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 class Node:
     def __init__(
@@ -32,3 +35,331 @@ class Node:
 
     def __repr__(self) -> str:
         return f"Node(id={self.id}, nome={self.nome!r}, tipo={self.tipo!r}, resgatado={getattr(self, 'resgatado', False)})"
+
+
+class NodeView:
+    """
+    Nó guardado numa NodeTable: os atributos são lidos e escritos diretamente
+    nas colunas da tabela (n.resgatado = True fica no grafo).
+
+    Tem os mesmos atributos e métodos que Node, mas não herda dele: assim
+    __slots__ vale e cada vista não aloca um __dict__.
+    """
+
+    __slots__ = ('_table', '_row')
+
+    to_dict = Node.to_dict
+    __repr__ = Node.__repr__
+
+    def __init__(self, table: "NodeTable", row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def id(self) -> int:
+        return int(self._table._ids[self._row])
+
+    @property
+    def tipo(self) -> str:
+        return self._table._tipos[self._table._tipo[self._row]]
+
+    @tipo.setter
+    def tipo(self, value: str) -> None:
+        self._table._tipo[self._row] = self._table._tipo_code(value)
+
+    @property
+    def nome(self) -> str:
+        t = self._table
+        start = int(t._nome_start[self._row])
+        return t._nome_buf[start:start + int(t._nome_len[self._row])].decode('utf-8')
+
+    @nome.setter
+    def nome(self, value: str) -> None:
+        self._table._set_nome(self._row, value or "")
+
+    @property
+    def prioridade(self) -> Optional[int]:
+        t = self._table
+        return int(t._prioridade[self._row]) if t._has_prioridade[self._row] else None
+
+    @prioridade.setter
+    def prioridade(self, value: Optional[int]) -> None:
+        t = self._table
+        t._has_prioridade[self._row] = value is not None
+        t._prioridade[self._row] = value or 0
+
+    @property
+    def tempo_cuidados_minimos(self) -> Optional[float]:
+        value = float(self._table._tempo[self._row])
+        return None if value != value else value
+
+    @tempo_cuidados_minimos.setter
+    def tempo_cuidados_minimos(self, value: Optional[float]) -> None:
+        self._table._tempo[self._row] = np.nan if value is None else value
+
+    @property
+    def is_hospital(self) -> bool:
+        return bool(self._table._is_hospital[self._row])
+
+    @is_hospital.setter
+    def is_hospital(self, value: bool) -> None:
+        self._table._is_hospital[self._row] = bool(value)
+
+    @property
+    def resgatado(self) -> bool:
+        return bool(self._table._resgatado[self._row])
+
+    @resgatado.setter
+    def resgatado(self, value: bool) -> None:
+        self._table._resgatado[self._row] = bool(value)
+
+    def __reduce__(self):
+        # fora da tabela (pickle para outro processo) viaja como Node simples
+        return (Node, (self.id, self.tipo, self.nome, self.prioridade,
+                       self.tempo_cuidados_minimos, self.is_hospital, self.resgatado))
+
+
+class NodeTable(MutableMapping):
+    """
+    Nós do grafo em colunas NumPy (struct-of-arrays), usada como Graph.nodes.
+
+    Comporta-se como o dicionário {id: Node} de antes (mesma ordem de
+    inserção, atribuir / apagar por id), mas cada nó é uma linha:
+    - _ids (int64), _tipo (código em _tipos), _prioridade (int64, com
+      _has_prioridade), _tempo (float64, NaN se não há), _is_hospital,
+      _resgatado e _alive (linha não apagada)
+    - nomes em UTF-8 num só buffer (_nome_buf), com _nome_start / _nome_len
+      por linha; mudar um nome acrescenta os bytes novos no fim
+
+    O índice id -> linha não é um dicionário: _sorted_ids (ids ordenados) e
+    _sorted_rows (a linha de cada um, None se são as próprias posições) são
+    procurados com np.searchsorted. As linhas acrescentadas desde a última
+    reconstrução ficam em _pending, que é fundido quando passa de um quarto
+    do índice ordenado (custo amortizado O(log n) por inserção).
+
+    table[nid] devolve uma NodeView sobre a linha. Os filtros (hospitals,
+    candidates, reset_rescued) são uma máscara booleana sobre as colunas em
+    vez de um ciclo Python sobre todos os nós. Linhas apagadas ficam só
+    marcadas em _alive.
+    """
+
+    _COLUMNS = (
+        '_ids', '_tipo', '_prioridade', '_has_prioridade', '_tempo',
+        '_is_hospital', '_resgatado', '_alive', '_nome_start', '_nome_len',
+    )
+    _MIN_PENDING = 1024
+
+    def __init__(self, nodes: Iterable[Node] = ()):
+        self._size = 0
+        self._count = 0
+        self._ids = np.zeros(16, dtype=np.int64)
+        self._tipo = np.zeros(16, dtype=np.int16)
+        self._prioridade = np.zeros(16, dtype=np.int64)
+        self._has_prioridade = np.zeros(16, dtype=bool)
+        self._tempo = np.full(16, np.nan, dtype=np.float64)
+        self._is_hospital = np.zeros(16, dtype=bool)
+        self._resgatado = np.zeros(16, dtype=bool)
+        self._alive = np.zeros(16, dtype=bool)
+        self._nome_start = np.zeros(16, dtype=np.int64)
+        self._nome_len = np.zeros(16, dtype=np.int32)
+        self._nome_buf = bytearray()
+        self._sorted_ids = np.zeros(0, dtype=np.int64)
+        self._sorted_rows: Optional[np.ndarray] = None
+        self._pending: Dict[int, int] = {}
+        self._tipos: List[str] = []
+        self._tipo_codes: Dict[str, int] = {}
+        for node in nodes:
+            self[node.id] = node
+
+    @classmethod
+    def from_columns(
+        cls,
+        ids: np.ndarray,
+        tipo: np.ndarray,
+        nome: List[str],
+        prioridade: np.ndarray,
+        has_prioridade: np.ndarray,
+        tempo: np.ndarray,
+        is_hospital: np.ndarray,
+        resgatado: Optional[np.ndarray] = None,
+    ) -> "NodeTable":
+        """Tabela construída de uma vez a partir de colunas (ids sem repetidos; tipo como strings)."""
+        table = cls()
+        n = len(ids)
+        tipos, codes = np.unique(np.asarray(tipo, dtype=str), return_inverse=True)
+        table._tipos = tipos.tolist()
+        table._tipo_codes = {t: i for i, t in enumerate(table._tipos)}
+        table._ids = np.array(ids, dtype=np.int64)
+        table._tipo = codes.astype(np.int16).reshape(n)
+        table._prioridade = np.array(prioridade, dtype=np.int64)
+        table._has_prioridade = np.array(has_prioridade, dtype=bool)
+        table._tempo = np.array(tempo, dtype=np.float64)
+        table._is_hospital = np.array(is_hospital, dtype=bool)
+        table._resgatado = np.zeros(n, dtype=bool) if resgatado is None else np.array(resgatado, dtype=bool)
+        table._alive = np.ones(n, dtype=bool)
+        encoded = [s.encode('utf-8') for s in nome]
+        table._nome_len = np.fromiter(map(len, encoded), dtype=np.int32, count=n)
+        table._nome_start = np.zeros(n, dtype=np.int64)
+        np.cumsum(table._nome_len[:-1], out=table._nome_start[1:])
+        table._nome_buf = bytearray(b"".join(encoded))
+        table._size = table._count = n
+        table._rebuild_index()
+        return table
+
+    def _rebuild_index(self) -> None:
+        """Volta a ordenar o índice com as linhas vivas e esvazia _pending."""
+        rows = self._rows()
+        ids = self._ids[rows]
+        if len(rows) == self._size and (len(ids) < 2 or bool(np.all(ids[1:] > ids[:-1]))):
+            # caso habitual (ids já crescentes, sem linhas apagadas): a
+            # posição no índice é a própria linha
+            self._sorted_ids, self._sorted_rows = ids, None
+        else:
+            order = np.argsort(ids, kind='stable')
+            self._sorted_ids, self._sorted_rows = ids[order], rows[order]
+        self._pending = {}
+
+    def _row(self, node_id) -> Optional[int]:
+        """Linha viva do id, ou None."""
+        row = self._pending.get(node_id)
+        if row is not None:
+            return row
+        if not isinstance(node_id, (int, np.integer)):
+            return None
+        ids = self._sorted_ids
+        i = int(ids.searchsorted(node_id))
+        if i == len(ids) or ids.item(i) != node_id:
+            return None
+        row = i if self._sorted_rows is None else self._sorted_rows.item(i)
+        return row if self._alive.item(row) else None
+
+    def _set_nome(self, row: int, nome: str) -> None:
+        data = nome.encode('utf-8')
+        self._nome_start[row] = len(self._nome_buf)
+        self._nome_len[row] = len(data)
+        self._nome_buf += data
+
+    def _tipo_code(self, tipo: str) -> int:
+        tipo = tipo or ""
+        code = self._tipo_codes.get(tipo)
+        if code is None:
+            code = self._tipo_codes[tipo] = len(self._tipos)
+            self._tipos.append(tipo)
+        return code
+
+    def _append(self, node_id: int) -> int:
+        row = self._size
+        if row == len(self._ids):
+            for name in self._COLUMNS:
+                old = getattr(self, name)
+                new = np.full(2 * len(old), np.nan) if name == '_tempo' else np.zeros(2 * len(old), dtype=old.dtype)
+                new[:row] = old
+                setattr(self, name, new)
+        self._size = row + 1
+        self._count += 1
+        self._ids[row] = node_id
+        self._alive[row] = True
+        self._nome_start[row] = len(self._nome_buf)
+        self._nome_len[row] = 0
+        self._pending[int(node_id)] = row
+        if len(self._pending) > max(self._MIN_PENDING, len(self._sorted_ids) // 4):
+            self._rebuild_index()
+        return row
+
+    def __getitem__(self, node_id: int) -> NodeView:
+        row = self._row(node_id)
+        if row is None:
+            raise KeyError(node_id)
+        return NodeView(self, row)
+
+    def __setitem__(self, node_id: int, node: Node) -> None:
+        row = self._row(node_id)
+        if row is None:
+            row = self._append(node_id)
+        view = NodeView(self, row)
+        view.tipo = node.tipo
+        view.nome = node.nome
+        view.prioridade = node.prioridade
+        view.tempo_cuidados_minimos = node.tempo_cuidados_minimos
+        view.is_hospital = node.is_hospital
+        view.resgatado = getattr(node, 'resgatado', False)
+
+    def __delitem__(self, node_id: int) -> None:
+        row = self._row(node_id)
+        if row is None:
+            raise KeyError(node_id)
+        self._pending.pop(node_id, None)
+        self._alive[row] = False
+        self._count -= 1
+
+    def __contains__(self, node_id) -> bool:
+        return self._row(node_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids[self._rows()].tolist())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self) -> Iterator[NodeView]:
+        return (NodeView(self, row) for row in self._rows().tolist())
+
+    def items(self) -> Iterator[Tuple[int, NodeView]]:
+        rows = self._rows()
+        return ((nid, NodeView(self, row)) for nid, row in zip(self._ids[rows].tolist(), rows.tolist()))
+
+    def _rows(self) -> np.ndarray:
+        """
+        Linhas vivas pela ordem de inserção. As linhas só são acrescentadas
+        no fim (um id apagado e reinserido ganha linha nova), por isso a
+        ordem das linhas é a de inserção.
+        """
+        return np.flatnonzero(self._alive[:self._size])
+
+    def columns(self) -> Dict[str, object]:
+        """Colunas pela ordem de iteração, no formato de from_columns (tipo como strings)."""
+        rows = self._rows()
+        tipos = np.array(self._tipos + [""], dtype=str)
+        return {
+            'ids': self._ids[rows],
+            'tipo': tipos[self._tipo[rows]] if len(rows) else np.zeros(0, dtype=str),
+            'nome': [NodeView(self, r).nome for r in rows.tolist()],
+            'prioridade': self._prioridade[rows],
+            'has_prioridade': self._has_prioridade[rows],
+            'tempo': self._tempo[rows],
+            'is_hospital': self._is_hospital[rows],
+            'resgatado': self._resgatado[rows],
+        }
+
+    def _mask_in_order(self, mask: np.ndarray) -> np.ndarray:
+        """Linhas (vivas, pela ordem de inserção) em que `mask` é verdadeira."""
+        return np.flatnonzero(mask & self._alive[:self._size])
+
+    def _is_tipo(self, tipo: str) -> np.ndarray:
+        code = self._tipo_codes.get(tipo)
+        if code is None:
+            return np.zeros(self._size, dtype=bool)
+        return self._tipo[:self._size] == code
+
+    def hospitals(self) -> np.ndarray:
+        """Ids dos hospitais."""
+        return self._ids[self._mask_in_order(self._is_hospital[:self._size])]
+
+    def candidates(self, include_rescued: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pacientes com prioridade > 0 (e por resgatar, salvo include_rescued),
+        pela ordem de inserção.
+
+        Returns:
+            (ids, prioridades, tempos de cuidados com 0.0 onde não há)
+        """
+        n = self._size
+        mask = self._is_tipo('paciente') & self._has_prioridade[:n] & (self._prioridade[:n] > 0)
+        if not include_rescued:
+            mask &= ~self._resgatado[:n]
+        rows = self._mask_in_order(mask)
+        return self._ids[rows], self._prioridade[rows], np.nan_to_num(self._tempo[rows], nan=0.0)
+
+    def reset_rescued(self, tipo: str = 'paciente') -> None:
+        """Marca todos os nós do tipo dado como não resgatados."""
+        self._resgatado[:self._size][self._is_tipo(tipo)] = False
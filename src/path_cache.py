@@ -0,0 +1,181 @@
+"""
+Cache persistente das matrizes de caminhos mais curtos.
+
+As matrizes de distâncias e predecessores são gravadas em ficheiros .npy,
+por defeito numa pasta .cache ao lado do dataset, identificadas por um hash
+do conteúdo de pontos.csv e ruas.csv mais a versão do algoritmo. Numa
+execução seguinte com o mesmo mapa são abertas com np.load(mmap_mode='r'),
+sem voltar a correr Dijkstra. Quando algum ficheiro muda o hash muda e a
+entrada antiga deixa de ser usada (e é apagada na gravação seguinte).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from graph import Graph
+from dijkstra import ShortestPathTable, HospitalDistanceOracle, all_pairs_shortest_paths
+
+# Incrementar sempre que o formato ou o cálculo das matrizes mudar
+ALGORITHM_VERSION = 1
+
+CACHE_DIRNAME = ".cache"
+FALLBACK_CACHE_DIR = Path(tempfile.gettempdir()) / "lapers-cache"
+
+DataSource = Union[str, Path, bytes]
+
+
+def content_key(sources: Iterable[DataSource], kind: str, extra: str = "") -> str:
+    """
+    Hash SHA-256 do conteúdo dos ficheiros (caminhos ou bytes), do tipo de
+    tabela e da versão do algoritmo.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{ALGORITHM_VERSION}|{kind}|{extra}".encode("utf-8"))
+    for src in sources:
+        h.update(b"\0")
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            h.update(src)
+            continue
+        with open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:32]
+
+
+def default_cache_dir(sources: Iterable[DataSource]) -> Path:
+    """Pasta .cache ao lado do primeiro ficheiro; se só houver bytes, pasta temporária."""
+    for src in sources:
+        if isinstance(src, (str, Path)):
+            return Path(src).resolve().parent / CACHE_DIRNAME
+    return FALLBACK_CACHE_DIR
+
+
+def load_table(cache_dir: Path, key: str) -> Optional[ShortestPathTable]:
+    """Abre uma tabela em cache (memory-mapped) ou devolve None."""
+    entry = Path(cache_dir) / key
+    meta_path = entry / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != ALGORITHM_VERSION:
+            return None
+
+        def load(name):
+            return np.load(entry / f"{name}.npy", mmap_mode="r")
+
+        rdist = load("rdist") if meta.get("reverse") else None
+        rpred = load("rpred") if meta.get("reverse") else None
+        return ShortestPathTable(
+            np.asarray(load("ids")),
+            load("dist"),
+            load("pred"),
+            np.asarray(load("sources")),
+            bool(meta.get("symmetric")),
+            rdist,
+            rpred,
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def save_table(cache_dir: Path, key: str, table: ShortestPathTable, kind: str) -> None:
+    """
+    Grava a tabela em cache_dir/key de forma atómica e remove entradas
+    antigas do mesmo tipo.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=cache_dir))
+    try:
+        np.save(tmp / "ids.npy", np.asarray(table.ids))
+        np.save(tmp / "sources.npy", np.asarray(table.sources))
+        np.save(tmp / "dist.npy", np.asarray(table.dist))
+        np.save(tmp / "pred.npy", np.asarray(table.pred))
+        reverse = table.rdist is not None
+        if reverse:
+            np.save(tmp / "rdist.npy", np.asarray(table.rdist))
+            np.save(tmp / "rpred.npy", np.asarray(table.rpred))
+        meta = {
+            "version": ALGORITHM_VERSION,
+            "kind": kind,
+            "symmetric": bool(table.symmetric),
+            "reverse": reverse,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+        entry = cache_dir / key
+        if entry.exists():
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    finally:
+        if tmp.exists():
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    _prune(cache_dir, keep=key, kind=kind)
+
+
+def _prune(cache_dir: Path, keep: str, kind: str) -> None:
+    """Apaga entradas do mesmo tipo que já não correspondem aos ficheiros atuais."""
+    for entry in cache_dir.iterdir():
+        if entry.name == keep or not entry.is_dir():
+            continue
+        try:
+            meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if meta.get("kind") == kind:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def cached_shortest_paths(
+    graph: Graph,
+    sources: List[DataSource],
+    hospitals: Optional[List[int]] = None,
+    cache_dir: Optional[Union[str, Path]] = None,
+    workers: Optional[int] = None,
+) -> Tuple[ShortestPathTable, bool]:
+    """
+    Devolve a tabela de caminhos mais curtos do grafo, usando a cache em disco.
+
+    Args:
+        graph: Grafo carregado a partir de `sources`
+        sources: Ficheiros de origem do grafo (pontos.csv e ruas.csv), como
+            caminhos ou bytes
+        hospitals: Se dado, calcula só as árvores enraizadas nestes hospitais
+            (como hospital_shortest_paths); caso contrário todos os pares
+        cache_dir: Pasta da cache (por defeito .cache ao lado do dataset)
+        workers: Processos para o cálculo em caso de falha na cache
+
+    Returns:
+        (tabela, veio_da_cache)
+    """
+    sources = list(sources)
+    if hospitals is None:
+        kind, extra = "apsp", ""
+    else:
+        kind, extra = "hospitals", ",".join(str(h) for h in hospitals)
+    key = content_key(sources, kind, extra)
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir(sources)
+
+    table = load_table(cache_dir, key)
+    if table is not None:
+        return table, True
+
+    if hospitals is None:
+        table = all_pairs_shortest_paths(graph, workers=workers)
+    else:
+        table = HospitalDistanceOracle(graph, hospitals, workers=workers)
+    try:
+        save_table(cache_dir, key, table, kind)
+    except OSError:
+        # cache é só uma otimização: falhar a gravação não deve parar o cálculo
+        pass
+    return table, False
@@ -0,0 +1,193 @@
+"""
+Snapshot binário de um dataset, para arrancar sem voltar a ler os CSV.
+
+Um snapshot é um único ficheiro .npz (sem pickle) com:
+- a tabela de nós em colunas (NodeTable.columns: ids, tipo, nome,
+  prioridade, tempo de cuidados, is_hospital, resgatado; prioridade/tempo
+  em falta ficam marcados com has_prioridade / NaN)
+- as arestas em CSR (offsets, targets, weights), no formato de FrozenGraph
+- os dados iniciais (ponto_inicial, tempo_total), se existirem
+- opcionalmente a tabela de caminhos mais curtos dos hospitais
+- a versão do formato e o hash (path_cache.content_key) dos CSV de origem
+  (dataset_sources: pontos.csv, ruas.csv e dados_iniciais.csv, de onde vêm
+  ponto_inicial e tempo_total)
+
+Carregar é ler arrays contíguos e montar o grafo com Graph.from_csr, em vez
+de converter texto linha a linha. Converter as pastas existentes:
+
+    python src/snapshot.py datasets/*/* [--paths]
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Type, Union
+
+import numpy as np
+
+from graph import Graph, IndexedGraph
+from node import NodeTable
+from dijkstra import ShortestPathTable, hospital_shortest_paths
+from path_cache import DataSource, content_key
+import loader
+
+# Incrementar sempre que o conteúdo do ficheiro mudar
+SNAPSHOT_VERSION = 1
+
+# Nome do snapshot dentro da pasta do dataset
+SNAPSHOT_NAME = "snapshot.npz"
+
+
+class Snapshot(NamedTuple):
+    """Conteúdo de um snapshot; paths é None se não foi gravada a tabela."""
+    graph: Graph
+    hospital_id: Optional[int]
+    tempo_total: Optional[float]
+    paths: Optional[ShortestPathTable]
+
+
+def dataset_sources(folder: Union[str, Path]) -> List[Path]:
+    """Ficheiros de uma pasta de dataset cujo conteúdo o snapshot guarda (sources de save/load_snapshot)."""
+    folder = Path(folder)
+    files = [folder / "pontos.csv", folder / "ruas.csv", folder / "dados_iniciais.csv"]
+    return [f for f in files if f.exists()]
+
+
+def _optional(value) -> np.ndarray:
+    return np.array([] if value is None else [value])
+
+
+def save_snapshot(
+    path: Union[str, Path],
+    g: Graph,
+    hospital_id: Optional[int] = None,
+    tempo_total: Optional[float] = None,
+    paths: Optional[ShortestPathTable] = None,
+    sources: Optional[List[DataSource]] = None,
+) -> Path:
+    """
+    Grava o grafo (e opcionalmente os dados iniciais e a tabela de caminhos)
+    de forma atómica.
+
+    Args:
+        sources: Ficheiros de origem (dataset_sources); o seu hash fica no
+            snapshot para load_snapshot detetar que ficou desatualizado
+    """
+    path = Path(path)
+    frozen = g.freeze()
+    # colunas pela ordem de g.nodes, que é a dos índices de freeze()
+    table = g.nodes if isinstance(g.nodes, NodeTable) else NodeTable(g.nodes.values())
+    columns = table.columns()
+    arrays = {
+        "version": np.array(SNAPSHOT_VERSION),
+        "source_key": np.array(content_key(sources, "snapshot") if sources else ""),
+        "ids": frozen.ids,
+        "tipo": np.asarray(columns["tipo"], dtype=str),
+        "nome": np.array(columns["nome"], dtype=str),
+        "has_prioridade": columns["has_prioridade"],
+        "prioridade": columns["prioridade"],
+        "tempo": columns["tempo"],
+        "is_hospital": columns["is_hospital"],
+        "resgatado": columns["resgatado"],
+        "offsets": frozen.offsets,
+        "targets": frozen.targets,
+        "weights": frozen.weights,
+        "hospital_id": _optional(hospital_id).astype(np.int64),
+        "tempo_total": _optional(tempo_total).astype(np.float64),
+    }
+    if paths is not None:
+        arrays.update({
+            "paths_ids": np.asarray(paths.ids),
+            "paths_sources": np.asarray(paths.sources),
+            "paths_dist": np.asarray(paths.dist),
+            "paths_pred": np.asarray(paths.pred),
+            "paths_symmetric": np.array(bool(paths.symmetric)),
+        })
+        if paths.rdist is not None:
+            arrays["paths_rdist"] = np.asarray(paths.rdist)
+            arrays["paths_rpred"] = np.asarray(paths.rpred)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}-", suffix=".npz", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def load_snapshot(
+    path: Union[str, Path],
+    graph_cls: Type[Graph] = IndexedGraph,
+    sources: Optional[List[DataSource]] = None,
+) -> Optional[Snapshot]:
+    """
+    Abre um snapshot; None se não existir, for de outra versão ou (com
+    `sources`) não corresponder ao conteúdo atual dos CSV.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != SNAPSHOT_VERSION:
+                return None
+            if sources and str(data["source_key"]) != content_key(sources, "snapshot"):
+                return None
+            arrays = {name: data[name] for name in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    nodes = NodeTable.from_columns(
+        arrays["ids"], arrays["tipo"], arrays["nome"].tolist(), arrays["prioridade"],
+        arrays["has_prioridade"], arrays["tempo"], arrays["is_hospital"], arrays["resgatado"],
+    )
+    g = graph_cls.from_csr(nodes, arrays["offsets"], arrays["targets"], arrays["weights"])
+
+    paths = None
+    if "paths_dist" in arrays:
+        paths = ShortestPathTable(
+            arrays["paths_ids"],
+            arrays["paths_dist"],
+            arrays["paths_pred"],
+            arrays["paths_sources"],
+            bool(arrays["paths_symmetric"]),
+            arrays.get("paths_rdist"),
+            arrays.get("paths_rpred"),
+        )
+    hospital_id = int(arrays["hospital_id"][0]) if len(arrays["hospital_id"]) else None
+    tempo_total = float(arrays["tempo_total"][0]) if len(arrays["tempo_total"]) else None
+    return Snapshot(g, hospital_id, tempo_total, paths)
+
+
+def convert_dataset(folder: Union[str, Path], out: Optional[Union[str, Path]] = None, with_paths: bool = False) -> Path:
+    """
+    Converte uma pasta de dataset (pontos.csv, ruas.csv, dados_iniciais.csv)
+    para folder/SNAPSHOT_NAME (ou `out`). Com with_paths grava também as
+    árvores de caminhos mais curtos dos hospitais.
+    """
+    folder = Path(folder)
+    nodes, edges, initial = folder / "pontos.csv", folder / "ruas.csv", folder / "dados_iniciais.csv"
+    g, hospital_id, tempo_total = loader.load_dataset(nodes, edges, initial if initial.exists() else None)
+    paths = None
+    if with_paths:
+        hospitals = g.nodes.hospitals().tolist()
+        paths = hospital_shortest_paths(g, hospitals)
+    return save_snapshot(out or folder / SNAPSHOT_NAME, g, hospital_id, tempo_total, paths, sources=dataset_sources(folder))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Converte pastas de datasets CSV em snapshots binários.")
+    parser.add_argument("folders", nargs="+", type=Path, help="pastas com pontos.csv e ruas.csv")
+    parser.add_argument("--paths", action="store_true", help="inclui os caminhos mais curtos dos hospitais")
+    args = parser.parse_args(argv)
+    for folder in args.folders:
+        if not (folder / "pontos.csv").exists() or not (folder / "ruas.csv").exists():
+            print(f"Ignorada (sem pontos.csv / ruas.csv): {folder}")
+            continue
+        print(f"{folder} -> {convert_dataset(folder, with_paths=args.paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,8 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 from node import Node
 from graph import Graph
 from dijkstra import all_pairs_shortest_paths
-from dp import read_time_budget, maximize_priority_dp
+from loader import read_time_budget
+from dp import maximize_priority_dp
 import csv
 
 def test_load_dataset():
@@ -51,8 +52,10 @@ def test_load_dataset():
     print(f"✅ Carregado: {len(g.nodes)} nós, {sum(len(adj) for adj in g.adjacency.values()) // 2} arestas")
     return g, dataset_path
 
-def test_optimization(g, dataset_path):
+def test_optimization(g=None, dataset_path=None):
     """Testa otimização."""
+    if g is None:
+        g, dataset_path = test_load_dataset()
     print("\n🧪 Teste 2: Otimização de Rota")
     
     # Lê tempo
@@ -64,8 +67,9 @@ def test_optimization(g, dataset_path):
     
     # Otimiza
     hospital_id = 0
+    all_hospitals = [nid for nid, n in g.nodes.items() if n.is_hospital]
     route, priority, time_used, optimal = maximize_priority_dp(
-        g, all_paths, hospital_id, tempo_total
+        g, all_paths, hospital_id, tempo_total, all_hospitals
     )
     
     print(f"✅ Rota calculada:")
@@ -0,0 +1,107 @@
+"""
+Testes de DynamicShortestPaths: depois de cada fecho / reabertura de rua,
+alteração de peso ou remoção de nó, as distâncias mantidas têm de ser as de
+um recálculo completo com Dijkstra.
+
+    python -m pytest -q test_dynamic_paths.py
+"""
+
+from pathlib import Path
+import random
+import sys
+
+# Adiciona src ao path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import numpy as np
+import pytest
+
+from dijkstra import hospital_shortest_paths
+from dynamic_paths import DynamicShortestPaths
+from graph import Graph, IndexedGraph
+from node import Node
+
+HOSPITALS = [0, 1]
+
+
+def random_graph(rnd: random.Random, graph_cls):
+    g = graph_cls()
+    n = rnd.randint(4, 14)
+    for i in range(n):
+        g.add_node(Node(i, 'hospital' if i in HOSPITALS else 'paciente', prioridade=1, is_hospital=i in HOSPITALS))
+    for _ in range(2 * n):
+        a, b = rnd.randrange(n), rnd.randrange(n)
+        if a != b:
+            g.add_edge(a, b, rnd.choice([1, 2, 3, 5]))
+    return g
+
+
+def random_edit(rnd: random.Random, g, step: int) -> None:
+    nodes = list(g.nodes)
+    a, b = rnd.choice(nodes), rnd.choice(nodes)
+    bidirectional = rnd.random() < 0.8
+    op = rnd.random()
+    if op < 0.3 and a != b:
+        g.add_edge(a, b, rnd.choice([0.5, 1, 2, 8]), bidirectional=bidirectional)
+    elif op < 0.45 and a != b:
+        g.set_edge_weight(a, b, rnd.choice([0.5, 4, 9]), bidirectional=bidirectional)
+    elif op < 0.75:
+        g.remove_edge(a, b, bidirectional=bidirectional)
+    elif op < 0.9 and a not in HOSPITALS:
+        g.remove_node(a)
+    else:
+        g.add_node(Node(100 + step, 'paciente', prioridade=1))
+
+
+def assert_matches_recompute(dyn: DynamicShortestPaths, g) -> None:
+    full = hospital_shortest_paths(g, HOSPITALS)
+    for h in HOSPITALS:
+        for v in g.nodes:
+            for u, w in ((h, v), (v, h)):
+                expected = full.get((u, w))[0]
+                assert dyn.get((u, w))[0] == pytest.approx(expected), (u, w)
+                assert dyn.distance(u, w) == pytest.approx(expected), (u, w)
+    nodes = list(g.nodes)
+    np.testing.assert_allclose(dyn.distance_block(HOSPITALS, nodes), full.distance_block(HOSPITALS, nodes))
+    np.testing.assert_allclose(dyn.distance_block(nodes, HOSPITALS), full.distance_block(nodes, HOSPITALS))
+
+
+@pytest.mark.parametrize("graph_cls", [Graph, IndexedGraph])
+@pytest.mark.parametrize("seed", range(30))
+def test_dynamic_paths_match_full_recompute(seed, graph_cls):
+    rnd = random.Random(seed)
+    g = random_graph(rnd, graph_cls)
+    dyn = DynamicShortestPaths(g, HOSPITALS)
+    assert_matches_recompute(dyn, g)
+    for step in range(20):
+        version = dyn.version
+        random_edit(rnd, g, step)
+        assert dyn.version > version
+        assert_matches_recompute(dyn, g)
+    assert dyn.total_touched >= dyn.last_touched
+    dyn.close()
+
+
+def test_paths_follow_existing_edges():
+    rnd = random.Random(99)
+    g = random_graph(rnd, Graph)
+    dyn = DynamicShortestPaths(g, HOSPITALS)
+    for step in range(10):
+        random_edit(rnd, g, step)
+    for v in g.nodes:
+        d, path = dyn.get((0, v))
+        if d == float('inf'):
+            assert path == []
+            continue
+        assert path[0] == 0 and path[-1] == v
+        assert sum(min(w for x, w in g.adjacency[a] if x == b) for a, b in zip(path, path[1:])) == pytest.approx(d)
+
+
+def test_closed_tracker_ignores_edits():
+    rnd = random.Random(5)
+    g = random_graph(rnd, Graph)
+    dyn = DynamicShortestPaths(g, HOSPITALS)
+    dyn.close()
+    before = dyn.total_touched
+    g.add_edge(0, 1, 0.1)
+    assert dyn.total_touched == before
@@ -0,0 +1,77 @@
+"""
+Testes do IndexedGraph: depois de qualquer sequência de edições tem de
+descrever o mesmo grafo que um Graph simples (com as arestas paralelas
+fundidas no menor peso) e manter os índices auxiliares coerentes.
+
+    python -m pytest -q test_graph.py
+"""
+
+from pathlib import Path
+import random
+import sys
+
+# Adiciona src ao path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import pytest
+
+from graph import Graph, IndexedGraph
+from node import Node
+
+
+def merged_adjacency(g: Graph) -> dict:
+    """Adjacência com as arestas paralelas reduzidas ao menor peso."""
+    result = {}
+    for u, neighbors in g.adjacency.items():
+        best = {}
+        for v, w in neighbors:
+            best[v] = min(w, best.get(v, w))
+        result[u] = best
+    return result
+
+
+def assert_consistent(ig: IndexedGraph, plain: Graph) -> None:
+    expected = merged_adjacency(plain)
+    assert set(ig.nodes) == set(plain.nodes)
+    assert {u: dict(neighbors) for u, neighbors in ig.adjacency.items()} == expected
+    assert ig.edges_count() == sum(len(neighbors) for neighbors in expected.values())
+    assert ig.edge_weights == {(u, v): w for u, neighbors in expected.items() for v, w in neighbors.items()}
+    for v in ig.nodes:
+        assert dict(ig.in_neighbors(v)) == {u: neighbors[v] for u, neighbors in expected.items() if v in neighbors}
+    for u, neighbors in ig.adjacency.items():
+        assert {v: i for i, (v, _w) in enumerate(neighbors)} == ig._pos[u]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_indexed_graph_matches_plain_graph(seed):
+    rnd = random.Random(seed)
+    ig, plain = IndexedGraph(), Graph()
+    n = rnd.randint(3, 12)
+    for i in range(n):
+        for g in (ig, plain):
+            g.add_node(Node(i))
+    for step in range(60):
+        nodes = list(plain.nodes)
+        a, b = rnd.choice(nodes), rnd.choice(nodes)
+        bidirectional = rnd.random() < 0.7
+        op, weight = rnd.random(), rnd.randint(1, 9)
+        for g in (ig, plain):
+            if op < 0.5 and a != b:
+                g.add_edge(a, b, weight, bidirectional=bidirectional)
+            elif op < 0.8:
+                g.remove_edge(a, b, bidirectional=bidirectional)
+            elif op < 0.9 and len(nodes) > 2:
+                g.remove_node(a)
+            else:
+                g.add_node(Node(100 + step))
+        assert_consistent(ig, plain)
+    assert ig.get_weight(-1, -2) is None
+
+
+def test_indexed_graph_rejects_unknown_nodes():
+    g = IndexedGraph()
+    g.add_node(Node(1))
+    with pytest.raises(KeyError):
+        g.add_edge(1, 2)
+    g.remove_node(2)  # nó inexistente: não faz nada
+    assert g.nodes_count() == 1 and g.edges_count() == 0
@@ -0,0 +1,242 @@
+"""
+Testes dos caminhos mais curtos: a vista CSR tem de reproduzir a lista de
+adjacências e o Dijkstra sobre índices densos, o oráculo enraizado nos
+hospitais e o Dijkstra de todos os pares têm de concordar com um Dijkstra
+de referência, com caminhos que seguem arestas reais do grafo. A cache em
+disco tem de devolver as mesmas matrizes enquanto os CSV não mudarem.
+
+    python -m pytest -q test_shortest_paths.py
+"""
+
+from pathlib import Path
+import gc
+import heapq
+import random
+import sys
+
+# Adiciona src ao path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import numpy as np
+import pytest
+
+from dijkstra import all_pairs_shortest_paths, dijkstra, hospital_shortest_paths, is_undirected
+from graph import FrozenGraph, Graph
+from node import Node
+from path_cache import cached_shortest_paths
+
+INF = float('inf')
+HOSPITALS = [0, 3]
+
+
+def random_graph(seed: int, directed: bool) -> Graph:
+    """Grafo aleatório pequeno, possivelmente desconexo e com arestas paralelas."""
+    rnd = random.Random(seed)
+    g = Graph()
+    n = rnd.randint(5, 16)
+    for i in range(n):
+        g.add_node(Node(i, 'hospital' if i in HOSPITALS else 'paciente', prioridade=1, is_hospital=i in HOSPITALS))
+    for _ in range(2 * n):
+        a, b = rnd.randrange(n), rnd.randrange(n)
+        if a != b:
+            g.add_edge(a, b, rnd.randint(1, 9), bidirectional=not directed or rnd.random() < 0.3)
+    return g
+
+
+def edge_weight(g: Graph, u: int, v: int) -> float:
+    return min((w for x, w in g.adjacency[u] if x == v), default=INF)
+
+
+def is_symmetric(g: Graph) -> bool:
+    """Cada aresta (u, v) tem a inversa (v, u) com o mesmo peso mínimo."""
+    return all(edge_weight(g, v, u) == w for u in g.nodes for v, w in g.adjacency[u] if edge_weight(g, u, v) == w)
+
+
+def reference_dijkstra(g: Graph, source: int) -> dict:
+    """Dijkstra direto sobre a lista de adjacências (só distâncias)."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for v, w in g.adjacency[u]:
+            if d + w < dist.get(v, INF):
+                dist[v] = d + w
+                heapq.heappush(heap, (d + w, v))
+    return {v: dist.get(v, INF) for v in g.nodes}
+
+
+def assert_valid_path(g: Graph, u: int, v: int, d: float, path) -> None:
+    if d == INF:
+        assert path == []
+        return
+    assert path[0] == u and path[-1] == v
+    assert sum(edge_weight(g, a, b) for a, b in zip(path, path[1:])) == pytest.approx(d)
+
+
+# ----------------------------------------------------------------------------
+# vista CSR e Dijkstra
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("reorder", [None, 'bfs'])
+@pytest.mark.parametrize("seed", range(10))
+def test_freeze_mirrors_adjacency(seed, reorder):
+    g = random_graph(seed, directed=seed % 2 == 1)
+    frozen = g.freeze(reorder=reorder)
+    assert isinstance(frozen, FrozenGraph)
+    assert sorted(frozen.ids.tolist()) == sorted(g.nodes)
+    assert (frozen.nodes_count(), frozen.edges_count()) == (g.nodes_count(), g.edges_count())
+    for nid in g.nodes:
+        i = frozen.index_of(nid)
+        assert frozen.node_id(i) == nid
+        neighbors = [(frozen.node_id(j), w) for j, w in frozen.neighbors(i)]
+        assert sorted(neighbors) == sorted(g.adjacency[nid])
+    transposed = frozen.transpose()
+    for nid in g.nodes:
+        incoming = [(u, w) for u in g.nodes for v, w in g.adjacency[u] if v == nid]
+        neighbors = [(frozen.node_id(j), w) for j, w in transposed.neighbors(frozen.index_of(nid))]
+        assert sorted(neighbors) == sorted(incoming)
+    assert frozen.is_symmetric() == is_symmetric(g)
+
+
+def test_freeze_cache_is_dropped_on_edit():
+    g = random_graph(1, directed=False)
+    frozen = g.freeze()
+    assert g.freeze() is frozen
+    with pytest.raises(ValueError):
+        frozen.weights[0] = 0.0
+    g.add_edge(0, 1, 0.5)
+    assert g.freeze() is not frozen and g.freeze().edges_count() == frozen.edges_count() + 2
+    with pytest.raises(ValueError):
+        g.freeze(reorder='dfs')
+
+
+def test_frozen_graph_leaves_caller_arrays_writeable():
+    arrays = (np.array([7, 8]), np.array([0, 1, 1]), np.array([1]), np.array([2.5]))
+    frozen = FrozenGraph(*arrays)
+    assert all(arr.flags.writeable for arr in arrays)
+    assert not any(arr.flags.writeable for arr in (frozen.ids, frozen.offsets, frozen.targets, frozen.weights))
+    assert list(frozen.neighbors(0)) == [(1, 2.5)]
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(10))
+def test_dijkstra_matches_reference(seed, directed):
+    g = random_graph(seed, directed)
+    assert is_undirected(g) == is_symmetric(g)
+    for source in g.nodes:
+        distances, predecessors = dijkstra(g, source)
+        assert distances == pytest.approx(reference_dijkstra(g, source))
+        for v, p in predecessors.items():
+            if p is not None:
+                assert distances[v] == pytest.approx(distances[p] + edge_weight(g, p, v))
+
+
+# ----------------------------------------------------------------------------
+# tabela de todos os pares
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(10))
+def test_all_pairs_table_matches_reference(seed, directed):
+    g = random_graph(seed, directed)
+    table = all_pairs_shortest_paths(g)
+    assert len(table) == g.nodes_count() ** 2 == len(list(table.keys()))
+    for u in g.nodes:
+        expected = reference_dijkstra(g, u)
+        for v in g.nodes:
+            d, path = table[(u, v)]
+            assert d == pytest.approx(expected[v]) and table.distance(u, v) == d
+            assert_valid_path(g, u, v, d, list(path))
+    with pytest.raises(KeyError):
+        table[(0, 999)]
+    assert table.get((999, 0), 'x') == 'x'
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_parallel_all_pairs_matches_serial(directed):
+    g = random_graph(4, directed)
+    serial = all_pairs_shortest_paths(g)
+    parallel = all_pairs_shortest_paths(g, workers=2)
+    assert np.array_equal(parallel.dist, serial.dist)
+    assert np.array_equal(parallel.pred, serial.pred)
+
+
+def test_parallel_table_outlives_its_shared_memory_handle():
+    # as matrizes são entregues sem cópia; uma vista continua válida depois
+    # de a tabela ser recolhida
+    g = random_graph(4, directed=True)
+    serial = all_pairs_shortest_paths(g)
+    row = all_pairs_shortest_paths(g, workers=2).dist[1]
+    gc.collect()
+    assert np.array_equal(row, serial.dist[1])
+
+
+def test_paths_are_built_only_when_read():
+    g = random_graph(2, directed=False)
+    table = all_pairs_shortest_paths(g)
+    d, path = table.get((0, 1))
+    assert path._nodes is None
+    assert path == table.path(0, 1) and path._nodes is not None
+
+
+# ----------------------------------------------------------------------------
+# oráculo dos hospitais
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(15))
+def test_hospital_oracle_matches_all_pairs(seed, directed):
+    g = random_graph(seed, directed)
+    full = all_pairs_shortest_paths(g)
+    oracle = hospital_shortest_paths(g, HOSPITALS)
+    for h in HOSPITALS:
+        for v in g.nodes:
+            for u, w in ((h, v), (v, h)):
+                d, path = oracle.get((u, w))
+                assert d == pytest.approx(full.get((u, w))[0]), (u, w)
+                assert_valid_path(g, u, w, d, path)
+    # pares sem hospital não estão no oráculo
+    assert oracle.get((1, 2)) is None
+    assert (1, 2) not in oracle and (0, 1) in oracle
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(5))
+def test_distance_block_matches_pairwise_lookup(seed, directed):
+    g = random_graph(seed, directed)
+    nodes = list(g.nodes) + [999]
+    for table in (all_pairs_shortest_paths(g), hospital_shortest_paths(g, HOSPITALS)):
+        block = table.distance_block(nodes, nodes)
+        expected = [[table.get((u, v), (INF, []))[0] for v in nodes] for u in nodes]
+        assert np.array_equal(block, np.array(expected))
+
+
+# ----------------------------------------------------------------------------
+# cache em disco
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("hospitals", [None, HOSPITALS])
+def test_cached_shortest_paths_round_trip(hospitals, tmp_path):
+    g = random_graph(5, directed=True)
+    sources = [b"pontos v1", b"ruas v1"]
+    table, hit = cached_shortest_paths(g, sources, hospitals=hospitals, cache_dir=tmp_path)
+    assert not hit
+    cached, hit = cached_shortest_paths(g, sources, hospitals=hospitals, cache_dir=tmp_path)
+    assert hit
+    for u, v in table.keys():
+        assert cached.get((u, v))[0] == table.get((u, v))[0]
+        assert list(cached.get((v, u))[1]) == list(table.get((v, u))[1])
+    # outro conteúdo: nova entrada, a antiga é apagada
+    _table, hit = cached_shortest_paths(g, [b"pontos v1", b"ruas v2"], hospitals=hospitals, cache_dir=tmp_path)
+    assert not hit and len(list(tmp_path.iterdir())) == 1
+    _table, hit = cached_shortest_paths(g, sources, hospitals=hospitals, cache_dir=tmp_path)
+    assert not hit
+
+
+def test_parallel_hospital_oracle_matches_serial():
+    g = random_graph(6, directed=True)
+    serial = hospital_shortest_paths(g, HOSPITALS)
+    parallel = hospital_shortest_paths(g, HOSPITALS, workers=2)
+    assert np.array_equal(parallel.dist, serial.dist) and np.array_equal(parallel.rdist, serial.rdist)
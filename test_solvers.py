@@ -0,0 +1,489 @@
+"""
+Testes dos solvers: em grafos pequenos aleatórios o DP por bitmask tem de
+chegar ao ótimo de uma enumeração exaustiva das rotas e os restantes
+solvers exatos à mesma prioridade que ele; as rotas devolvidas têm de
+caber no budget e somar a prioridade declarada.
+
+    python -m pytest -q test_solvers.py
+"""
+
+from pathlib import Path
+import random
+import sys
+import time
+
+# Adiciona src ao path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import numpy as np
+import pytest
+
+import dp
+from dijkstra import hospital_shortest_paths
+from decompose import cluster_patients, maximize_priority_decomposed
+from dynamic_paths import DynamicShortestPaths
+from fleet import Vehicle, plan_fleet
+from graph import Graph
+from instance import compile_instance
+from node import Node
+
+INF = float('inf')
+
+# (semente, pacientes, hospitais, budget) das instâncias aleatórias
+CASES = [(seed, 3 + seed % 6, 1 + seed % 3, 15 + 7 * (seed % 9)) for seed in range(24)]
+
+
+def random_instance(seed: int, patients: int, hospitals: int):
+    """Grafo conexo com `hospitals` hospitais, `patients` pacientes e alguns nós de passagem."""
+    rnd = random.Random(seed)
+    g = Graph()
+    n = hospitals + patients + 5
+    for i in range(n):
+        if i < hospitals:
+            g.add_node(Node(i, 'hospital', f'H{i}', is_hospital=True))
+        elif i < hospitals + patients:
+            g.add_node(Node(i, 'paciente', f'P{i}', rnd.randint(1, 9), float(rnd.randint(0, 3))))
+        else:
+            g.add_node(Node(i, 'rua', f'R{i}'))
+    for i in range(1, n):
+        g.add_edge(i, rnd.randrange(i), rnd.randint(1, 9))
+    for _ in range(n):
+        a, b = rnd.randrange(n), rnd.randrange(n)
+        if a != b:
+            g.add_edge(a, b, rnd.randint(1, 9))
+    all_hospitals = list(range(hospitals))
+    return g, hospital_shortest_paths(g, all_hospitals), all_hospitals
+
+
+def feasible_sets(g: Graph, all_paths, hospital_id: int, time_budget: float, all_hospitals) -> set:
+    """
+    Conjuntos de pacientes atendíveis dentro do budget, por enumeração de
+    todas as sequências no mesmo modelo dos solvers: cada paciente é levado
+    ao hospital mais próximo, de onde parte a viagem seguinte.
+    """
+    dist = lambda u, v: all_paths.get((u, v), (INF, []))[0]
+    patients = [nid for nid, n in g.nodes.items() if n.tipo == 'paciente' and (n.prioridade or 0) > 0]
+    nearest = {p: min(all_hospitals, key=lambda h: dist(p, h)) for p in patients}
+    found = set()
+
+    def search(loc, t, chosen):
+        found.add(chosen)
+        for p in patients:
+            if p in chosen:
+                continue
+            h = nearest[p]
+            t2 = t + dist(loc, p) + (g.nodes[p].tempo_cuidados_minimos or 0.0) + dist(p, h)
+            if t2 <= time_budget:
+                search(h, t2, chosen | {p})
+
+    search(hospital_id, 0.0, frozenset())
+    return found
+
+
+def brute_force(g: Graph, all_paths, hospital_id: int, time_budget: float, all_hospitals) -> int:
+    """Melhor prioridade entre todos os conjuntos atendíveis."""
+    return max(
+        sum(g.nodes[p].prioridade for p in chosen)
+        for chosen in feasible_sets(g, all_paths, hospital_id, time_budget, all_hospitals)
+    )
+
+
+def check_route(g: Graph, all_paths, route, priority: int, total_time: float, time_budget: float) -> None:
+    """A rota visita cada paciente uma vez, cabe no budget e soma a prioridade/tempo declarados."""
+    assert route and route[0][0] == 'H'
+    patients = [nid for tipo, nid in route if tipo == 'P']
+    assert len(patients) == len(set(patients))
+    assert sum(g.nodes[p].prioridade for p in patients) == priority
+    t = 0.0
+    for (_, u), (tipo, v) in zip(route, route[1:]):
+        t += all_paths.get((u, v), (INF, []))[0]
+        if tipo == 'P':
+            t += g.nodes[v].tempo_cuidados_minimos or 0.0
+    assert t == pytest.approx(total_time)
+    assert t <= time_budget + 1e-9
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES)
+def test_dp_matches_brute_force(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    route, priority, total_time, optimal = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)
+    assert optimal
+    assert priority == brute_force(g, all_paths, 0, time_budget, all_hospitals)
+    check_route(g, all_paths, route, priority, total_time, time_budget)
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES)
+def test_exact_solvers_match_dp(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    reference = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)
+
+    results = {
+        'sparse': dp.maximize_priority_sparse_dp(g, all_paths, 0, time_budget, all_hospitals),
+        'mitm': dp.maximize_priority_mitm(g, all_paths, 0, time_budget, all_hospitals),
+        'bnb': dp.branch_and_bound_maximize_priority(g, all_paths, 0, time_budget, all_hospitals, time_limit=None),
+    }
+    for name, (route, priority, total_time, *_rest) in results.items():
+        assert priority == reference[1], name
+        check_route(g, all_paths, route, priority, total_time, time_budget)
+    # o B&B sem limites termina com o limite superior igual ao ótimo
+    assert results['bnb'][3] == results['bnb'][4] == reference[1]
+    assert dp.priority_upper_bound(g, all_paths, time_budget, all_hospitals) >= reference[1]
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::3])
+def test_bnb_bounds_hold_when_interrupted(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    route, priority, total_time, lower, upper = dp.branch_and_bound_maximize_priority(
+        g, all_paths, 0, time_budget, all_hospitals, node_limit=1, time_limit=None
+    )
+    assert priority == lower <= optimum <= upper
+    check_route(g, all_paths, route, priority, total_time, time_budget)
+
+
+@pytest.mark.parametrize("seed", range(0, 40, 3))
+def test_bounds_hold_when_start_is_not_a_delivery_hospital(seed):
+    # parte do hospital 0, mas só entrega nos outros
+    g, all_paths, all_hospitals = random_instance(seed, 8, 3)
+    delivery = [h for h in all_hospitals if h != 0]
+    for time_budget in (20, 40, 80):
+        optimum = dp.maximize_priority_dp(g, all_paths, 0, time_budget, delivery)[1]
+        assert dp.priority_upper_bound(g, all_paths, time_budget, delivery, starts=(0,)) >= optimum
+        bnb = dp.branch_and_bound_maximize_priority(g, all_paths, 0, time_budget, delivery, node_limit=1, time_limit=None)
+        assert bnb[4] >= optimum
+        inc = dp.best_within(g, all_paths, 0, time_budget, delivery, time_limit_ms=5000)
+        assert inc.priority == optimum <= inc.upper_bound
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::4])
+def test_feasible_state_estimate_is_an_upper_bound(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    n, states = dp.estimate_feasible_states(g, all_paths, time_budget, all_hospitals)
+    assert n == patients
+    for h in all_hospitals:
+        assert len(feasible_sets(g, all_paths, h, time_budget, all_hospitals)) <= states <= 2 ** n
+    assert dp.choose_algorithm(g, all_paths, time_budget, all_hospitals) == 'sparse'
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::5])
+def test_dp_layers_do_not_depend_on_chunk_size(seed, patients, hospitals, time_budget, monkeypatch):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    single = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)
+    multi = dp.maximize_priority_multi_start(g, all_paths, time_budget, all_hospitals)
+    monkeypatch.setattr(dp, 'DP_CHUNK', 3)
+    assert dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals) == single
+    assert dp.maximize_priority_multi_start(g, all_paths, time_budget, all_hospitals) == multi
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[1::6])
+def test_parallel_dp_matches_serial(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    serial = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)
+    parallel = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals, workers=2)
+    assert parallel[:3] == serial[:3]
+    with pytest.raises(dp.SolverTimeout):
+        dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals, workers=2, deadline=0.0)
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::3])
+def test_multi_start_matches_dp_per_hospital(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    (best_h, route, priority, total_time), per_start = dp.maximize_priority_multi_start(
+        g, all_paths, time_budget, all_hospitals
+    )
+    assert set(per_start) == set(all_hospitals)
+    for h in all_hospitals:
+        expected = dp.maximize_priority_dp(g, all_paths, h, time_budget, all_hospitals)
+        h_route, h_priority, h_time = per_start[h]
+        assert (h_priority, h_time) == pytest.approx(expected[1:3])
+        assert h_route[0] == ('H', h)
+        check_route(g, all_paths, h_route, h_priority, h_time, time_budget)
+    assert priority == max(p for _r, p, _t in per_start.values())
+    assert route[0] == ('H', best_h) and per_start[best_h][1] == priority
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_compiled_instance_matches_paths(seed):
+    g, all_paths, all_hospitals = random_instance(seed, 6, 1 + seed % 3)
+    inst = compile_instance(g, all_paths, all_hospitals)
+    assert inst.hospitals == all_hospitals
+    assert inst.patients == [nid for nid, n in g.nodes.items() if n.tipo == 'paciente']
+    dist = lambda u, v: all_paths.get((u, v), (INF, []))[0]
+    for c, p in enumerate(inst.patients):
+        assert inst.prio[c] == g.nodes[p].prioridade and inst.svc[c] == g.nodes[p].tempo_cuidados_minimos
+        for h in all_hospitals:
+            assert inst.dist_hp[inst.row_of[h], c] == dist(h, p)
+        near = min(all_hospitals, key=lambda h: dist(p, h))
+        assert inst.hospitals[inst.near_h[c]] == near and inst.near_d[c] == dist(p, near)
+        assert inst.min_cost[c] == pytest.approx(
+            min(dist(h, p) for h in all_hospitals) + inst.svc[c] + inst.near_d[c]
+        )
+    # a instância fica em cache até mudarem os pacientes por atender
+    assert compile_instance(g, all_paths, all_hospitals) is inst
+    g.nodes[inst.patients[0]].resgatado = True
+    rescued = compile_instance(g, all_paths, all_hospitals)
+    assert rescued is not inst and rescued.patients == inst.patients[1:]
+    # um dicionário simples também serve (sem cache)
+    plain = {(u, v): all_paths.get((u, v)) for u in g.nodes for v in g.nodes if (u, v) in all_paths}
+    assert np.array_equal(compile_instance(g, plain, all_hospitals).dist_hp, rescued.dist_hp)
+
+
+def test_compiled_instance_follows_dynamic_paths():
+    g, _paths, all_hospitals = random_instance(2, 5, 2)
+    dyn = DynamicShortestPaths(g, all_hospitals)
+    inst = compile_instance(g, dyn, all_hospitals)
+    p = inst.patients[0]
+    g.add_edge(0, p, 0.25)
+    updated = compile_instance(g, dyn, all_hospitals)
+    assert updated is not inst and updated.dist_hp[updated.row_of[0], 0] == 0.25
+    dyn.close()
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES)
+def test_greedy_returns_feasible_route(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    route, priority, total_time, optimal = dp.greedy_maximize_priority(g, all_paths, 0, time_budget, all_hospitals)
+    assert not optimal
+    assert priority <= brute_force(g, all_paths, 0, time_budget, all_hospitals)
+    check_route(g, all_paths, route, priority, total_time, time_budget)
+
+
+def reference_greedy(g: Graph, all_paths, hospital_id: int, time_budget: float, all_hospitals):
+    """Heurística gananciosa original, paciente a paciente (referência do greedy vetorizado)."""
+    dist = lambda u, v: all_paths.get((u, v), (INF, []))[0]
+    info = {}
+    for pid, n in g.nodes.items():
+        if n.tipo == 'paciente' and (n.prioridade or 0) > 0 and not n.resgatado:
+            h = min(all_hospitals, key=lambda h: dist(pid, h))
+            if dist(pid, h) != INF:
+                info[pid] = (n.prioridade, n.tempo_cuidados_minimos or 0.0, h, dist(pid, h))
+    remaining = set(info)
+    route, total_time, total_prio, loc = [('H', hospital_id)], 0.0, 0, hospital_id
+    while remaining:
+        time_left = time_budget - total_time
+        best, best_score = None, -INF
+        for pid in sorted(remaining):
+            prio, svc, h, d_to_h = info[pid]
+            cost = dist(loc, pid) + svc + d_to_h
+            if cost > time_left:
+                continue
+            score = prio / cost if cost > 0 else prio * 1000.0
+            score *= 1.5 if prio >= 80 else 1.3 if prio >= 60 else 1.1 if prio >= 40 else 1.0
+            score *= 1.0 - (cost / time_left) * 0.3
+            if time_left < time_budget * 0.3:
+                score *= 1.2 if cost < time_left * 0.5 else 0.8
+            reachable = [
+                info[q][0] for q in remaining
+                if q != pid and total_time + cost + dist(h, q) + info[q][1] + info[q][3] <= time_budget
+            ]
+            if len(remaining) > 1:
+                lookahead = len(reachable) / (len(remaining) - 1) * 0.3
+                if reachable and sum(reachable) / len(reachable) > 50:
+                    lookahead *= 1.2
+                score += lookahead
+            if score > best_score:
+                best_score, best = score, (pid, cost, prio, h)
+        if best is None:
+            break
+        pid, cost, prio, h = best
+        route += [('P', pid), ('H', h)]
+        total_time += cost
+        total_prio += prio
+        loc = h
+        remaining.remove(pid)
+    return route, total_prio, total_time
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_greedy_matches_reference_heuristic(seed):
+    g, all_paths, all_hospitals = random_instance(seed, 25, 1 + seed % 3)
+    rnd = random.Random(seed)
+    for n in g.nodes.values():
+        if n.tipo == 'paciente':
+            n.prioridade = rnd.randint(1, 100)
+    time_budget = 40 + 10 * seed
+    expected = reference_greedy(g, all_paths, 0, time_budget, all_hospitals)
+    route, priority, total_time, _optimal = dp.greedy_maximize_priority(g, all_paths, 0, time_budget, all_hospitals)
+    assert (priority, total_time) == pytest.approx(expected[1:])
+    assert route == expected[0]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[2::5])
+def test_lns_never_worsens_the_route(seed, patients, hospitals, time_budget, workers):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    start = dp.greedy_maximize_priority(g, all_paths, 0, time_budget, all_hospitals)
+    route, priority, total_time, optimal = dp.improve_route_lns(
+        g, all_paths, start[0], time_budget, all_hospitals, time_limit=0.1, workers=workers, seed=seed
+    )
+    assert not optimal
+    assert start[1] <= priority <= optimum
+    assert route[0] == ('H', 0)
+    check_route(g, all_paths, route, priority, total_time, time_budget)
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES)
+def test_beam_search_is_feasible_and_exact_when_wide(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    for width in (1, 4):
+        route, priority, total_time, optimal = dp.beam_search_maximize_priority(
+            g, all_paths, 0, time_budget, all_hospitals, width=width
+        )
+        assert not optimal and priority <= optimum
+        check_route(g, all_paths, route, priority, total_time, time_budget)
+    # largura maior que o número de estados (máscara, hospital): equivale ao DP
+    wide = dp.beam_search_maximize_priority(g, all_paths, 0, time_budget, all_hospitals, width=(1 << patients) * hospitals)
+    assert wide[1] == optimum
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::2])
+def test_anytime_incumbents_improve_until_optimal(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    incumbents = list(dp.solve_anytime(g, all_paths, 0, time_budget, all_hospitals))
+    assert incumbents[0].method == 'greedy'
+    for prev, inc in zip(incumbents, incumbents[1:]):
+        assert inc.priority >= prev.priority and inc.upper_bound <= prev.upper_bound
+    for inc in incumbents:
+        assert inc.priority <= optimum <= inc.upper_bound
+        assert inc.optimal == (inc.priority == inc.upper_bound)
+        check_route(g, all_paths, inc.route, inc.priority, inc.time, time_budget)
+    assert incumbents[-1].optimal and incumbents[-1].priority == optimum
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::4])
+def test_best_within_bounds_optimum(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    inc = dp.best_within(g, all_paths, 0, time_budget, all_hospitals, time_limit_ms=5000)
+    assert inc.optimal and inc.priority == optimum
+    # sem tempo nenhum continua a haver a resposta gananciosa
+    quick = dp.best_within(g, all_paths, 0, time_budget, all_hospitals, time_limit_ms=0)
+    assert quick.priority <= optimum <= quick.upper_bound
+    check_route(g, all_paths, quick.route, quick.priority, quick.time, time_budget)
+
+
+def test_solve_anytime_falls_back_to_bnb_when_exact_dp_times_out(monkeypatch):
+    g, all_paths, all_hospitals = random_instance(3, 10, 2)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, 60, all_hospitals)[1]
+
+    def timeout(*args, **kwargs):
+        raise dp.SolverTimeout("forçado pelo teste")
+
+    monkeypatch.setattr(dp, 'choose_algorithm', lambda *args: 'sparse')
+    monkeypatch.setattr(dp, 'maximize_priority_sparse_dp', timeout)
+    inc = dp.best_within(g, all_paths, 0, 60, all_hospitals, time_limit_ms=5000)
+    assert inc.priority == optimum and inc.optimal
+
+
+@pytest.mark.parametrize("seed,patients,hospitals,time_budget", CASES[::3])
+def test_bnb_reports_each_improvement(seed, patients, hospitals, time_budget):
+    g, all_paths, all_hospitals = random_instance(seed, patients, hospitals)
+    found = []
+    result = dp.branch_and_bound_maximize_priority(
+        g, all_paths, 0, time_budget, all_hospitals, time_limit=None,
+        initial=([('H', 0)], 0, 0.0), on_improve=lambda *args: found.append(args),
+    )
+    for prev, curr in zip(found, found[1:]):
+        assert curr[1] >= prev[1]
+    for route, priority, total_time in found:
+        check_route(g, all_paths, route, priority, total_time, time_budget)
+    if result[1] > 0:
+        assert found[-1] == result[:3]
+
+
+@pytest.mark.parametrize("choice", ['dp', 'bnb'])
+def test_solve_anytime_runs_the_chosen_exact_solver(choice, monkeypatch):
+    g, all_paths, all_hospitals = random_instance(3, 10, 2)
+    optimum = dp.maximize_priority_dp(g, all_paths, 0, 60, all_hospitals)[1]
+    # heurísticas sem resposta: as melhorias só podem vir do solver exato
+    trivial = ([('H', 0)], 0, 0.0, False)
+    monkeypatch.setattr(dp, 'choose_algorithm', lambda *args: choice)
+    monkeypatch.setattr(dp, 'greedy_maximize_priority', lambda *args: trivial)
+    monkeypatch.setattr(dp, 'beam_search_maximize_priority', lambda *args, **kwargs: trivial)
+    incumbents = list(dp.solve_anytime(g, all_paths, 0, 60, all_hospitals, deadline=time.monotonic() + 30))
+    assert {inc.method for inc in incumbents[1:]} == {choice}
+    assert incumbents[-1].optimal and incumbents[-1].priority == optimum
+    for prev, inc in zip(incumbents, incumbents[1:]):
+        assert inc.priority >= prev.priority and inc.upper_bound <= prev.upper_bound
+    if choice == 'bnb':
+        # cada melhoria do branch-and-bound sai logo como incumbente
+        assert len(incumbents) > 2
+
+
+def test_mitm_honours_deadline():
+    g, all_paths, all_hospitals = random_instance(7, 20, 2)
+    with pytest.raises(dp.SolverTimeout):
+        dp.maximize_priority_mitm(g, all_paths, 0, 200, all_hospitals, deadline=0.0)
+
+
+def test_exact_solvers_honour_limits():
+    g, all_paths, all_hospitals = random_instance(5, 8, 3)
+    for solver in (dp.maximize_priority_dp, dp.maximize_priority_sparse_dp):
+        with pytest.raises(dp.SolverTimeout):
+            solver(g, all_paths, 0, 200, all_hospitals, max_states=4)
+        with pytest.raises(dp.SolverTimeout):
+            solver(g, all_paths, 0, 200, all_hospitals, deadline=0.0)
+    with pytest.raises(dp.SolverTimeout):
+        dp.maximize_priority_multi_start(g, all_paths, 200, all_hospitals, max_states=4)
+    with pytest.raises(dp.SolverTimeout):
+        dp.maximize_priority_multi_start(g, all_paths, 200, all_hospitals, deadline=0.0)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_mitm_matches_sparse_dp_beyond_dense_size(seed):
+    # mais pacientes do que o DP denso aguenta num teste, budget curto
+    g, all_paths, all_hospitals = random_instance(seed, 30, 1 + seed % 3)
+    time_budget = 25 + 5 * seed
+    expected = dp.maximize_priority_sparse_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    route, priority, total_time, optimal = dp.maximize_priority_mitm(g, all_paths, 0, time_budget, all_hospitals)
+    assert optimal and priority == expected
+    check_route(g, all_paths, route, priority, total_time, time_budget)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("seed", range(4))
+def test_fleet_plan_serves_each_patient_once(seed, workers):
+    g, all_paths, all_hospitals = random_instance(seed, 12, 2)
+    vehicles = [Vehicle(0, 30.0), Vehicle(1, 45.0), Vehicle(0, 20.0)]
+    plan = plan_fleet(g, all_paths, vehicles, all_hospitals, time_limit_ms=500, workers=workers)
+    served = []
+    for vehicle, inc in zip(vehicles, plan.routes):
+        assert inc.route[0] == ('H', vehicle.hospital_id)
+        check_route(g, all_paths, inc.route, inc.priority, inc.time, vehicle.time_budget)
+        served += [nid for tipo, nid in inc.route if tipo == 'P']
+    assert len(served) == len(set(served))
+    assert plan.priority == sum(inc.priority for inc in plan.routes)
+    assert plan.time == pytest.approx(sum(inc.time for inc in plan.routes))
+    patients = {nid for nid, n in g.nodes.items() if n.tipo == 'paciente'}
+    assert set(plan.unserved) == patients - set(served)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("seed", range(4))
+def test_decomposed_route_is_feasible(seed, workers):
+    g, all_paths, all_hospitals = random_instance(seed, 15, 3)
+    time_budget = 40 + 10 * seed
+    inst = compile_instance(g, all_paths, all_hospitals, starts=(0,))
+    clusters = cluster_patients(inst)
+    assert sorted(c for cols in clusters.values() for c in cols) == list(range(len(inst.patients)))
+    for hi, cols in clusters.items():
+        assert all(inst.near_h[c] == hi for c in cols)
+    optimum = dp.maximize_priority_sparse_dp(g, all_paths, 0, time_budget, all_hospitals)[1]
+    route, priority, total_time, optimal = maximize_priority_decomposed(
+        g, all_paths, 0, time_budget, all_hospitals, time_limit_ms=200, workers=workers
+    )
+    assert not optimal and priority <= optimum
+    assert route[0] == ('H', 0)
+    check_route(g, all_paths, route, priority, total_time, time_budget)
+
+
+def test_dp_skips_rescued_and_zero_priority_patients():
+    g, all_paths, all_hospitals = random_instance(0, 5, 1)
+    for nid in (1, 2):
+        g.nodes[nid].resgatado = True
+    g.nodes[3].prioridade = 0
+    route, _priority, _time, _optimal = dp.maximize_priority_dp(g, all_paths, 0, 1000, all_hospitals)
+    assert {nid for tipo, nid in route if tipo == 'P'} == {4, 5}
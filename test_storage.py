@@ -0,0 +1,288 @@
+"""
+Testes do armazenamento do grafo: a leitura dos CSV (loader), os
+snapshots binários e o grafo memory-mapped têm de reproduzir o grafo lido
+linha a linha com csv.DictReader; a tabela de nós em colunas (NodeTable)
+tem de se comportar como o dicionário de Node que substitui.
+
+    python -m pytest -q test_storage.py
+"""
+
+from pathlib import Path
+import csv
+import io
+import pickle
+import random
+import shutil
+import sys
+
+# Adiciona src ao path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import numpy as np
+import pytest
+
+import loader
+import snapshot
+from dijkstra import dijkstra, hospital_shortest_paths
+from graph import Graph, IndexedGraph
+from mapped_graph import MappedGraph, build_mapped_graph, write_mapped_graph
+from node import Node, NodeTable
+
+DATASETS = sorted(p for p in (Path(__file__).parent / "datasets").glob("*/*") if (p / "ruas.csv").exists())
+
+
+def reference_graph(base: Path, graph_cls=Graph) -> Graph:
+    """Leitura direta com csv.DictReader, como o carregamento original."""
+    g = graph_cls()
+    with open(base / "pontos.csv", newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            tipo = row.get('tipo', '')
+            g.add_node(Node(
+                id=int(row['id']),
+                tipo=tipo,
+                nome=row.get('nome', ''),
+                prioridade=int(row['prioridade']) if row.get('prioridade') else None,
+                tempo_cuidados_minimos=float(row['tempo_cuidados_minimos']) if row.get('tempo_cuidados_minimos') else None,
+                is_hospital=(row.get('is_hospital') or '').strip().lower() in ('1', 'true', 'sim', 'yes') or tipo.strip().lower() == 'hospital',
+            ))
+    with open(base / "ruas.csv", newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            g.add_edge(int(row['ponto_origem']), int(row['ponto_destino']), float(row['tempo_transporte']))
+    return g
+
+
+def node_dicts(g) -> dict:
+    return {nid: n.to_dict() for nid, n in g.nodes.items()}
+
+
+def sorted_adjacency(g, dtype=float) -> dict:
+    return {nid: sorted((v, dtype(w)) for v, w in neigh) for nid, neigh in g.adjacency.items()}
+
+
+# ----------------------------------------------------------------------------
+# loader
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("base", DATASETS, ids=lambda p: f"{p.parent.name}-{p.name}")
+def test_loader_matches_reference(base):
+    sources = [
+        (base / "pontos.csv", base / "ruas.csv"),
+        ((base / "pontos.csv").read_bytes(), io.BytesIO((base / "ruas.csv").read_bytes())),
+    ]
+    for graph_cls in (Graph, IndexedGraph):
+        # IndexedGraph funde ruas repetidas, por isso a referência usa a mesma classe
+        expected = reference_graph(base, graph_cls)
+        for nodes, edges in sources:
+            g, _h, _t = loader.load_dataset(nodes, edges, graph_cls=graph_cls)
+            assert type(g) is graph_cls
+            assert node_dicts(g) == node_dicts(expected)
+            assert sorted_adjacency(g) == sorted_adjacency(expected)
+
+
+def test_loader_counts_malformed_rows():
+    g = Graph()
+    assert loader.load_nodes(g, b"id,tipo,prioridade\n1,hospital,\n2,paciente,5\nx,paciente,1\n") == 1
+    assert loader.load_edges(g, "ponto_origem,ponto_destino,tempo_transporte\n1,2,3\n1,9,1\nz,1,1\n".encode()) == 2
+    assert g.adjacency == {1: [(2, 3.0)], 2: [(1, 3.0)]}
+    assert g.nodes[2].prioridade == 5 and g.nodes[1].is_hospital
+
+
+def test_loader_accepts_alternative_headers():
+    g = Graph()
+    loader.load_nodes(g, io.StringIO("node,tipo\n1,hospital\n2,paciente\n"))
+    loader.load_edges(g, io.StringIO("from,to,weight\n1,2,4.5\n"), bidirectional=False)
+    assert g.adjacency == {1: [(2, 4.5)], 2: []}
+
+
+def test_read_initial(tmp_path):
+    path = tmp_path / "dados_iniciais.csv"
+    path.write_text("ponto_inicial,tempo_total\n3,42.5\n")
+    assert loader.read_initial(path) == (3, 42.5)
+    g, hospital_id, tempo_total = loader.load_dataset(b"id,tipo\n3,hospital\n", b"from,to\n", path)
+    assert (hospital_id, tempo_total) == (3, 42.5) and list(g.nodes) == [3]
+    assert loader.read_time_budget(path) == 42.5
+    assert loader.read_time_budget(tmp_path / "nao_existe.csv") is None
+
+
+# ----------------------------------------------------------------------------
+# snapshot
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("base", DATASETS[::3], ids=lambda p: f"{p.parent.name}-{p.name}")
+def test_snapshot_round_trip(base, tmp_path):
+    folder = tmp_path / "ds"
+    shutil.copytree(base, folder)
+    expected, hospital_id, tempo_total = loader.load_dataset(folder / "pontos.csv", folder / "ruas.csv", folder / "dados_iniciais.csv")
+    out = snapshot.convert_dataset(folder, with_paths=True)
+    for graph_cls in (Graph, IndexedGraph):
+        snap = snapshot.load_snapshot(out, graph_cls, sources=snapshot.dataset_sources(folder))
+        assert snap is not None and type(snap.graph) is graph_cls
+        assert (snap.hospital_id, snap.tempo_total) == (hospital_id, tempo_total)
+        assert node_dicts(snap.graph) == node_dicts(expected)
+        assert sorted_adjacency(snap.graph) == sorted_adjacency(expected)
+        hospitals = expected.nodes.hospitals().tolist()
+        full = hospital_shortest_paths(expected, hospitals)
+        for h in hospitals:
+            for v in expected.nodes:
+                assert snap.paths.get((h, v))[0] == pytest.approx(full.get((h, v))[0])
+    # o grafo do snapshot continua editável (índices construídos no primeiro uso)
+    g = snapshot.load_snapshot(out, IndexedGraph).graph
+    u, neigh = next((u, neigh) for u, neigh in g.adjacency.items() if neigh)
+    v = neigh[0][0]
+    g.remove_edge(u, v)
+    assert g.get_weight(u, v) is None and u not in g.reverse[v]
+    assert g.edges_count() == expected.edges_count() - 2
+
+
+def test_snapshot_is_stale_after_any_source_changes(tmp_path):
+    folder = tmp_path / "ds"
+    shutil.copytree(DATASETS[0], folder)
+    out = snapshot.convert_dataset(folder)
+    assert snapshot.load_snapshot(out, sources=snapshot.dataset_sources(folder)) is not None
+    for name, text in (("dados_iniciais.csv", "ponto_inicial,tempo_total\n1,7\n"), ("ruas.csv", "ponto_origem,ponto_destino,tempo_transporte\n")):
+        original = (folder / name).read_bytes()
+        (folder / name).write_text(text)
+        assert snapshot.load_snapshot(out, sources=snapshot.dataset_sources(folder)) is None
+        (folder / name).write_bytes(original)
+    assert snapshot.load_snapshot(out, sources=snapshot.dataset_sources(folder)) is not None
+    assert snapshot.load_snapshot(tmp_path / "nao_existe.npz") is None
+
+
+def test_snapshot_merges_parallel_edges_for_indexed_graph(tmp_path):
+    g = Graph()
+    for i in range(4):
+        g.add_node(Node(i))
+    g.add_edges([(0, 1, 5.0), (0, 1, 2.0), (1, 2, 1.0), (2, 3, 4.0)])
+    path = snapshot.save_snapshot(tmp_path / "dup.npz", g)
+    loaded = snapshot.load_snapshot(path, IndexedGraph).graph
+    assert loaded.get_weight(0, 1) == 2.0 and loaded.edges_count() == 6
+    assert snapshot.load_snapshot(path, Graph).graph.adjacency == g.adjacency
+
+
+# ----------------------------------------------------------------------------
+# grafo memory-mapped
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("base", DATASETS[::3], ids=lambda p: f"{p.parent.name}-{p.name}")
+def test_mapped_graph_matches_csv_loader(base, tmp_path):
+    expected, hospital_id, _t = loader.load_dataset(base / "pontos.csv", base / "ruas.csv", base / "dados_iniciais.csv", graph_cls=Graph)
+    built, skipped = build_mapped_graph(base / "pontos.csv", base / "ruas.csv", tmp_path / "built")
+    written = write_mapped_graph(expected, tmp_path / "written")
+    assert skipped == 0
+    for m in (built, written, MappedGraph(tmp_path / "built")):
+        assert node_dicts(m) == node_dicts(expected)
+        # pesos gravados em float32
+        assert sorted_adjacency(m, np.float32) == sorted_adjacency(expected, np.float32)
+        assert (m.nodes_count(), m.edges_count()) == (expected.nodes_count(), expected.edges_count())
+        d_expected, _ = dijkstra(expected, hospital_id)
+        d_mapped, _ = dijkstra(m, hospital_id)
+        assert d_mapped == pytest.approx(d_expected, rel=1e-5)
+        hospitals = expected.nodes.hospitals().tolist()
+        assert m.nodes.hospitals().tolist() == sorted(hospitals)
+        ids, prio, tempo = expected.nodes.candidates()
+        order = np.argsort(ids)
+        for got, want in zip(m.nodes.candidates(), (ids[order], prio[order], tempo[order])):
+            np.testing.assert_array_equal(got, want)
+        np.testing.assert_allclose(hospital_shortest_paths(m, hospitals).dist, hospital_shortest_paths(expected, hospitals).dist, rtol=1e-5)
+    with pytest.raises(TypeError):
+        built.add_edge(hospital_id, hospital_id)
+
+
+def test_mapped_graph_skips_malformed_rows(tmp_path):
+    m, skipped = build_mapped_graph(
+        io.StringIO("id,tipo\n5,hospital\n3,paciente\n"),
+        io.StringIO("from,to,weight\n5,3,2\n5,9,1\nz,1,1\n"),
+        tmp_path / "small",
+    )
+    assert skipped == 2
+    assert m.adjacency[5] == [(3, 2.0)] and m.adjacency[3] == [(5, 2.0)]
+    assert m.nodes[5].is_hospital and 9 not in m.nodes
+
+
+# ----------------------------------------------------------------------------
+# NodeTable
+# ----------------------------------------------------------------------------
+
+def make_table() -> NodeTable:
+    return NodeTable([
+        Node(10, 'hospital', 'H', is_hospital=True),
+        Node(20, 'paciente', 'A', 5, 2.0),
+        Node(30, 'paciente', 'B', 0, None),
+        Node(40, 'paciente', 'C', 7, None),
+    ])
+
+
+def test_node_table_views_write_through():
+    table = make_table()
+    view = table[20]
+    view.resgatado = True
+    view.prioridade = None
+    view.tempo_cuidados_minimos = None
+    assert table[20].resgatado and table[20].prioridade is None and table[20].tempo_cuidados_minimos is None
+    table.reset_rescued()
+    assert not table[20].resgatado
+    assert table[10].to_dict() == Node(10, 'hospital', 'H', is_hospital=True).to_dict()
+    with pytest.raises(AttributeError):
+        view.extra = 1  # NodeView não tem __dict__
+
+
+def test_node_table_filters():
+    table = make_table()
+    assert table.hospitals().tolist() == [10]
+    ids, prio, tempo = table.candidates()
+    assert ids.tolist() == [20, 40] and prio.tolist() == [5, 7] and tempo.tolist() == [2.0, 0.0]
+    table[40].resgatado = True
+    assert table.candidates()[0].tolist() == [20]
+    assert table.candidates(include_rescued=True)[0].tolist() == [20, 40]
+
+
+def test_node_table_delete_and_reinsert():
+    table = make_table()
+    del table[20]
+    assert 20 not in table and len(table) == 3 and list(table) == [10, 30, 40]
+    with pytest.raises(KeyError):
+        table[20]
+    assert 20 not in table.candidates()[0].tolist()
+    table[20] = Node(20, 'paciente', 'A2', 9, 1.0)
+    assert list(table) == [10, 30, 40, 20]
+    assert table[20].nome == 'A2' and table[20].prioridade == 9
+    # substituir mantém a posição
+    table[30] = Node(30, 'hospital', 'H2', is_hospital=True)
+    assert list(table) == [10, 30, 40, 20] and table.hospitals().tolist() == [10, 30]
+    columns = table.columns()
+    assert columns['ids'].tolist() == [10, 30, 40, 20]
+    rebuilt = NodeTable.from_columns(**columns)
+    assert [n.to_dict() for n in rebuilt.values()] == [n.to_dict() for n in table.values()]
+
+
+def test_node_table_index_matches_dict(monkeypatch):
+    # índice pequeno para passar várias vezes pela reconstrução
+    monkeypatch.setattr(NodeTable, '_MIN_PENDING', 4)
+    rnd = random.Random(3)
+    table, expected = NodeTable(), {}
+    for step in range(400):
+        nid = rnd.randrange(60) - 20
+        if nid in expected and rnd.random() < 0.4:
+            del table[nid], expected[nid]
+        else:
+            node = Node(nid, 'paciente', f"Posto nº{step} ção", step % 4, None)
+            table[nid] = node
+            expected[nid] = node.to_dict()
+        assert len(table) == len(expected) and list(table) == list(expected)
+    assert {nid: n.to_dict() for nid, n in table.items()} == expected
+    assert all(nid not in table for nid in (-21, 40, 'x', None))
+    rebuilt = NodeTable.from_columns(**table.columns())
+    assert {nid: n.to_dict() for nid, n in rebuilt.items()} == expected
+
+
+def test_node_table_in_graph_and_pickle():
+    g = IndexedGraph()
+    for node in make_table().values():
+        g.add_node(node)
+    g.add_edge(10, 20, 3.0)
+    g.nodes[20].resgatado = True
+    g.remove_node(40)
+    assert 40 not in g.nodes and g.nodes[20].resgatado
+    copy = pickle.loads(pickle.dumps(g))
+    assert node_dicts(copy) == node_dicts(g) and copy.adjacency == g.adjacency
+    assert type(pickle.loads(pickle.dumps(g.nodes[20]))) is Node